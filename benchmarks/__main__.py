@@ -0,0 +1,180 @@
+import argparse
+import collections
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Optional, TextIO
+
+SUITE = {
+    "hot_paths": ["--seed", "0"],
+    "game_engine": ["--plays", "50000", "--seed", "0"],
+    "codec": ["--iterations", "20000", "--seed", "0"],
+    "draws": ["--games", "2000", "--draws", "20000", "--seed", "0"],
+    "hand": ["--hands", "1000", "--seed", "0"],
+    "framing": ["--messages", "10000"],
+    "sharding": ["--games", "100", "--shards", "1"],
+    "spectators": ["--games", "2", "--rounds", "50", "--watchers", "0", "100"],
+}
+HELPERS = ("__init__", "__main__", "common")
+
+
+def modules() -> list[str]:
+    directory = os.path.dirname(__file__)
+    return sorted(
+        name[:-3]
+        for name in os.listdir(directory)
+        if name.endswith(".py") and name[:-3] not in HELPERS
+    )
+
+
+def revision() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + "-dirty" if dirty else commit
+
+
+def emit(record: dict, output: Optional[TextIO]) -> None:
+    line = json.dumps(record)
+    print(line, flush=True)
+    if output is not None:
+        output.write(line + "\n")
+        output.flush()
+
+
+def run(names: list[str], full: bool, output: Optional[TextIO]) -> int:
+    emit(
+        {
+            "benchmark": "suite",
+            "commit": revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "time": round(time.time()),
+        },
+        output,
+    )
+    failures = 0
+    for name in names:
+        args = [] if full else SUITE.get(name, [])
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", f"benchmarks.{name}", *args],
+            stdout=subprocess.PIPE,
+            text=True,
+            env=os.environ | {"PYTHONHASHSEED": "0"},
+        )
+        for line in process.stdout:
+            if line.startswith("{"):
+                emit(json.loads(line), output)
+        returncode = process.wait()
+        failures += returncode != 0
+        emit(
+            {
+                "benchmark": "suite",
+                "module": name,
+                "returncode": returncode,
+                "seconds": round(time.perf_counter() - start, 1),
+            },
+            output,
+        )
+    return failures
+
+
+def load(path: str) -> dict[tuple[str, int], dict]:
+    records = {}
+    seen = collections.Counter()
+    with open(path) as file:
+        for line in file:
+            record = json.loads(line)
+            name = record["benchmark"]
+            if name != "suite":
+                records[name, seen[name]] = record
+                seen[name] += 1
+    return records
+
+
+def compare(baseline: str, candidate: str) -> None:
+    before, after = load(baseline), load(candidate)
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        config = {
+            field: value for field, value in new.items() if old.get(field) == value
+        }
+        changes = {
+            field: {
+                "old": old[field],
+                "new": value,
+                "change": round(value / old[field] - 1, 3) if old[field] else None,
+            }
+            for field, value in new.items()
+            if field not in config
+            and isinstance(value, (int, float))
+            and isinstance(old.get(field), (int, float))
+            and not isinstance(value, bool)
+        }
+        print(json.dumps(config | {"changes": changes}), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="run benchmark modules with fixed seeds and write JSON lines",
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        metavar="NAME",
+        help=f"modules to run (default: {' '.join(SUITE)}); --all runs every module",
+    )
+    parser.add_argument("--all", action="store_true")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="use each module's own default sizes instead of the suite's",
+    )
+    parser.add_argument("--output", help="also append the JSON lines to this file")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        help="diff two result files record by record instead of running",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    available = modules()
+    names = available if args.all else args.names or list(SUITE)
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    output = open(args.output, "a") if args.output else None
+    try:
+        failures = run(names, args.full, output)
+    finally:
+        if output is not None:
+            output.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
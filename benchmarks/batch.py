@@ -0,0 +1,33 @@
+import argparse
+
+from server import batch, simulator
+
+from .common import report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.batch")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--scalar-games", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mismatched = batch.cross_check(1000, args.seed) + batch.cross_check(
+        1000, args.seed, draw_pile=3
+    )
+    report("batch_cross_check", games=2000, mismatched=mismatched)
+    if mismatched:
+        raise SystemExit(f"vectorized games differ from Game.update: {mismatched}")
+
+    scalar = simulator.run(args.scalar_games, args.seed, ["random"] * 4)
+    report("batch_scalar", **scalar)
+    vectorized = batch.run(args.games, args.seed, policy="random")
+    report(
+        "batch_vectorized",
+        **vectorized,
+        speedup=round(vectorized["games_per_second"] / scalar["games_per_second"], 1),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import random
+import socket
+import time
+
+from protocol.codec import CODECS
+from server.card import get_fresh_deck
+from server.player import Player
+from server.server import CARD_PLAYED_MESSAGE, Server
+
+from .common import raise_fd_limit, report
+
+
+def drain(sock: socket.socket) -> None:
+    try:
+        while sock.recv(1 << 16):
+            pass
+    except BlockingIOError:
+        pass
+
+
+def make_recipients(server: Server, count: int) -> tuple[list[Player], list]:
+    players, peers = [], []
+    codecs = list(CODECS.values())
+    for i in range(count):
+        conn, peer = socket.socketpair()
+        peer.setblocking(False)
+        player = Player(f"player#{i:04}", conn, False, "000000")
+        server.codecs_by_conn[conn] = codecs[i % len(codecs)]
+        players.append(player)
+        peers.append(peer)
+    return players, peers
+
+
+def per_recipient(server: Server, players: list[Player], update: dict) -> None:
+    for player in players:
+        server.send(
+            player.conn,
+            category=CARD_PLAYED_MESSAGE,
+            player=players[0].username,
+            is_turn=player == players[1],
+            **update,
+        )
+
+
+def encode_once(server: Server, players: list[Player], update: dict) -> None:
+    server.broadcast(
+        players,
+        lambda player: {"is_turn": player == players[1]},
+        category=CARD_PLAYED_MESSAGE,
+        player=players[0].username,
+        **update,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.broadcast")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    server = Server(("127.0.0.1", 0))
+    deck = get_fresh_deck()
+    random.Random(args.seed).shuffle(deck)
+    update = {
+        "seq": 42,
+        "status": "ok",
+        "current_colour": deck[0].colour,
+        "current_number": deck[0].number,
+        "current_effects": deck[0].effects,
+    }
+
+    for count in (4, 16, 64, 256, 1024):
+        players, peers = make_recipients(server, count)
+        for name, fan_out in (
+            ("per_recipient", per_recipient),
+            ("encode_once", encode_once),
+        ):
+            elapsed = 0.0
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                fan_out(server, players, update)
+                elapsed += time.perf_counter() - start
+                for peer in peers:
+                    drain(peer)
+            report(
+                "broadcast",
+                strategy=name,
+                recipients=count,
+                us_per_broadcast=round(elapsed / args.rounds * 1e6, 2),
+                us_per_recipient=round(elapsed / args.rounds / count * 1e6, 3),
+            )
+        for player, peer in zip(players, peers):
+            player.conn.close()
+            peer.close()
+
+
+if __name__ == "__main__":
+    main()
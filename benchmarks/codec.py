@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+from protocol.codec import CODECS
+from server.card import get_fresh_deck
+
+from .common import report
+
+
+def move_message(hand_size: int, seed: int) -> dict:
+    deck = get_fresh_deck()
+    random.Random(seed).shuffle(deck)
+    return {
+        "category": "!MOVE",
+        "player": "player#0000",
+        "is_turn": False,
+        "hand": deck[:hand_size],
+        "current_colour": "red",
+        "current_number": 7,
+        "current_effects": [],
+        "status": "ok",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.codec")
+    parser.add_argument("--iterations", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for hand_size in (7, 30):
+        msg = move_message(hand_size, args.seed)
+        for codec in CODECS.values():
+            payload = codec.encode(msg)
+
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                codec.encode(msg)
+            encode_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                codec.decode(payload)
+            decode_elapsed = time.perf_counter() - start
+
+            report(
+                "codec",
+                codec=codec.name,
+                hand_size=hand_size,
+                bytes_per_message=len(payload),
+                encode_us=round(encode_elapsed / args.iterations * 1e6, 3),
+                decode_us=round(decode_elapsed / args.iterations * 1e6, 3),
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import json
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from server.utils import send_message
+
+
+def report(benchmark: str, **results) -> None:
+    print(json.dumps({"benchmark": benchmark, **results}), flush=True)
+
+
+def raise_fd_limit() -> int:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(*args: str, port: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "server", "--host", "127.0.0.1", "--port", str(port)]
+        + list(args),
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as probe:
+                send_message(probe, category="!DISCONNECT")
+            return process
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("server did not start listening")
+
+
+def rss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
@@ -0,0 +1,215 @@
+import argparse
+import contextlib
+import os
+import random
+import socket
+import threading
+import time
+
+from protocol.codec import JSON
+from protocol.framing import FrameReader
+from server.card import DECK
+from server.server import Server
+from server.utils import receive_message, send_message
+
+from .common import free_port, raise_fd_limit, report
+
+CATEGORIES = ("!MOVE", "!MOVE", "!MOVE", "!DRAW", "!SKIP", "!RESYNC")
+
+
+class ChaosClient:
+    conn: socket.socket
+    replies: FrameReader
+    received: int
+    drained: threading.Thread
+
+    def __init__(self, port: int):
+        self.conn = socket.create_connection(("127.0.0.1", port))
+        self.received = 0
+        self.replies = FrameReader(self.conn)
+
+    def request(self, **msg) -> dict:
+        send_message(self.conn, **msg)
+        return receive_message(self.replies)
+
+    def start_draining(self) -> None:
+        self.drained = threading.Thread(target=self.drain, daemon=True)
+        self.drained.start()
+
+    def drain(self) -> None:
+        try:
+            while receive_message(self.replies, JSON):
+                self.received += 1
+        except OSError:
+            pass
+
+    def send(self, **msg) -> None:
+        send_message(self.conn, **msg)
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError):
+            self.send(category="!DISCONNECT")
+        self.drained.join(timeout=5)
+        self.conn.close()
+
+
+def open_game(port: int, players: int) -> list[ChaosClient]:
+    host = ChaosClient(port)
+    game_id = host.request(category="!CREATE", username="host")["id_"]
+    clients = [host]
+    for seat in range(1, players):
+        guest = ChaosClient(port)
+        guest.request(category="!JOIN", id_=game_id, username=f"guest{seat}")
+        for client in clients:
+            receive_message(client.replies)
+        clients.append(guest)
+    for client in clients:
+        client.start_draining()
+    host.send(category="!START")
+    return clients
+
+
+def chaos(client: ChaosClient, messages: int, leave: float, seed: int) -> int:
+    rng = random.Random(seed)
+    for sent in range(messages):
+        if rng.random() < leave:
+            client.close()
+            return sent
+        category = rng.choice(CATEGORIES)
+        if category == "!MOVE":
+            client.send(
+                category=category,
+                card_index=rng.randrange(10),
+                uno_called=rng.random() < 0.9,
+                colour_change_to=rng.choice(("red", "blue", "green", "yellow")),
+            )
+        else:
+            client.send(category=category)
+    return messages
+
+
+def check_games(server: Server) -> list[str]:
+    problems = []
+    players = [*server.players_by_conn.values(), *server.detached.values()]
+    for actor in server.actors_by_game_id.values():
+        game = actor.game
+        owned = [player for player in players if player.game_id == game.id_]
+        cards = [*game.draw_pile, *game.discard_pile]
+        cards += [card.id_ for player in owned for card in player.hand]
+        if sorted(cards) != list(range(len(DECK))):
+            problems.append(f"{game.id_}: {len(cards)} cards, duplicates or gaps")
+        if game.players and not 0 <= game.turns.index < len(game.players):
+            problems.append(f"{game.id_}: turn index {game.turns.index}")
+        for player in game.players:
+            if player.conn is None:
+                registered = server.detached.get(player.token)
+            else:
+                registered = server.players_by_conn.get(player.conn)
+            if registered is not player:
+                problems.append(f"{game.id_}: {player.username} not registered")
+    return problems
+
+
+def actor_stats(server: Server) -> dict:
+    stats = [actor.stats() for actor in server.actors_by_game_id.values()]
+    processed = sum(stat["processed"] for stat in stats)
+    return {
+        "commands_per_batch": round(
+            processed / max(sum(stat["batches"] for stat in stats), 1), 3
+        ),
+        "mean_latency_us": round(
+            1e6
+            * sum(stat["mean_latency"] * stat["processed"] for stat in stats)
+            / max(processed, 1),
+            1,
+        ),
+        "max_latency_ms": round(
+            1e3 * max((stat["max_latency"] for stat in stats), default=0), 2
+        ),
+    }
+
+
+def wait_for(predicate, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def listening(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port)) as probe:
+            send_message(probe, category="!DISCONNECT")
+    except ConnectionRefusedError:
+        return False
+    return True
+
+
+def measure(server: Server, port: int, games: int, messages: int, seed: int) -> dict:
+    tables = [open_game(port, 4) for _ in range(games)]
+    clients = [client for table in tables for client in table]
+    wait_for(lambda: all(client.received for client in clients))
+
+    sent = [0] * len(clients)
+
+    def run(index: int) -> None:
+        sent[index] = chaos(clients[index], messages, 0.002, seed + index)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(clients))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    time.sleep(0.5)
+    problems = check_games(server)
+    stats = actor_stats(server)
+    for client in clients:
+        client.close()
+    drained = wait_for(
+        lambda: not len(server.players_by_conn)
+        and not len(server.actors_by_game_id)
+        and not len(server.sessions)
+    )
+
+    return {
+        "games": games,
+        "clients": len(clients),
+        "messages_per_second": round(sum(sent) / elapsed),
+        **stats,
+        "corrupted": problems,
+        "registries_drained": drained,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.concurrency")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--games", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    port = free_port()
+    server = Server(("127.0.0.1", port), resume_grace=1.0)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threading.Thread(target=server.start, daemon=True).start()
+        wait_for(lambda: listening(port))
+        results = [
+            measure(server, port, games, args.messages, args.seed)
+            for games in args.games
+        ]
+    for result in results:
+        report("concurrency", **result)
+        if result["corrupted"]:
+            raise SystemExit(f"corrupted games: {result['corrupted']}")
+        if not result["registries_drained"]:
+            raise SystemExit("registries not drained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import random
+import time
+from typing import Optional
+
+from server.card import DECK, PLUS_FOUR, PLUS_TWO, Card
+from server.game import Game, OutOfCardsException
+from server.player import Player
+from server.simulator import play_game
+
+from .common import report
+
+
+class LegacyGame(Game):
+    def draw_card(self) -> Card:
+        try:
+            return DECK[self.draw_pile.pop()]
+        except IndexError:
+            if self.discard_pile:
+                self.rng.shuffle(self.discard_pile)
+                self.draw_pile.extend(self.discard_pile)
+                self.discard_pile = bytearray()
+                return self.draw_card()
+            raise OutOfCardsException()
+
+    def draw_cards(self, count: int) -> list[Card]:
+        cards = []
+        try:
+            for _ in range(count):
+                cards.append(self.draw_card())
+        except OutOfCardsException:
+            pass
+        return cards
+
+    def start(self) -> None:
+        self.in_progress = True
+        self.rng.shuffle(self.draw_pile)
+        for player in self.players:
+            for _ in range(7):
+                player.give_card(self.draw_card())
+        while DECK[self.draw_pile[-1]].flags:
+            self.rng.shuffle(self.draw_pile)
+        first_card = DECK[self.draw_pile.pop()]
+        self.discard_pile.append(first_card.id_)
+        self.current_colour = first_card.colour
+        self.current_number = first_card.number
+        self.current_effects = first_card.effects
+        self.update_playable()
+        self.current_plus_amount = 0
+        self.turns.reset()
+        self.seq += 1
+
+
+IMPLEMENTATIONS = {"legacy": LegacyGame, "bulk": Game}
+
+
+def plus_first(
+    game: Game, player: Player, legal_moves: list[int], rng: random.Random
+) -> Optional[int]:
+    for index in legal_moves:
+        if player.hand[index].flags & (PLUS_TWO | PLUS_FOUR):
+            return index
+    return legal_moves[0] if legal_moves else None
+
+
+def seated(game_class: type, seed: int) -> Game:
+    game = game_class(str(seed), seed)
+    for seat in range(4):
+        game.add_player(Player(f"bot#{seat:04}", None, seat == 0, game.id_))
+    return game
+
+
+def measure_start(game_class: type, games: int, seed: int) -> float:
+    tables = [seated(game_class, seed + index) for index in range(games)]
+    start = time.perf_counter()
+    for game in tables:
+        game.start()
+    return (time.perf_counter() - start) / games
+
+
+def measure_penalty(game_class: type, count: int, draws: int, seed: int) -> float:
+    game = seated(game_class, seed)
+    game.start()
+    cards = bytes(game.draw_pile)
+    elapsed = 0.0
+    for _ in range(draws):
+        game.draw_pile = bytearray(cards[:2])
+        game.discard_pile = bytearray(cards[2:42])
+        start = time.perf_counter()
+        game.draw_cards(count)
+        elapsed += time.perf_counter() - start
+    return elapsed / draws
+
+
+def measure_games(game_class: type, games: int, seed: int, draw_pile: int) -> dict:
+    start = time.perf_counter()
+    turns = plays = 0
+    for game_seed in range(seed, seed + games):
+        game = seated(game_class, game_seed)
+        game.start()
+        buried = len(game.draw_pile) - draw_pile
+        game.discard_pile[:0] = game.draw_pile[:buried]
+        del game.draw_pile[:buried]
+        result = play_game(game, [plus_first] * 4, random.Random(game_seed))
+        turns += result.turns
+        plays += result.plays
+    elapsed = time.perf_counter() - start
+    return {
+        "games_per_second": round(games / elapsed, 1),
+        "mean_turns": round(turns / games, 2),
+        "mean_plays": round(plays / games, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.draws")
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--draws", type=int, default=50000)
+    parser.add_argument(
+        "--draw-pile",
+        type=int,
+        default=3,
+        help="cards left in the draw pile after dealing; the rest start discarded",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def best(measure, *params) -> float:
+        return round(min(measure(*params) for _ in range(args.repeat)) * 1e6, 3)
+
+    for name, game_class in IMPLEMENTATIONS.items():
+        report(
+            "draws",
+            implementation=name,
+            start_us=best(measure_start, game_class, args.games, args.seed),
+            **{
+                f"draw_{count}_us": best(
+                    measure_penalty, game_class, count, args.draws, args.seed
+                )
+                for count in (2, 4, 7)
+            },
+            **measure_games(game_class, args.games, args.seed, args.draw_pile),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from server import events
+from server.eventlog import SEGMENT_BYTES, EventLog
+from server.game import Game, OutOfCardsException
+from server.player import Player
+from server.simulator import best_colour
+
+from .common import report
+
+
+def open_games(log: EventLog, count: int, players: int, seed: int) -> list[Game]:
+    games = []
+    for index in range(count):
+        game_id = f"{seed + index:06d}"
+        game = events.new_game(game_id, seed + index, "host#0000")
+        log.record(game, events.created(game_id, game.seed, "host#0000"))
+        for seat in range(1, players):
+            username = f"guest#{seat:04d}"
+            game.add_player(Player(username, None, False, game_id))
+            log.record(game, events.joined(game_id, username))
+        game.start()
+        log.record(game, events.started(game_id))
+        games.append(game)
+    return games
+
+
+def take_turn(log: EventLog, game: Game, rng: random.Random) -> None:
+    player = game.current_turn
+    seat = game.players.index(player)
+    legal = game.legal_moves(player)
+    if legal and rng.random() < 0.4:
+        index = min(legal, key=lambda index: player.hand[index].id_)
+        colour = best_colour(player)
+        status = game.update(player, index, True, colour)["status"]
+        log.record(game, events.played(game.id_, index, True, colour))
+        if status == "win":
+            game.players.clear()
+            log.record(game, events.ended(game.id_))
+        return
+
+    try:
+        player.give_card(game.draw_card())
+    except OutOfCardsException:
+        pass
+    else:
+        player.drew_from_pile = True
+        log.record(game, events.drew(game.id_, seat))
+    game.skip_turn()
+    player.drew_from_pile = False
+    log.record(game, events.skipped(game.id_, seat))
+
+
+def drive(log: EventLog, games: list[Game], turns: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(turns):
+        for game in games:
+            if game.players:
+                take_turn(log, game, rng)
+
+
+def log_bytes(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory))
+
+
+def measure(
+    games: int,
+    turns: int,
+    writers: int,
+    snapshot_every: int,
+    segment_bytes: int,
+    seed: int,
+) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        log = EventLog(directory, segment_bytes, snapshot_every or 1 << 30)
+        log.recover()
+        tables = open_games(log, games, 4, seed)
+        threads = [
+            threading.Thread(
+                target=drive, args=(log, tables[writer::writers], turns, seed + writer)
+            )
+            for writer in range(writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.sync()
+        elapsed = time.perf_counter() - start
+        written = log.stats()
+        log.close()
+        size = log_bytes(directory)
+
+        live = {game.id_: events.pack_game(game) for game in tables if game.players}
+        recovering = EventLog(directory)
+        start = time.perf_counter()
+        recovered = recovering.recover()
+        recovery = time.perf_counter() - start
+        recovering.close()
+
+    return {
+        "games": games,
+        "turns": turns,
+        "writers": writers,
+        "snapshot_every": snapshot_every,
+        "records_per_second": round(written["records"] / elapsed),
+        "records_per_commit": round(written["records_per_commit"], 1),
+        "log_kib": size >> 10,
+        "recovered_games": len(recovered),
+        "recovery_ms": round(recovery * 1000, 1),
+        "recovered_intact": live
+        == {game.id_: events.pack_game(game) for game in recovered},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.eventlog")
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--turns", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        nargs="+",
+        default=[64, 0],
+        help="events between snapshots of a game; 0 snapshots only on rotation",
+    )
+    parser.add_argument("--segment-bytes", type=int, default=SEGMENT_BYTES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for snapshot_every in args.snapshot_every:
+        for turns in args.turns:
+            results = measure(
+                args.games,
+                turns,
+                args.writers,
+                snapshot_every,
+                args.segment_bytes,
+                args.seed,
+            )
+            report("eventlog", **results)
+            if not results["recovered_intact"]:
+                raise SystemExit("recovered games differ")
+
+
+if __name__ == "__main__":
+    main()
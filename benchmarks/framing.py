@@ -0,0 +1,121 @@
+import argparse
+import json
+import socket
+import time
+
+from protocol.framing import FrameReader
+from server.card import card_list_json, get_fresh_deck
+from server.utils import receive_message, send_message
+
+from .common import report
+
+LEGACY_HEADER = 64
+
+
+class CountingSocket:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.syscalls = 0
+        self.bytes_sent = 0
+
+    def send(self, data) -> int:
+        self.syscalls += 1
+        sent = self.sock.send(data)
+        self.bytes_sent += sent
+        return sent
+
+    def sendall(self, data) -> None:
+        self.syscalls += 1
+        self.sock.sendall(data)
+        self.bytes_sent += len(data)
+
+    def sendmsg(self, buffers) -> int:
+        self.syscalls += 1
+        sent = self.sock.sendmsg(buffers)
+        self.bytes_sent += sent
+        return sent
+
+    def recv(self, size: int) -> bytes:
+        self.syscalls += 1
+        return self.sock.recv(size)
+
+    def recv_into(self, buffer) -> int:
+        self.syscalls += 1
+        return self.sock.recv_into(buffer)
+
+
+def legacy_send_message(conn, **msg) -> None:
+    message = json.dumps(msg).encode()
+    send_length = str(len(message)).encode()
+    send_length += b" " * (LEGACY_HEADER - len(send_length))
+    conn.send(send_length)
+    conn.send(message)
+
+
+def legacy_receive_message(conn) -> dict:
+    msg_length = conn.recv(LEGACY_HEADER).decode()
+    return json.loads(conn.recv(int(msg_length)).decode())
+
+
+def run(name: str, hand_size: int, messages: int, send, receive, make_reader) -> dict:
+    left, right = socket.socketpair()
+    sender, receiver = CountingSocket(left), CountingSocket(right)
+    reader = make_reader(receiver)
+    msg = {
+        "category": "!MOVE",
+        "player": "player#0000",
+        "is_turn": True,
+        "hand": card_list_json((get_fresh_deck() * 2)[:hand_size]),
+        "status": "ok",
+    }
+
+    start = time.perf_counter()
+    for _ in range(messages):
+        send(sender, **msg)
+        receive(reader)
+    elapsed = time.perf_counter() - start
+    left.close()
+    right.close()
+
+    return {
+        "framing": name,
+        "hand_size": hand_size,
+        "bytes_per_message": sender.bytes_sent / messages,
+        "send_syscalls_per_message": sender.syscalls / messages,
+        "recv_syscalls_per_message": receiver.syscalls / messages,
+        "round_trip_us": round(elapsed / messages * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.framing")
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    for hand_size in (7, 30):
+        report(
+            "framing",
+            **run(
+                "legacy",
+                hand_size,
+                args.messages,
+                legacy_send_message,
+                legacy_receive_message,
+                lambda conn: conn,
+            ),
+        )
+        report(
+            "framing",
+            **run(
+                "binary_prefix",
+                hand_size,
+                args.messages,
+                send_message,
+                receive_message,
+                FrameReader,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from server.game import Game, OutOfCardsException
+from server.player import Player
+
+from .common import report
+
+COLOURS = ("red", "blue", "green", "yellow")
+
+
+def new_game(players: int) -> Game:
+    game = Game("000000")
+    for i in range(players):
+        game.add_player(Player(f"player#{i:04}", None, i == 0, game.id_))
+    game.start()
+    return game
+
+
+def play_turn(game: Game, rng: random.Random) -> str:
+    player = game.current_turn
+    legal_moves = game.legal_moves(player)
+    if not legal_moves:
+        player.give_card(game.draw_card())
+        game.skip_turn()
+        return "drew"
+    colour = rng.choice(COLOURS)
+    return game.update(player, legal_moves[0], True, colour)["status"]
+
+
+def measure_memory(games: int, players: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    resident = [new_game(players) for _ in range(games)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del resident
+    return (after - before) / games
+
+
+def measure_plays(plays: int, players: int, seed: int) -> float:
+    random.seed(seed)
+    rng = random.Random(seed)
+    game = new_game(players)
+    played = 0
+    start = time.perf_counter()
+    while played < plays:
+        try:
+            status = play_turn(game, rng)
+        except OutOfCardsException:
+            status = "win"
+        played += status != "drew"
+        if status == "win":
+            game = new_game(players)
+    return plays / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.game_engine")
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--plays", type=int, default=200000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report(
+        "game_engine",
+        players=args.players,
+        bytes_per_resident_game=round(measure_memory(args.games, args.players)),
+        plays_per_second=round(measure_plays(args.plays, args.players, args.seed)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import collections
+import random
+import time
+
+from server.card import DECK, Card, playable_mask_for
+from server.hand import Hand
+
+from .common import report
+
+COLOURS = ("red", "blue", "green", "yellow")
+
+
+class LegacyHand(list):
+    def playable_indices(self, playable: int) -> list[int]:
+        return [index for index, card in enumerate(self) if playable >> card.id_ & 1]
+
+    def has_playable(self, playable: int) -> bool:
+        return any(playable >> card.id_ & 1 for card in self)
+
+    def remove_at(self, index: int) -> Card:
+        card = self[index]
+        self.remove(card)
+        return card
+
+    def colour_counts(self) -> dict[str, int]:
+        counts = collections.Counter(card.colour for card in self)
+        return {colour: counts[colour] for colour in COLOURS}
+
+
+class IndexedHand(Hand):
+    def remove_at(self, index: int) -> Card:
+        return self.pop(index)
+
+
+IMPLEMENTATIONS = {"legacy": LegacyHand, "indexed": IndexedHand}
+
+
+def fixtures(hand_size: int, count: int, seed: int) -> list[tuple[list[Card], int]]:
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        cards = rng.sample(DECK, hand_size + 1)
+        top = cards.pop()
+        playable = playable_mask_for(
+            top.colour or rng.choice(COLOURS), top.number, top.effects
+        )
+        cases.append((cards, playable))
+    return cases
+
+
+def measure(hand_class: type, cases: list, turns: int) -> dict[str, float]:
+    hands = [(hand_class(cards), playable) for cards, playable in cases]
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        for hand, playable in hands:
+            hand.has_playable(playable)
+    timings["has_playable_us"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        for hand, playable in hands:
+            hand.playable_indices(playable)
+    timings["legal_moves_us"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        for hand, _ in hands:
+            hand.colour_counts()
+    timings["colour_counts_us"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for hand, _ in hands:
+        while hand:
+            hand.remove_at(len(hand) // 2)
+    timings["remove_us"] = (time.perf_counter() - start) / len(cases[0][0])
+
+    return {
+        name: elapsed / (len(hands) * (1 if name == "remove_us" else turns))
+        for name, elapsed in timings.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.hand")
+    parser.add_argument("--hands", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for hand_size in (7, 20, 40, 80):
+        cases = fixtures(hand_size, args.hands, args.seed)
+        for name, hand_class in IMPLEMENTATIONS.items():
+            runs = [measure(hand_class, cases, args.turns) for _ in range(args.repeat)]
+            report(
+                "hand",
+                implementation=name,
+                hand_size=hand_size,
+                **{
+                    field: round(min(run[field] for run in runs) * 1e6, 3)
+                    for field in runs[0]
+                },
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import random
+import time
+from typing import Callable
+
+from server.card import (
+    COLOUR_CHANGE,
+    DECK,
+    PLUS_FOUR,
+    PLUS_TWO,
+    REVERSE,
+    SKIP,
+    card_list_json,
+)
+from server.game import Game
+from server.player import Player
+
+from .common import report
+
+COLOURS = ("red", "blue", "green", "yellow")
+BATCH = 1000
+
+MIXES: dict[str, Callable[[int], bool]] = {
+    "numbers": lambda flags: not flags,
+    "actions": lambda flags: bool(flags & (SKIP | REVERSE | PLUS_TWO)),
+    "wilds": lambda flags: bool(flags & (COLOUR_CHANGE | PLUS_FOUR)),
+    "mixed": lambda flags: True,
+}
+
+
+def new_game(seed: int, players: int = 4) -> Game:
+    game = Game(f"{seed % 1000000:06d}", seed)
+    for i in range(players):
+        game.add_player(Player(f"player#{i:04}", None, i == 0, game.id_))
+    return game
+
+
+def measure_start(rounds: int, seed: int) -> float:
+    games = [new_game(seed + index) for index in range(rounds)]
+    start = time.perf_counter()
+    for game in games:
+        game.start()
+    return (time.perf_counter() - start) / rounds
+
+
+def update_fixtures(mix: str, penalty: int, rng: random.Random) -> list:
+    cards = [card for card in DECK if MIXES[mix](card.flags)]
+    fixtures = []
+    for _ in range(BATCH):
+        game = new_game(rng.getrandbits(32))
+        game.start()
+        card = rng.choice(cards)
+        player = game.current_turn
+        others = [other for other in player.hand.clear() if other is not card]
+        player.give_cards([card, *others[:6]])
+        game.current_colour = card.colour or rng.choice(COLOURS)
+        game.current_number = card.number
+        game.current_effects = ()
+        game.update_playable()
+        game.current_plus_amount = penalty
+        fixtures.append((game, player, rng.choice(COLOURS)))
+    return fixtures
+
+
+def measure_update(mix: str, penalty: int, updates: int, seed: int) -> float:
+    rng = random.Random(seed)
+    elapsed = 0.0
+    for _ in range(max(updates // BATCH, 1)):
+        fixtures = update_fixtures(mix, penalty, rng)
+        start = time.perf_counter()
+        for game, player, colour in fixtures:
+            game.update(player, 0, True, colour)
+        elapsed += time.perf_counter() - start
+    return elapsed / (max(updates // BATCH, 1) * BATCH)
+
+
+def measure_draws(discarded: int, draws: int, seed: int) -> float:
+    game = new_game(seed)
+    game.start()
+    ids = bytearray(range(discarded))
+    rounds = max(draws // (discarded - 1), 1)
+    elapsed = 0.0
+    for _ in range(rounds):
+        game.draw_pile = bytearray()
+        game.discard_pile = bytearray(ids)
+        start = time.perf_counter()
+        for _ in range(discarded - 1):
+            game.draw_card()
+        elapsed += time.perf_counter() - start
+    return elapsed / (rounds * (discarded - 1))
+
+
+def measure_hand_json(hand_size: int, iterations: int, seed: int) -> float:
+    player = Player("player#0000", None, True, "000000")
+    rng = random.Random(seed)
+    for _ in range(hand_size):
+        player.give_card(rng.choice(DECK))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        player.hand_json()
+    return (time.perf_counter() - start) / iterations
+
+
+def measure_card_list_json(hand_size: int, iterations: int, seed: int) -> float:
+    cards = random.Random(seed).sample(DECK, hand_size)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        card_list_json(cards)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.hot_paths")
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument(
+        "--updates", type=int, default=5000, help="fresh game fixtures per update mix"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def run(path: str, measure: Callable[..., float], *params, **config) -> None:
+        seconds = min(measure(*params) for _ in range(args.repeat))
+        report("hot_paths", path=path, **config, us=round(seconds * 1e6, 3))
+
+    run("game_start", measure_start, args.rounds, args.seed)
+    for mix in MIXES:
+        for penalty in (0, 4) if mix == "numbers" else (0,):
+            run(
+                "game_update",
+                measure_update,
+                mix,
+                penalty,
+                args.updates,
+                args.seed,
+                mix=mix,
+                penalty=penalty,
+            )
+    for discarded in (8, 32, 100):
+        run(
+            "draw_card",
+            measure_draws,
+            discarded,
+            args.rounds,
+            args.seed,
+            discarded=discarded,
+        )
+    for hand_size in (7, 30):
+        run(
+            "card_list_json",
+            measure_card_list_json,
+            hand_size,
+            args.rounds,
+            args.seed,
+            hand_size=hand_size,
+        )
+        run(
+            "hand_json",
+            measure_hand_json,
+            hand_size,
+            args.rounds,
+            args.seed,
+            hand_size=hand_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
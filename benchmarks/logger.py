@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+from server.async_server import AsyncServer
+from server.logger import Logger
+from server.server import Server
+
+from .common import free_port, raise_fd_limit, report
+from .concurrency import listening, wait_for
+from .sharding import play_game
+
+ENGINES = {"threaded": Server, "asyncio": AsyncServer}
+
+
+class NullLogger(Logger):
+    def __call__(self, event: str, **fields) -> None:
+        pass
+
+
+class PrintLogger(Logger):
+    def __call__(self, event: str, **fields) -> None:
+        record = {"time": round(time.time(), 6), "event": event, **fields}
+        with self.lock:
+            print(json.dumps(record, default=str), file=self.stream, flush=True)
+            self.written += 1
+
+
+def new_logger(mode: str, path: str) -> Logger:
+    if mode == "off":
+        return NullLogger(os.devnull)
+    if mode == "print":
+        return PrintLogger(path)
+    return Logger(path, debug=mode == "debug")
+
+
+def measure(engine: str, mode: str, games: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "server.log")
+        port = free_port()
+        server = ENGINES[engine](("127.0.0.1", port))
+        server.log = new_logger(mode, path)
+        threading.Thread(target=server.start, daemon=True).start()
+        wait_for(lambda: listening(port))
+
+        async def play() -> list:
+            return await asyncio.gather(*(play_game(port) for _ in range(games)))
+
+        start = time.perf_counter()
+        results = asyncio.run(play())
+        elapsed = time.perf_counter() - start
+        server.log.flush()
+
+    return {
+        "engine": engine,
+        "logging": mode,
+        "games": games,
+        "moves_per_second": round(sum(moves for _, moves in results) / elapsed),
+        "lines": server.log.written,
+        "dropped": server.log.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.logger")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="report the fastest of this many runs"
+    )
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    for engine in ENGINES:
+        for mode in ("off", "print", "sampled", "debug"):
+            runs = [measure(engine, mode, args.games) for _ in range(args.repeat)]
+            report("logger", **max(runs, key=lambda run: run["moves_per_second"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import time
+import urllib.request
+
+from server.async_server import AsyncServer
+from server.metrics import Metrics, Recorder
+from server.server import Server
+
+from .common import free_port, raise_fd_limit, report
+from .concurrency import listening, wait_for
+from .sharding import play_game
+
+ENGINES = {"threaded": Server, "asyncio": AsyncServer}
+
+
+class NullRecorder(Recorder):
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, value: float) -> None:
+        pass
+
+
+class NullMetrics(Metrics):
+    def recorder(self) -> Recorder:
+        return NULL_RECORDER
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def observe(self, name: str, value: float) -> None:
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+def call_cost(calls: int) -> dict:
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(calls):
+        metrics.count("messages_in.PlayCard")
+    counted = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        metrics.observe("handle_seconds.PlayCard", 2.5e-5)
+    observed = time.perf_counter() - start
+    return {
+        "count_ns": round(counted / calls * 1e9),
+        "observe_ns": round(observed / calls * 1e9),
+    }
+
+
+def scrape(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        return json.load(response)
+
+
+def measure(engine: str, enabled: bool, games: int) -> dict:
+    port, metrics_port = free_port(), free_port()
+    server = ENGINES[engine](("127.0.0.1", port), metrics_port=metrics_port)
+    if not enabled:
+        server.metrics = NullMetrics()
+    threading.Thread(target=server.start, daemon=True).start()
+    wait_for(lambda: listening(port))
+
+    async def play() -> list:
+        return await asyncio.gather(*(play_game(port) for _ in range(games)))
+
+    start = time.perf_counter()
+    results = asyncio.run(play())
+    elapsed = time.perf_counter() - start
+    moves = sum(moves for _, moves in results)
+
+    start = time.perf_counter()
+    snapshot = scrape(metrics_port)
+    scraped = time.perf_counter() - start
+
+    result = {
+        "engine": engine,
+        "metrics": enabled,
+        "games": games,
+        "moves_per_second": round(moves / elapsed),
+        "scrape_ms": round(scraped * 1000, 2),
+    }
+    if enabled:
+        handled = snapshot["histograms"]["handle_seconds.PlayCard"]
+        result |= {
+            "moves_counted": snapshot["counters"]["messages_in.PlayCard"] == moves,
+            "play_p99_us": round(handled["p99"] * 1e6, 1),
+            "game_update_p99_us": round(
+                snapshot["histograms"]["game_update_seconds"]["p99"] * 1e6, 1
+            ),
+            "bytes_out_per_move": round(snapshot["counters"]["bytes_out"] / moves),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.metrics")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    report("metrics", **call_cost(args.calls))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = [
+            measure(engine, enabled, args.games)
+            for engine in ENGINES
+            for enabled in (False, True)
+        ]
+    for result in results:
+        report("metrics", **result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import contextlib
+import math
+import os
+import socket
+import threading
+import time
+
+from protocol.framing import FrameReader
+from server.async_server import AsyncServer
+from server.server import Server
+from server.utils import receive_message, send_message
+
+from .common import free_port, raise_fd_limit, report
+from .concurrency import listening, wait_for
+
+ENGINES = {"threaded": Server, "asyncio": AsyncServer}
+
+
+def request(conn: socket.socket, reader: FrameReader, **msg) -> dict:
+    send_message(conn, **msg)
+    return receive_message(reader)
+
+
+def abandon_game(port: int) -> list[socket.socket]:
+    host = socket.create_connection(("127.0.0.1", port))
+    guest = socket.create_connection(("127.0.0.1", port))
+    host_reader, guest_reader = FrameReader(host), FrameReader(guest)
+    game_id = request(host, host_reader, category="!CREATE", username="host")["id_"]
+    request(guest, guest_reader, category="!JOIN", id_=game_id, username="guest")
+    receive_message(host_reader)
+    send_message(host, category="!START")
+    return [host, guest]
+
+
+def footprint(server: Server) -> dict:
+    return {
+        "threads": threading.active_count(),
+        "connections": len(server.outboxes),
+        "players": len(server.players_by_conn) + len(server.detached),
+        "games": len(server.actors_by_game_id),
+    }
+
+
+def measure(engine: str, reaping: bool, rounds: int, games: int, idle: int) -> dict:
+    port = free_port()
+    interval = 0.25 if reaping else math.inf
+    server = ENGINES[engine](
+        ("127.0.0.1", port),
+        resume_grace=0.5,
+        heartbeat_interval=interval,
+        idle_timeout=3 * interval,
+    )
+    threading.Thread(target=server.start, daemon=True).start()
+    wait_for(lambda: listening(port))
+    baseline = threading.active_count()
+
+    sockets = []
+    peak = footprint(server)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _ in range(games):
+            sockets.extend(abandon_game(port))
+        for _ in range(idle):
+            sockets.append(socket.create_connection(("127.0.0.1", port)))
+        time.sleep(0.5)
+        peak = {key: max(peak[key], value) for key, value in footprint(server).items()}
+    drained = wait_for(lambda: not len(server.outboxes) and not len(server.detached))
+    elapsed = time.perf_counter() - start
+    remaining = footprint(server)
+
+    for conn in sockets:
+        conn.close()
+    return {
+        "engine": engine,
+        "reaping": reaping,
+        "rounds": rounds,
+        "abandoned_connections": len(sockets),
+        "reaped": server.reaped,
+        "peak_connections": peak["connections"],
+        "peak_threads": peak["threads"] - baseline,
+        "remaining_connections": remaining["connections"],
+        "remaining_players": remaining["players"],
+        "remaining_games": remaining["games"],
+        "leaked_threads": remaining["threads"] - baseline,
+        "drained": drained,
+        "seconds": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.reaper")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--games", type=int, default=20, help="abandoned per round")
+    parser.add_argument("--idle", type=int, default=20, help="silent sockets per round")
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = [
+            measure(engine, reaping, args.rounds, args.games, args.idle)
+            for engine in ENGINES
+            for reaping in (False, True)
+        ]
+    for result in results:
+        report("reaper", **result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from server.replay import replay_files
+from server.simulator import simulate_batch
+
+from .common import report
+
+
+def record_corpus(path: str, games: int, seed: int) -> list:
+    results, records = simulate_batch(seed, games, ["random"] * 4, recording=True)
+    with open(path, "wb") as file:
+        file.write(records)
+    return [result.winner for result in results]
+
+
+def measure(games: int, seed: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.uno")
+        expected = record_corpus(path, games, seed)
+
+        start = time.perf_counter()
+        replayed = list(replay_files([path]))
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for _ in replay_files([path]):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        corpus = os.path.getsize(path)
+
+    winners = [
+        None if result.winner is None else int(result.winner[-4:])
+        for result in replayed
+    ]
+    records = sum(result.events for result in replayed)
+    return {
+        "games": games,
+        "corpus_kib": corpus >> 10,
+        "bytes_per_game": round(corpus / games),
+        "games_per_second": round(games / elapsed),
+        "records_per_second": round(records / elapsed),
+        "peak_memory_kib": peak >> 10,
+        "matches_simulation": winners == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.replay")
+    parser.add_argument("--games", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for games in args.games:
+        results = measure(games, args.seed)
+        report("replay", **results)
+        if not results["matches_simulation"]:
+            raise SystemExit("replayed winners differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from client.utils import card_from_wire
+from protocol.codec import CODECS
+
+from .common import free_port, raise_fd_limit, report, spawn_server
+from .sharding import Bot
+
+
+class FlappingBot(Bot):
+    token: str
+    rng: random.Random
+    flap_rate: float
+    resume_latencies: list[float]
+    hands_intact: bool
+
+    async def flap(self, port: int) -> None:
+        hand = [card["id_"] for card in self.hand]
+        self.writer.transport.abort()
+
+        start = time.perf_counter()
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        self.codec = CODECS["json"]
+        self.send(category="!HELLO", codecs=list(CODECS))
+        self.codec = CODECS[(await self.receive())["codec"]]
+        self.send(category="!RESUME", token=self.token)
+        msg = await self.receive()
+        self.resume_latencies.append(time.perf_counter() - start)
+
+        self.apply(msg)
+        self.hands_intact &= [card["id_"] for card in self.hand] == hand
+
+    async def play(self, port: int) -> int:
+        moves = 0
+        while True:
+            if self.is_turn and self.rng.random() < self.flap_rate:
+                await self.flap(port)
+            if self.is_turn:
+                index = self.legal_move()
+                if index is None:
+                    self.send(category="!DRAW")
+                    self.hand.append(card_from_wire((await self.receive())["card"]))
+                    self.send(category="!SKIP")
+                else:
+                    effects = self.hand[index]["effects"]
+                    self.send(
+                        category="!MOVE",
+                        card_index=index,
+                        uno_called=True,
+                        colour_change_to="red" if "colour change" in effects else None,
+                    )
+                    moves += 1
+
+            msg = await self.receive()
+            if msg["category"] == "!SKIP":
+                self.is_turn = msg["is_turn"]
+            elif msg["category"] == "!MOVE":
+                self.apply(msg)
+                if msg["status"] == "win":
+                    return moves
+
+
+async def seat(port: int, flap_rate: float, seed: int) -> FlappingBot:
+    bot = await FlappingBot.connect(port)
+    bot.rng = random.Random(seed)
+    bot.flap_rate = flap_rate
+    bot.resume_latencies = []
+    bot.hands_intact = True
+    return bot
+
+
+async def play_game(port: int, flap_rate: float, seed: int) -> list[FlappingBot]:
+    host = await seat(port, flap_rate, seed)
+    guest = await seat(port, flap_rate, seed + 1)
+    host.send(category="!CREATE", username="host")
+    created = await host.receive()
+    host.token = created["token"]
+    guest.send(category="!JOIN", id_=created["id_"], username="guest")
+    guest.token = (await guest.receive())["token"]
+    await host.receive()
+
+    host.send(category="!START")
+    for bot in (host, guest):
+        bot.apply(await bot.receive())
+    await asyncio.gather(host.play(port), guest.play(port))
+    await asyncio.gather(host.close(), guest.close())
+    return [host, guest]
+
+
+async def measure(engine: str, games: int, flap_rate: float, seed: int) -> dict:
+    port = free_port()
+    process = spawn_server("--engine", engine, port=port)
+    try:
+        start = time.perf_counter()
+        tables = await asyncio.gather(
+            *(play_game(port, flap_rate, seed + 2 * game) for game in range(games))
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+    bots = [bot for table in tables for bot in table]
+    latencies = sorted(latency for bot in bots for latency in bot.resume_latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "engine": engine,
+        "games": games,
+        "flap_rate": flap_rate,
+        "flaps": len(latencies),
+        "games_per_second": round(games / elapsed, 1),
+        "resume_p50_ms": round(quantiles[49] * 1000, 2) if quantiles else None,
+        "resume_p99_ms": round(quantiles[98] * 1000, 2) if quantiles else None,
+        "hands_intact": all(bot.hands_intact for bot in bots),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.resume")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--flap-rate", type=float, nargs="+", default=[0.0, 0.05, 0.2])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    for engine in ("threaded", "asyncio"):
+        for flap_rate in args.flap_rate:
+            results = asyncio.run(measure(engine, args.games, flap_rate, args.seed))
+            report("resume", **results)
+            if not results["hands_intact"]:
+                raise SystemExit("hands changed across a resume")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import time
+
+from protocol.codec import JSON
+from protocol.framing import PREFIX, frame_buffers
+
+from .common import free_port, raise_fd_limit, report, rss_kib, spawn_server
+
+PROBE = b"".join(frame_buffers(JSON.encode({"category": "!JOIN", "id_": "-"})))
+DISCONNECT = b"".join(frame_buffers(JSON.encode({"category": "!DISCONNECT"})))
+
+
+async def receive(reader: asyncio.StreamReader) -> dict:
+    msg_length, split = PREFIX.unpack(await reader.readexactly(PREFIX.size))
+    return JSON.decode_frame(await reader.readexactly(msg_length), split)
+
+
+async def hold_idle_connections(port: int, count: int) -> list:
+    connections = []
+    for _ in range(count):
+        try:
+            connections.append(await asyncio.open_connection("127.0.0.1", port))
+        except OSError:
+            break
+    return connections
+
+
+async def close_connections(connections: list) -> None:
+    for _, writer in connections:
+        writer.write(DISCONNECT)
+        writer.close()
+    await asyncio.gather(
+        *(writer.wait_closed() for _, writer in connections), return_exceptions=True
+    )
+
+
+async def request_loop(port: int, messages: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for _ in range(messages):
+        writer.write(PROBE)
+        await receive(reader)
+    await close_connections([(reader, writer)])
+
+
+async def measure(engine: str, idle: int, clients: int, messages: int) -> dict:
+    port = free_port()
+    process = spawn_server("--engine", engine, port=port)
+    try:
+        baseline_rss = rss_kib(process.pid)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request_loop(port, messages) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+        connections = await hold_idle_connections(port, idle)
+        await asyncio.sleep(1)
+        idle_rss = rss_kib(process.pid)
+        await close_connections(connections)
+    finally:
+        process.kill()
+        process.wait()
+
+    return {
+        "engine": engine,
+        "messages_per_second": round(clients * messages / elapsed),
+        "idle_connections": len(connections),
+        "rss_kib_per_connection": round(
+            (idle_rss - baseline_rss) / max(len(connections), 1), 2
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.server_engines")
+    parser.add_argument("--idle", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    for engine in ("threaded", "asyncio"):
+        results = asyncio.run(measure(engine, args.idle, args.clients, args.messages))
+        report("server_engines", **results)
+
+
+if __name__ == "__main__":
+    main()
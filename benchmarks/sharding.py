@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import os
+import time
+
+from client.utils import card_from_wire
+from protocol.cards import playable_mask
+from protocol.codec import CODECS, JSON, Codec
+from protocol.framing import PREFIX, frame_buffers
+
+from .common import free_port, raise_fd_limit, report, spawn_server
+
+
+class Bot:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    codec: Codec
+    hand: list[dict]
+    state: tuple
+    is_turn: bool
+
+    @classmethod
+    async def connect(cls, port: int) -> "Bot":
+        bot = cls()
+        bot.reader, bot.writer = await asyncio.open_connection("127.0.0.1", port)
+        bot.codec = JSON
+        bot.send(category="!HELLO", codecs=list(CODECS))
+        bot.codec = CODECS[(await bot.receive())["codec"]]
+        return bot
+
+    def send(self, **msg) -> None:
+        self.writer.write(b"".join(frame_buffers(self.codec.encode(msg))))
+
+    async def receive(self) -> dict:
+        while True:
+            length, split = PREFIX.unpack(await self.reader.readexactly(PREFIX.size))
+            payload = await self.reader.readexactly(length)
+            msg = self.codec.decode_frame(payload, split)
+            if msg.get("category") != "!PING":
+                return msg
+            self.send(category="!PONG")
+
+    def apply(self, msg: dict) -> None:
+        if "hand" in msg:
+            self.hand = [card_from_wire(card) for card in msg["hand"]]
+        if "removed" in msg:
+            self.hand.pop(msg["removed"])
+            self.hand.extend(card_from_wire(card) for card in msg["added"])
+        self.state = (
+            msg["current_colour"],
+            msg["current_number"],
+            tuple(msg["current_effects"]),
+        )
+        self.is_turn = msg["is_turn"]
+
+    def legal_move(self):
+        playable = playable_mask(*self.state)
+        for index, card in enumerate(self.hand):
+            if playable >> card["id_"] & 1:
+                return index
+        return None
+
+    async def play(self) -> int:
+        moves = 0
+        while True:
+            if self.is_turn:
+                index = self.legal_move()
+                if index is None:
+                    self.send(category="!DRAW")
+                    self.hand.append(card_from_wire((await self.receive())["card"]))
+                    self.send(category="!SKIP")
+                else:
+                    effects = self.hand[index]["effects"]
+                    self.send(
+                        category="!MOVE",
+                        card_index=index,
+                        uno_called=True,
+                        colour_change_to="red" if "colour change" in effects else None,
+                    )
+                    moves += 1
+
+            msg = await self.receive()
+            if msg["category"] == "!SKIP":
+                self.is_turn = msg["is_turn"]
+            elif msg["category"] == "!MOVE":
+                self.apply(msg)
+                if msg["status"] == "win":
+                    return moves
+
+    async def close(self) -> None:
+        self.send(category="!DISCONNECT")
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def expect(bot: Bot, **fields) -> dict:
+    msg = await bot.receive()
+    if any(msg.get(field) != value for field, value in fields.items()):
+        raise RuntimeError(f"expected {fields}, got {msg}")
+    return msg
+
+
+async def play_game(port: int) -> tuple[str, int]:
+    host, guest = await Bot.connect(port), await Bot.connect(port)
+    host.send(category="!CREATE", username="host")
+    game_id = (await host.receive())["id_"]
+
+    guest.send(category="!JOIN", id_="not a game", username="guest")
+    await expect(guest, category="!INVALID_GAME")
+    guest.send(category="!JOIN", id_=game_id, username="guest")
+    await expect(guest, subcategory="self")
+    await expect(host, subcategory="other")
+
+    host.send(category="!START")
+    for bot in (host, guest):
+        bot.apply(await bot.receive())
+    moves = await asyncio.gather(host.play(), guest.play())
+    await asyncio.gather(host.close(), guest.close())
+    return game_id, sum(moves)
+
+
+async def measure(engine: str, shards: int, games: int) -> dict:
+    port = free_port()
+    process = spawn_server("--engine", engine, "--shards", str(shards), port=port)
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(play_game(port) for _ in range(games)))
+        elapsed = time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+    per_shard = [0] * shards
+    for game_id, _ in results:
+        per_shard[int(game_id) % shards] += 1
+    return {
+        "engine": engine,
+        "shards": shards,
+        "games": games,
+        "games_per_shard": per_shard,
+        "moves_per_second": round(sum(moves for _, moves in results) / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.sharding")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--shards", type=int, default=max(os.cpu_count(), 2))
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    for engine in ("threaded", "asyncio"):
+        for shards in sorted({1, args.shards}):
+            results = asyncio.run(measure(engine, shards, args.games))
+            report("sharding", cpus=os.cpu_count(), **results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+import os
+
+from server.simulator import run
+
+from .common import report
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.simulator")
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for processes in sorted({1, os.cpu_count()}):
+        summary = run(args.games, args.seed, ["random"] * 4, processes)
+        report("simulator", **summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import socket
+import time
+
+from client.bot import (
+    CARD_PLAYED_MESSAGE,
+    CREATE_GAME_MESSAGE,
+    JOIN_GAME_MESSAGE,
+    PLAYERS,
+    START_GAME_MESSAGE,
+    Bot,
+    Stats,
+    together,
+)
+from protocol.codec import CODECS, JSON
+from protocol.framing import PREFIX, frame_buffers
+from server.audience import Audience
+from server.game import Game
+from server.outbox import ThreadedOutbox
+from server.player import Player
+from server.server import SPECTATE_MESSAGE, Server
+
+from .common import free_port, raise_fd_limit, report, spawn_server
+
+PRIVATE_FIELDS = ("hand", "is_turn", "removed", "added", "token")
+
+
+def connect(server: Server, index: int) -> tuple[socket.socket, socket.socket]:
+    conn, peer = socket.socketpair()
+    codecs = list(CODECS.values())
+    server.codecs_by_conn[conn] = codecs[index % len(codecs)]
+    server.outboxes[conn] = ThreadedOutbox(conn, high_water=1 << 20)
+    return conn, peer
+
+
+def measure_fan_out(server: Server, spectators: int, rounds: int, seed: int) -> dict:
+    sockets = []
+    game = Game("000000", seed)
+    for seat in range(PLAYERS):
+        conn, peer = connect(server, seat)
+        sockets += [conn, peer]
+        game.add_player(Player(f"player#{seat:04}", conn, seat == 0, game.id_))
+    game.start()
+
+    audience = Audience(game)
+    watchers = []
+    for index in range(spectators):
+        conn, peer = connect(server, index)
+        sockets += [conn, peer]
+        audience.add(conn, server.codec_for(conn))
+        watchers.append(Player(f"spectator#{index:04}", conn, False, game.id_))
+
+    update = {
+        "seq": game.seq,
+        "player": game.players[0].username,
+        "status": "ok",
+        "current_colour": game.current_colour,
+        "current_number": game.current_number,
+        "current_effects": game.current_effects,
+    }
+
+    def private(player: Player) -> dict:
+        return {"is_turn": player == game.current_turn}
+
+    strategies = {
+        "players_only": lambda: server.broadcast(game.players, private, **update),
+        "as_players": lambda: server.broadcast(
+            [*game.players, *watchers], private, **update
+        ),
+        "audience": lambda: server.broadcast(
+            game.players, private, audience=audience, **update
+        ),
+    }
+    results = {}
+    for name, broadcast in strategies.items():
+        elapsed = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            broadcast()
+            elapsed += time.perf_counter() - start
+            for outbox in server.outboxes.values():
+                outbox.frames.clear()
+        results[name] = elapsed / rounds
+
+    for conn in sockets:
+        server.outboxes.pop(conn, None)
+        server.codecs_by_conn.pop(conn, None)
+        conn.close()
+    return results
+
+
+class Spectator:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    seq: int
+    received: int
+    frames: int
+    gaps: int
+    leaked: set[str]
+
+    def __init__(self):
+        self.seq = self.received = self.frames = self.gaps = 0
+        self.leaked = set()
+
+    async def attach(self, port: int, game_id: str) -> None:
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+        msg = {"category": SPECTATE_MESSAGE, "id_": game_id}
+        self.writer.write(b"".join(frame_buffers(JSON.encode(msg))))
+        reply = await self.read_frame()
+        if reply.get("id_") != game_id:
+            raise RuntimeError(f"could not spectate {game_id}: {reply}")
+
+    async def drain(self) -> None:
+        while chunk := await self.reader.read(1 << 16):
+            self.received += len(chunk)
+
+    async def audit(self) -> None:
+        while True:
+            msg = await self.read_frame()
+            self.frames += 1
+            self.leaked.update(field for field in PRIVATE_FIELDS if field in msg)
+            if "seq" in msg:
+                self.gaps += msg["seq"] != self.seq + 1
+                self.seq = msg["seq"]
+
+    async def read_frame(self) -> dict:
+        length, split = PREFIX.unpack(await self.reader.readexactly(PREFIX.size))
+        payload = await self.reader.readexactly(length)
+        self.received += PREFIX.size + length
+        return JSON.decode_frame(payload, split)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def watched_game(port: int, spectators: int, stats: Stats) -> list[Spectator]:
+    bots = [Bot(stats) for _ in range(PLAYERS)]
+    watchers = [Spectator() for _ in range(spectators)]
+    tasks = []
+    try:
+        await together(*(bot.connect("127.0.0.1", port) for bot in bots))
+        owner, *guests = bots
+        owner.send(category=CREATE_GAME_MESSAGE, username="bot")
+        game_id = (await owner.expect(CREATE_GAME_MESSAGE))["id_"]
+        await together(*(watcher.attach(port, game_id) for watcher in watchers))
+        tasks = [
+            asyncio.ensure_future(watcher.audit() if index == 0 else watcher.drain())
+            for index, watcher in enumerate(watchers)
+        ]
+        for guest in guests:
+            guest.send(category=JOIN_GAME_MESSAGE, id_=game_id, username="bot")
+            await guest.expect(JOIN_GAME_MESSAGE)
+        owner.send(category=START_GAME_MESSAGE)
+        await together(*(bot.expect(START_GAME_MESSAGE) for bot in bots))
+        await together(*(bot.play() for bot in bots))
+        stats.games += 1
+    finally:
+        for bot in bots:
+            bot.close()
+        await asyncio.sleep(0.1)
+        for task in tasks:
+            task.cancel()
+        for watcher in watchers:
+            watcher.close()
+    return watchers
+
+
+async def measure_end_to_end(port: int, games: int, spectators: int) -> dict:
+    stats = Stats()
+    received = frames = gaps = 0
+    leaked = set()
+    start = time.perf_counter()
+    for _ in range(games):
+        watchers = await watched_game(port, spectators, stats)
+        received += sum(watcher.received for watcher in watchers)
+        if watchers:
+            frames += watchers[0].frames
+            gaps += watchers[0].gaps
+            leaked |= watchers[0].leaked
+    summary = stats.summary(time.perf_counter() - start)
+    move = summary["latency_ms"].get(CARD_PLAYED_MESSAGE, {})
+    return {
+        "games": summary["games"],
+        "moves_per_second": summary["moves_per_second"],
+        "move_p50_ms": move.get("p50"),
+        "move_p99_ms": move.get("p99"),
+        "spectator_kib": round(received / 1024),
+        "audited_frames": frames,
+        "audited_gaps": gaps,
+        "leaked_fields": sorted(leaked),
+        "errors": summary["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.spectators")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument(
+        "--watchers",
+        type=int,
+        nargs="+",
+        default=[0, 100, 1000],
+        help="spectators per game in the end-to-end runs",
+    )
+    parser.add_argument("--engine", choices=("threaded", "asyncio"), default="asyncio")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    raise_fd_limit()
+    server = Server(("127.0.0.1", 0))
+    for spectators in (10, 100, 1000, 4000):
+        results = measure_fan_out(server, spectators, args.rounds, args.seed)
+        base = results["players_only"]
+        report(
+            "spectators",
+            path="fan_out",
+            spectators=spectators,
+            players_only_us=round(base * 1e6, 2),
+            **{
+                f"{name}_us_per_spectator": round(
+                    (results[name] - base) / spectators * 1e6, 3
+                )
+                for name in ("as_players", "audience")
+            },
+        )
+
+    port = free_port()
+    process = spawn_server("--engine", args.engine, "--high-water", "256", port=port)
+    try:
+        for spectators in args.watchers:
+            results = asyncio.run(measure_end_to_end(port, args.games, spectators))
+            report(
+                "spectators",
+                path="end_to_end",
+                engine=args.engine,
+                spectators=spectators,
+                **results,
+            )
+            if results["leaked_fields"]:
+                raise SystemExit("private fields reached spectators")
+            if results["audited_gaps"]:
+                raise SystemExit("spectator stream skipped a seq")
+    finally:
+        process.kill()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import itertools
+import random
+import time
+
+from server.game import Game, OutOfCardsException
+from server.player import Player
+from server.simulator import best_colour
+from server.turns import TurnOrder
+
+from .common import report
+
+
+class LegacyTurns:
+    def __init__(self, players: list):
+        self.players = players
+        self.turns = itertools.cycle(self.players)
+        self.current = next(self.turns)
+
+    def advance(self, steps: int = 1) -> None:
+        for _ in range(steps):
+            self.current = next(self.turns)
+
+    def reverse(self) -> None:
+        index = self.players.index(self.current)
+        self.turns = itertools.cycle(
+            self.players[index - 1 :: -1] + self.players[: index - 1 : -1]
+        )
+
+    def peek(self, count: int) -> list:
+        self.turns, ahead = itertools.tee(self.turns)
+        return list(itertools.islice(ahead, count))
+
+    def remove(self, player) -> None:
+        self.players.remove(player)
+        self.turns = itertools.cycle(self.players)
+
+
+def script(operations: int, seats: int, seed: int) -> list[tuple[str, int]]:
+    rng = random.Random(seed)
+    ops = rng.choices(
+        ("advance", "skip", "reverse", "replace"), (70, 10, 15, 5), k=operations
+    )
+    return [(op, rng.randrange(seats)) for op in ops]
+
+
+def run_script(turns, ops: list[tuple[str, int]], seats: int) -> tuple[float, int]:
+    next_id = seats
+    errors = 0
+    start = time.perf_counter()
+    for op, seat in ops:
+        if op == "advance":
+            turns.advance()
+        elif op == "skip":
+            turns.advance(2)
+        elif op == "reverse":
+            turns.reverse()
+            turns.advance()
+        else:
+            leaving = turns.players[seat]
+            upcoming = [turns.current] + turns.peek(2)
+            expected = [player for player in upcoming if player != leaving][:2]
+            turns.remove(leaving)
+            moving = turns.current
+            turns.advance()
+            errors += [moving, turns.current] != expected
+            turns.players.append(next_id)
+            next_id += 1
+    return time.perf_counter() - start, errors
+
+
+def measure_ring(operations: int, seats: int, seed: int) -> dict:
+    ops = script(operations, seats, seed)
+    results = {}
+    for name, turns in (
+        ("legacy", LegacyTurns(list(range(seats)))),
+        ("ring", TurnOrder(list(range(seats)))),
+    ):
+        elapsed, errors = run_script(turns, ops, seats)
+        results[name] = {
+            "ops_per_second": round(operations / elapsed),
+            "lost_turn_pointer": errors,
+        }
+    return results
+
+
+def measure_games(games: int, players: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plays = reverses = disconnects = 0
+    start = time.perf_counter()
+    for number in range(games):
+        game = Game(str(number), seed + number)
+        for seat in range(players):
+            game.add_player(Player(f"bot#{seat:04}", None, seat == 0, game.id_))
+        game.start()
+
+        while len(game.players) > 1:
+            player = game.current_turn
+            if rng.random() < 0.01:
+                game.remove_player(rng.choice(game.players))
+                disconnects += 1
+                continue
+            legal_moves = game.legal_moves(player)
+            if not legal_moves:
+                try:
+                    player.give_card(game.draw_card())
+                except OutOfCardsException:
+                    break
+                game.skip_turn()
+                continue
+            index = rng.choice(legal_moves)
+            reverses += player.hand[index].effects == ("reverse",)
+            status = game.update(player, index, True, best_colour(player))
+            plays += 1
+            if status["status"] == "win":
+                break
+            assert game.current_turn in game.players
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "plays_per_second": round(plays / elapsed),
+        "reverses": reverses,
+        "disconnects": disconnects,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmarks.turn_order")
+    parser.add_argument("--operations", type=int, default=1_000_000)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report(
+        "turn_order_ring",
+        seats=args.players,
+        **measure_ring(args.operations, args.players, args.seed),
+    )
+    report(
+        "turn_order_games",
+        players=args.players,
+        **measure_games(args.games, args.players, args.seed),
+    )
+
+
+if __name__ == "__main__":
+    main()
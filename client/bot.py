@@ -0,0 +1,450 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import resource
+import time
+from typing import Optional
+
+from protocol.cards import COLOURS, playable_mask
+from protocol.codec import CODECS, JSON, Codec
+from protocol.framing import PREFIX, frame_buffers
+
+from .utils import card_from_wire
+
+PORT = 5050
+PLAYERS = 4
+TIMEOUT = 30.0
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+HELLO_MESSAGE = "!HELLO"
+DISCONNECT_MESSAGE = "!DISCONNECT"
+CREATE_GAME_MESSAGE = "!CREATE"
+JOIN_GAME_MESSAGE = "!JOIN"
+GAME_NOT_FOUND_MESSAGE = "!INVALID_GAME"
+GAME_FULL_MESSAGE = "!GAME_FULL"
+START_GAME_MESSAGE = "!START"
+CARD_PLAYED_MESSAGE = "!MOVE"
+DRAW_CARD_MESSAGE = "!DRAW"
+GAME_OVER_MESSAGE = "!END"
+SKIP_TURN_MESSAGE = "!SKIP"
+RESYNC_MESSAGE = "!RESYNC"
+SYNC_MESSAGE = "!SYNC"
+PING_MESSAGE = "!PING"
+PONG_MESSAGE = "!PONG"
+
+REPLIES = {
+    HELLO_MESSAGE: (HELLO_MESSAGE,),
+    CREATE_GAME_MESSAGE: (CREATE_GAME_MESSAGE,),
+    JOIN_GAME_MESSAGE: (JOIN_GAME_MESSAGE, GAME_NOT_FOUND_MESSAGE, GAME_FULL_MESSAGE),
+    START_GAME_MESSAGE: (START_GAME_MESSAGE,),
+    CARD_PLAYED_MESSAGE: (CARD_PLAYED_MESSAGE,),
+    DRAW_CARD_MESSAGE: (DRAW_CARD_MESSAGE,),
+    SKIP_TURN_MESSAGE: (SKIP_TURN_MESSAGE,),
+    RESYNC_MESSAGE: (SYNC_MESSAGE,),
+}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class Stats:
+    games: int
+    moves: int
+    resyncs: int
+    errors: collections.Counter
+    latencies: dict[str, list[float]]
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.resyncs = 0
+        self.errors = collections.Counter()
+        self.latencies = collections.defaultdict(list)
+
+    def observe(self, category: str, seconds: float) -> None:
+        self.latencies[category].append(seconds)
+
+    def merge(self, other: "Stats") -> None:
+        self.games += other.games
+        self.moves += other.moves
+        self.resyncs += other.resyncs
+        self.errors.update(other.errors)
+        for category, latencies in other.latencies.items():
+            self.latencies[category].extend(latencies)
+
+    def summary(self, elapsed: float) -> dict:
+        latency_ms = {}
+        for category, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            latency_ms[category] = {"count": len(latencies)} | {
+                name: round(
+                    latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1e3, 3
+                )
+                for name, q in QUANTILES.items()
+            }
+            latency_ms[category]["max"] = round(latencies[-1] * 1e3, 3)
+        return {
+            "elapsed": round(elapsed, 3),
+            "games": self.games,
+            "moves": self.moves,
+            "moves_per_second": round(self.moves / max(elapsed, 1e-9)),
+            "resyncs": self.resyncs,
+            "errors": dict(self.errors),
+            "latency_ms": latency_ms,
+        }
+
+
+class Bot:
+    reader: asyncio.StreamReader
+    writer: Optional[asyncio.StreamWriter]
+    codec: Codec
+    stats: Stats
+    timeout: float
+    received: float
+    watchdog: Optional[asyncio.TimerHandle]
+
+    username: Optional[str]
+    hand: list[dict]
+    state: tuple
+    is_turn: bool
+    seq: int
+    resyncing: bool
+    winner: Optional[str]
+    request: Optional[tuple[str, float]]
+
+    def __init__(self, stats: Stats, timeout: float = TIMEOUT):
+        self.writer = None
+        self.codec = JSON
+        self.stats = stats
+        self.timeout = timeout
+        self.watchdog = None
+        self.username = None
+        self.hand = []
+        self.state = (None, None, ())
+        self.is_turn = False
+        self.seq = 0
+        self.resyncing = False
+        self.winner = None
+        self.request = None
+
+    async def connect(self, host: str, port: int) -> None:
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), self.timeout
+        )
+        self.received = time.monotonic()
+        self.watch()
+        self.send(category=HELLO_MESSAGE, codecs=list(CODECS))
+        self.codec = CODECS[(await self.expect(HELLO_MESSAGE))["codec"]]
+
+    def watch(self) -> None:
+        idle = time.monotonic() - self.received
+        if idle >= self.timeout:
+            self.reader.set_exception(asyncio.TimeoutError())
+            return
+        loop = asyncio.get_running_loop()
+        self.watchdog = loop.call_later(self.timeout - idle, self.watch)
+
+    def send(self, **msg) -> None:
+        if msg["category"] in REPLIES:
+            self.request = (msg["category"], time.perf_counter())
+        self.writer.write(b"".join(frame_buffers(self.codec.encode(msg))))
+
+    async def read_frame(self) -> dict:
+        length, split = PREFIX.unpack(await self.reader.readexactly(PREFIX.size))
+        return self.codec.decode_frame(await self.reader.readexactly(length), split)
+
+    async def receive(self) -> dict:
+        while True:
+            msg = await self.read_frame()
+            self.received = time.monotonic()
+            if msg.get("category") == PING_MESSAGE:
+                self.send(category=PONG_MESSAGE)
+                continue
+            self.replied(msg)
+            self.handle(msg)
+            return msg
+
+    async def expect(self, category: str) -> dict:
+        while True:
+            msg = await self.receive()
+            if msg["category"] == category:
+                return msg
+            if msg["category"] in (GAME_NOT_FOUND_MESSAGE, GAME_FULL_MESSAGE):
+                raise ProtocolError(msg["category"])
+
+    def replied(self, msg: dict) -> None:
+        if self.request is None:
+            return
+        category, sent = self.request
+        if msg["category"] not in REPLIES[category]:
+            return
+        if msg.get("player", self.username) != self.username:
+            return
+        self.stats.observe(category, time.perf_counter() - sent)
+        self.request = None
+
+    def in_sequence(self, msg: dict) -> bool:
+        if msg.get("seq") == self.seq + 1 and not self.resyncing:
+            self.seq = msg["seq"]
+            return True
+        if msg.get("seq", 0) > self.seq and not self.resyncing:
+            self.resyncing = True
+            self.stats.resyncs += 1
+            self.send(category=RESYNC_MESSAGE)
+        return False
+
+    def apply_snapshot(self, msg: dict) -> None:
+        self.seq = msg["seq"]
+        self.resyncing = False
+        self.state = (
+            msg["current_colour"],
+            msg["current_number"],
+            tuple(msg["current_effects"]),
+        )
+        self.is_turn = msg["is_turn"]
+        self.hand = [card_from_wire(card) for card in msg["hand"]]
+        self.request = None
+        if not self.hand:
+            self.winner = self.username
+
+    def handle(self, msg: dict) -> None:
+        category = msg["category"]
+        if category == CREATE_GAME_MESSAGE or msg.get("subcategory") == "self":
+            self.username = msg["username"]
+        elif category in (START_GAME_MESSAGE, SYNC_MESSAGE):
+            self.apply_snapshot(msg)
+        elif category == CARD_PLAYED_MESSAGE:
+            if msg["status"] == "invalid_card":
+                self.stats.errors["invalid_card"] += 1
+                return
+            if msg["player"] == self.username:
+                self.stats.moves += 1
+                if msg["status"] == "uncalled_uno":
+                    self.stats.errors["uncalled_uno"] += 1
+            if msg["status"] == "win":
+                self.winner = msg["winner"]
+            if self.in_sequence(msg):
+                self.state = (
+                    msg["current_colour"],
+                    msg["current_number"],
+                    tuple(msg["current_effects"]),
+                )
+                if "removed" in msg:
+                    self.hand.pop(msg["removed"])
+                    self.hand.extend(card_from_wire(card) for card in msg["added"])
+                self.is_turn = msg["is_turn"]
+        elif category == DRAW_CARD_MESSAGE:
+            self.hand.append(card_from_wire(msg["card"]))
+            self.send(category=SKIP_TURN_MESSAGE)
+        elif category == SKIP_TURN_MESSAGE:
+            if self.in_sequence(msg):
+                self.is_turn = msg["is_turn"]
+        elif category == GAME_NOT_FOUND_MESSAGE:
+            self.stats.errors["invalid_game"] += 1
+        elif category == GAME_FULL_MESSAGE:
+            self.stats.errors["game_full"] += 1
+        elif category == GAME_OVER_MESSAGE:
+            self.winner = self.winner or ""
+
+    def legal_move(self) -> Optional[int]:
+        playable = playable_mask(*self.state)
+        for index, card in enumerate(self.hand):
+            if playable >> card["id_"] & 1:
+                return index
+        return None
+
+    def colour_choice(self) -> str:
+        counts = collections.Counter(card["colour"] for card in self.hand)
+        return max(COLOURS, key=lambda colour: counts[colour])
+
+    def take_turn(self) -> None:
+        index = self.legal_move()
+        if index is None:
+            self.send(category=DRAW_CARD_MESSAGE)
+            return
+        colour_change = "colour change" in self.hand[index]["effects"]
+        self.send(
+            category=CARD_PLAYED_MESSAGE,
+            card_index=index,
+            uno_called=len(self.hand) == 2,
+            colour_change_to=self.colour_choice() if colour_change else None,
+        )
+
+    async def play(self) -> None:
+        while self.winner is None:
+            if self.is_turn and self.request is None and not self.resyncing:
+                self.take_turn()
+            await self.receive()
+
+    def close(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+        if self.writer is None:
+            return
+        if not self.writer.is_closing():
+            self.send(category=DISCONNECT_MESSAGE)
+        self.writer.close()
+
+
+async def together(*awaitables) -> list:
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def play_game(host: str, port: int, stats: Stats, timeout: float) -> None:
+    bots = [Bot(stats, timeout) for _ in range(PLAYERS)]
+    try:
+        await together(*(bot.connect(host, port) for bot in bots))
+        owner, *guests = bots
+        owner.send(category=CREATE_GAME_MESSAGE, username="bot")
+        game_id = (await owner.expect(CREATE_GAME_MESSAGE))["id_"]
+        for guest in guests:
+            guest.send(category=JOIN_GAME_MESSAGE, id_=game_id, username="bot")
+            await guest.expect(JOIN_GAME_MESSAGE)
+        owner.send(category=START_GAME_MESSAGE)
+        await together(*(bot.expect(START_GAME_MESSAGE) for bot in bots))
+        await together(*(bot.play() for bot in bots))
+        stats.games += 1
+    except ProtocolError:
+        pass
+    except (OSError, EOFError, asyncio.TimeoutError) as exc:
+        stats.errors[type(exc).__name__] += 1
+    finally:
+        for bot in bots:
+            bot.close()
+
+
+async def run(
+    host: str,
+    port: int,
+    games: Optional[int],
+    concurrency: int,
+    duration: Optional[float],
+    interval: Optional[float],
+    timeout: float,
+    worker: int = 0,
+) -> Stats:
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = None if duration is None else start + duration
+    remaining = [games]
+
+    def more() -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if remaining[0] is None:
+            return True
+        remaining[0] -= 1
+        return remaining[0] >= 0
+
+    async def player() -> None:
+        while more():
+            await play_game(host, port, stats, timeout)
+
+    async def progress() -> None:
+        moves, last = 0, start
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            line = {
+                "worker": worker,
+                "elapsed": round(now - start, 3),
+                "games": stats.games,
+                "moves": stats.moves,
+                "moves_per_second": round((stats.moves - moves) / (now - last)),
+                "errors": sum(stats.errors.values()),
+            }
+            print(json.dumps(line), flush=True)
+            moves, last = stats.moves, now
+
+    reporter = None if interval is None else asyncio.ensure_future(progress())
+    await asyncio.gather(*(player() for _ in range(concurrency)))
+    if reporter is not None:
+        reporter.cancel()
+    return stats
+
+
+def run_worker(options: dict) -> Stats:
+    return asyncio.run(run(**options))
+
+
+def raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="client.bot",
+        description="play headless four-bot games against a server and "
+        "report latency per message category",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--games",
+        type=int,
+        help="total games to play; unbounded when --duration is given",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=100, help="games in flight per worker"
+    )
+    parser.add_argument(
+        "--duration", type=float, help="stop starting games after this many seconds"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="client processes, each with its own event loop",
+    )
+    parser.add_argument(
+        "--interval", type=float, help="print progress every this many seconds"
+    )
+    parser.add_argument("--timeout", type=float, default=TIMEOUT)
+    args = parser.parse_args()
+    if args.games is None and args.duration is None:
+        args.games = args.concurrency * args.workers
+
+    raise_fd_limit()
+    workers = [
+        {
+            "host": args.host,
+            "port": args.port,
+            "games": (
+                None
+                if args.games is None
+                else args.games * (worker + 1) // args.workers
+                - args.games * worker // args.workers
+            ),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "interval": args.interval,
+            "timeout": args.timeout,
+            "worker": worker,
+        }
+        for worker in range(args.workers)
+    ]
+    start = time.perf_counter()
+    if args.workers == 1:
+        results = [run_worker(workers[0])]
+    else:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(run_worker, workers)
+    elapsed = time.perf_counter() - start
+
+    stats = Stats()
+    for result in results:
+        stats.merge(result)
+    print(json.dumps(stats.summary(elapsed)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
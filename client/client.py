@@ -9,36 +9,54 @@ import pygame
 import pygame.freetype
 import pygame_widgets
 
+from protocol.cards import playable_mask
+from protocol.codec import CODECS, Codec
+from protocol.framing import FrameReader
+
 from .asset_loader import load_assets
-from .utils import send_message, receive_message
+from .utils import card_from_wire, send_message, receive_message
 
-HEADER = 64
 PORT = 5050
 FORMAT = "utf-8"
 
+HELLO_MESSAGE = "!HELLO"
 DISCONNECT_MESSAGE = "!DISCONNECT"
 CREATE_GAME_MESSAGE = "!CREATE"
 JOIN_GAME_MESSAGE = "!JOIN"
 GAME_NOT_FOUND_MESSAGE = "!INVALID_GAME"
+GAME_FULL_MESSAGE = "!GAME_FULL"
 START_GAME_MESSAGE = "!START"
 CARD_PLAYED_MESSAGE = "!MOVE"
 DRAW_CARD_MESSAGE = "!DRAW"
 GAME_OVER_MESSAGE = "!END"
 SKIP_TURN_MESSAGE = "!SKIP"
-UNCALLED_UNO_MESSAGE = "!CAUGHT"
+RESYNC_MESSAGE = "!RESYNC"
+SYNC_MESSAGE = "!SYNC"
+RESUME_MESSAGE = "!RESUME"
+INVALID_SESSION_MESSAGE = "!INVALID_SESSION"
+PING_MESSAGE = "!PING"
+PONG_MESSAGE = "!PONG"
+
+RECONNECT_WINDOW = 30
+SERVER_TIMEOUT = 30
 
 SERVER = socket.gethostbyname(socket.gethostname())
 ADDR = (SERVER, PORT)
 
 conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 conn.connect(ADDR)
+conn.settimeout(SERVER_TIMEOUT)
+reader = FrameReader(conn)
 
 BLACK = (0, 0, 0)
+RED = (200, 0, 0)
 
 
 class Client:
     username: str
     is_host: bool
+    codec: Codec
+    token: Optional[str]
 
     game_in_progress: bool
     game_id: Optional[str]
@@ -50,6 +68,8 @@ class Client:
 
     hand: Optional[list[dict]]
     opponents: dict[str, dict]
+    seq: int
+    resyncing: bool
 
     last_card: Optional[dict]
     current_colour: Optional[str]
@@ -58,6 +78,7 @@ class Client:
 
     showing_menu: bool
     showing_colour_choices: bool
+    join_error: Optional[str]
     joined_game: bool
     valid_id: bool
     disconnected: bool
@@ -72,8 +93,11 @@ class Client:
     def __init__(self):
         self.game_in_progress = False
         self.game_id = None
+        self.token = None
         self.hand = None
         self.opponents = {}
+        self.seq = 0
+        self.resyncing = False
         self.is_turn = False
         self.called_uno = False
         self.caught = False
@@ -84,6 +108,7 @@ class Client:
 
         self.showing_menu = True
         self.showing_colour_choices = False
+        self.join_error = None
         self.joined_game = False
         self.valid_invite = False
         self.disconnected = False
@@ -107,27 +132,38 @@ class Client:
         )
 
     def run(self):
+        send_message(conn, category=HELLO_MESSAGE, codecs=list(CODECS))
+        self.codec = CODECS[receive_message(reader)["codec"]]
+
         threading.Thread(target=self.server_listener).start()
         screen = pygame.display.set_mode(self.menu_window_size)
 
         def create_button_listener():
             self.showing_menu = False
+            self.join_error = None
             self.is_host = True
             self.username = username_textbox.getText()
-            send_message(conn, category=CREATE_GAME_MESSAGE, username=self.username)
+            send_message(
+                conn,
+                self.codec,
+                category=CREATE_GAME_MESSAGE,
+                username=self.username,
+            )
 
         def join_button_listener():
             self.showing_menu = False
+            self.join_error = None
             self.is_host = False
             self.username = "".join(username_textbox.text)
 
         def game_start_button_listener():
-            send_message(conn, category=START_GAME_MESSAGE)
+            send_message(conn, self.codec, category=START_GAME_MESSAGE)
             time.sleep(0.1)
 
         def invite_code_listener():
             send_message(
                 conn,
+                self.codec,
                 category=JOIN_GAME_MESSAGE,
                 id_=invite_code_textbox.getText(),
                 username=self.username,
@@ -140,22 +176,20 @@ class Client:
             if self.showing_colour_choices:
                 return
             card_played = self.hand[card_index]
-            if not (
-                "colour change" in card_played["effects"]
-                or self.current_colour == card_played["colour"]
-                or self.current_number == card_played["number"]
-                or set(self.current_effects).intersection(card_played["effects"])
-            ):
+            playable = playable_mask(
+                self.current_colour, self.current_number, self.current_effects
+            )
+            if not playable >> card_played["id_"] & 1:
                 return
             if "colour change" not in card_played["effects"]:
                 send_message(
                     conn,
+                    self.codec,
                     category=CARD_PLAYED_MESSAGE,
                     card_index=card_index,
                     colour_change_to=None,
                     uno_called=self.called_uno,
                 )
-                self.hand.pop(card_index)
                 self.is_turn = False
                 self.drew_card_from_pile = False
             else:
@@ -165,6 +199,7 @@ class Client:
         def colour_change_listener(colour_):
             send_message(
                 conn,
+                self.codec,
                 category=CARD_PLAYED_MESSAGE,
                 card_index=self.chosen_card_index,
                 colour_change_to=colour_,
@@ -172,7 +207,6 @@ class Client:
             )
             print(colour_, self.chosen_card_index)
             self.showing_colour_choices = False
-            self.hand.pop(self.chosen_card_index)
             self.chosen_card_index = None
             self.is_turn = False
             self.drew_card_from_pile = False
@@ -182,11 +216,11 @@ class Client:
             if not self.is_turn:
                 return
             if not self.drew_card_from_pile:
-                send_message(conn, category=DRAW_CARD_MESSAGE)
+                send_message(conn, self.codec, category=DRAW_CARD_MESSAGE)
                 self.drew_card_from_pile = True
 
             else:
-                send_message(conn, category=SKIP_TURN_MESSAGE)
+                send_message(conn, self.codec, category=SKIP_TURN_MESSAGE)
                 self.is_turn = False
                 self.drew_card_from_pile = False
             time.sleep(0.1)
@@ -279,7 +313,7 @@ class Client:
             for event in events:
                 if event.type == pygame.QUIT:
                     self.disconnected = True
-                    send_message(conn, category=DISCONNECT_MESSAGE)
+                    send_message(conn, self.codec, category=DISCONNECT_MESSAGE)
                     pygame.quit()
                     sys.exit()
 
@@ -294,6 +328,16 @@ class Client:
                     ),
                 )
 
+                if self.join_error:
+                    screen.blit(
+                        self.font.render(self.join_error, True, RED),
+                        (
+                            self.menu_window_size[0] // 2
+                            - self.font.size(self.join_error)[0] // 2,
+                            self.menu_window_size[1] // 4 + 75,
+                        ),
+                    )
+
                 username_textbox.listen(events)
                 username_textbox.draw()
 
@@ -501,9 +545,72 @@ class Client:
             pygame.display.update()
             clock.tick(30)
 
+    def apply_snapshot(self, msg: dict):
+        self.seq = msg["seq"]
+        self.resyncing = False
+        self.current_colour = msg.get("current_colour")
+        self.current_number = msg.get("current_number")
+        self.current_effects = tuple(msg.get("current_effects"))
+        self.last_card = {
+            "colour": self.current_colour,
+            "number": self.current_number,
+            "effects": self.current_effects,
+        }
+        self.is_turn = msg.get("is_turn")
+        self.hand = [card_from_wire(i) for i in msg.get("hand")]
+
+    def in_sequence(self, msg: dict) -> bool:
+        if msg.get("seq") == self.seq + 1 and not self.resyncing:
+            self.seq = msg["seq"]
+            return True
+        if msg.get("seq", 0) > self.seq and not self.resyncing:
+            self.resyncing = True
+            send_message(conn, self.codec, category=RESYNC_MESSAGE)
+        return False
+
+    def reconnect(self) -> bool:
+        global conn, reader
+        if self.token is None:
+            return False
+
+        deadline = time.monotonic() + RECONNECT_WINDOW
+        while time.monotonic() < deadline and not self.disconnected:
+            try:
+                conn = socket.create_connection(ADDR, SERVER_TIMEOUT)
+                reader = FrameReader(conn)
+                send_message(conn, category=HELLO_MESSAGE, codecs=list(CODECS))
+                self.codec = CODECS[receive_message(reader)["codec"]]
+                send_message(conn, self.codec, category=RESUME_MESSAGE, token=self.token)
+                return True
+            except (OSError, KeyError):
+                time.sleep(1)
+        return False
+
     def server_listener(self):
         while not self.disconnected:
-            msg = receive_message(conn)
+            try:
+                msg = receive_message(reader, self.codec)
+            except OSError:
+                msg = {}
+            if not msg:
+                if self.disconnected or not self.reconnect():
+                    break
+                continue
+
+            if msg.get("category") == PING_MESSAGE:
+                send_message(conn, self.codec, category=PONG_MESSAGE)
+                continue
+
+            if msg.get("category") == RESUME_MESSAGE:
+                self.username = msg["username"]
+                self.is_host = msg["is_host"]
+                self.opponents = msg["opponents"]
+                if msg["in_progress"]:
+                    self.apply_snapshot(msg)
+                    self.game_in_progress = True
+
+            if msg.get("category") == INVALID_SESSION_MESSAGE:
+                break
             if msg.get("category") == DISCONNECT_MESSAGE:
                 if msg.get("player") == self.username:
                     continue
@@ -513,6 +620,10 @@ class Client:
                 self.game_in_progress = False
                 break
 
+            if msg.get("category") == GAME_FULL_MESSAGE:
+                self.join_error = "That game is full"
+                self.showing_menu = True
+
             if msg.get("category") == JOIN_GAME_MESSAGE:
                 self.joined_game = True
                 if msg["subcategory"] == "other":
@@ -521,27 +632,21 @@ class Client:
                 else:
                     self.username = msg["username"]
                     self.opponents = msg["opponents"]
+                    self.token = msg.get("token")
 
             if msg.get("category") == CREATE_GAME_MESSAGE:
                 self.game_id = msg.get("id_")
                 self.username = msg.get("username")
+                self.token = msg.get("token")
 
             if msg.get("category") == START_GAME_MESSAGE:
-                self.current_colour = msg.get("current_colour")
-                self.current_number = msg.get("current_number")
-                self.current_effects = tuple(msg.get("current_effects"))
-                self.last_card = {
-                    "colour": self.current_colour,
-                    "number": self.current_number,
-                    "effects": self.current_effects,
-                }
+                self.apply_snapshot(msg)
                 self.game_in_progress = True
-                self.is_turn = msg.get("is_turn")
-                self.hand = [
-                    i | {"effects": tuple(i["effects"])} for i in msg.get("hand")
-                ]
 
-            if msg.get("category") == CARD_PLAYED_MESSAGE:
+            if msg.get("category") == SYNC_MESSAGE:
+                self.apply_snapshot(msg)
+
+            if msg.get("category") == CARD_PLAYED_MESSAGE and self.in_sequence(msg):
                 self.current_colour = msg.get("current_colour")
                 self.current_number = msg.get("current_number")
                 self.current_effects = tuple(msg.get("current_effects"))
@@ -550,29 +655,19 @@ class Client:
                     "number": msg.get("last_number", self.current_number),
                     "effects": tuple(msg.get("last_effects", self.current_effects)),
                 }
-                self.hand = [
-                    i | {"effects": tuple(i["effects"])} for i in msg.get("hand")
-                ]
+                if "removed" in msg:
+                    self.hand.pop(msg["removed"])
+                    self.hand.extend(card_from_wire(i) for i in msg["added"])
                 self.is_turn = msg.get("is_turn")
+                if msg.get("status") == "uncalled_uno" and msg["player"] == self.username:
+                    self.caught = True
                 print(
                     f"{msg['player']} played {self.current_colour} {self.current_number} {self.current_effects}"
                 )
 
             if msg.get("category") == DRAW_CARD_MESSAGE:
-                self.hand.append(
-                    {
-                        "colour": msg["colour"],
-                        "number": msg["number"],
-                        "effects": tuple(msg["effects"]),
-                    }
-                )
+                self.hand.append(card_from_wire(msg["card"]))
 
-            if msg.get("category") == SKIP_TURN_MESSAGE:
+            if msg.get("category") == SKIP_TURN_MESSAGE and self.in_sequence(msg):
                 self.is_turn = msg.get("is_turn")
-
-            if msg.get("category") == UNCALLED_UNO_MESSAGE:
-                self.caught = True
-                self.hand = [
-                    i | {"effects": tuple(i["effects"])} for i in msg.get("hand")
-                ]
         sys.exit()
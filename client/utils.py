@@ -1,24 +1,23 @@
-import json
 import socket
+from typing import Union
 
-FORMAT = "utf-8"
-HEADER = 64
+from protocol.cards import card_json
+from protocol.codec import JSON, Codec
+from protocol.framing import FrameReader, send_frame
 
 
-def send_message(conn: socket.socket, **msg) -> None:
-    message = json.dumps(msg).encode(FORMAT)
-    send_length = str(len(message)).encode(FORMAT)
-    send_length += b" " * (HEADER - len(send_length))
-    conn.send(send_length)
-    conn.send(message)
+def send_message(conn: socket.socket, codec: Codec = JSON, /, **msg) -> None:
+    send_frame(conn, codec.encode(msg))
 
 
-def receive_message(conn: socket.socket) -> dict:
-    msg_length = conn.recv(HEADER).decode(FORMAT)
-    msg = "{}"
+def receive_message(reader: FrameReader, codec: Codec = JSON) -> dict:
+    frame = reader.read_frame()
+    if frame is None:
+        return {}
+    return codec.decode_frame(*frame)
 
-    if msg_length:
-        msg_length = int(msg_length)
-        msg = conn.recv(msg_length).decode(FORMAT)
 
-    return json.loads(msg)
+def card_from_wire(card: Union[int, dict]) -> dict:
+    if isinstance(card, int):
+        return card_json(card)
+    return card | {"effects": tuple(card["effects"])}
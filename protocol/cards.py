@@ -0,0 +1,67 @@
+from typing import Callable, Iterable, Optional
+
+COLOURS = ("red", "blue", "green", "yellow")
+COLOURED_EFFECTS = ("+2", "skip", "reverse")
+
+CardKind = tuple[Optional[str], Optional[int], tuple[str, ...]]
+
+
+def _build_cards() -> tuple[CardKind, ...]:
+    cards: list[CardKind] = []
+    for colour in COLOURS:
+        for number in range(10):
+            for _ in range(2):
+                cards.append((colour, number, ()))
+
+        for effect in COLOURED_EFFECTS:
+            for _ in range(2):
+                cards.append((colour, None, (effect,)))
+
+    for _ in range(4):
+        cards.append((None, None, ("colour change",)))
+
+    for _ in range(4):
+        cards.append((None, None, ("colour change", "+4")))
+
+    return tuple(cards)
+
+
+CARDS = _build_cards()
+
+
+def card_json(card_id: int) -> dict:
+    colour, number, effects = CARDS[card_id]
+    return {"id_": card_id, "colour": colour, "number": number, "effects": effects}
+
+
+def _card_mask(predicate: Callable[[CardKind], bool]) -> int:
+    mask = 0
+    for card_id, card in enumerate(CARDS):
+        if predicate(card):
+            mask |= 1 << card_id
+    return mask
+
+
+COLOUR_MASKS = {
+    colour: _card_mask(lambda card: card[0] == colour) for colour in (*COLOURS, None)
+}
+NUMBER_MASKS = {
+    number: _card_mask(lambda card: card[1] == number) for number in (*range(10), None)
+}
+EFFECT_MASKS = {
+    effect: _card_mask(lambda card: effect in card[2])
+    for effect in (*COLOURED_EFFECTS, "colour change", "+4")
+}
+
+
+def playable_mask(
+    colour: Optional[str], number: Optional[int], effects: Iterable[str]
+) -> int:
+    mask = (
+        EFFECT_MASKS["colour change"]
+        | COLOUR_MASKS.get(colour, 0)
+        | NUMBER_MASKS.get(number, 0)
+    )
+    for effect in effects:
+        mask |= EFFECT_MASKS[effect]
+    return mask
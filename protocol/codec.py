@@ -0,0 +1,66 @@
+import json
+from typing import Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMAT = "utf-8"
+
+
+def _card_json(card) -> dict:
+    return card.to_json()
+
+
+def _card_id(card) -> int:
+    return card.id_
+
+
+class Codec:
+    name: str
+
+    def encode(self, msg: dict) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, payload: Union[bytes, memoryview]) -> dict:
+        raise NotImplementedError
+
+    def decode_frame(self, payload: Union[bytes, memoryview], split: int) -> dict:
+        if not split:
+            return self.decode(payload)
+        return self.decode(payload[:split]) | self.decode(payload[split:])
+
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def encode(self, msg: dict) -> bytes:
+        return json.dumps(msg, default=_card_json).encode(FORMAT)
+
+    def decode(self, payload: Union[bytes, memoryview]) -> dict:
+        return json.loads(str(payload, FORMAT))
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    def encode(self, msg: dict) -> bytes:
+        return msgpack.packb(msg, default=_card_id)
+
+    def decode(self, payload: Union[bytes, memoryview]) -> dict:
+        return msgpack.unpackb(payload)
+
+
+JSON = JsonCodec()
+CODECS: dict[str, Codec] = {}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+CODECS[JSON.name] = JSON
+
+
+def negotiate(requested: list[str]) -> Codec:
+    for name in requested:
+        if name in CODECS:
+            return CODECS[name]
+    return JSON
@@ -0,0 +1,97 @@
+import socket
+import struct
+from typing import Optional
+
+PREFIX = struct.Struct("!II")
+MAX_FRAME = 1 << 20
+
+
+def frame_buffers(payload: bytes, private: bytes = b"") -> list[bytes]:
+    if not private:
+        return [PREFIX.pack(len(payload), 0), payload]
+    return [PREFIX.pack(len(payload) + len(private), len(payload)), payload, private]
+
+
+def send_buffers(conn: socket.socket, buffers: list[bytes]) -> None:
+    if not hasattr(conn, "sendmsg"):
+        conn.sendall(b"".join(buffers))
+        return
+
+    sent = conn.sendmsg(buffers)
+    if sent < sum(map(len, buffers)):
+        conn.sendall(b"".join(buffers)[sent:])
+
+
+def send_frame(conn: socket.socket, payload: bytes, private: bytes = b"") -> None:
+    send_buffers(conn, frame_buffers(payload, private))
+
+
+class FrameReader:
+    conn: socket.socket
+    buffer: bytearray
+    view: memoryview
+    start: int
+    end: int
+
+    def __init__(self, conn: socket.socket, size: int = 4096):
+        self.conn = conn
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def _fill(self, size: int) -> bool:
+        if self.start + size > len(self.buffer):
+            pending = self.end - self.start
+            if size > len(self.buffer):
+                buffer = bytearray(max(size, 2 * len(self.buffer)))
+                buffer[:pending] = self.view[self.start : self.end]
+                self.buffer = buffer
+                self.view = memoryview(buffer)
+            else:
+                self.buffer[:pending] = self.buffer[self.start : self.end]
+            self.start, self.end = 0, pending
+
+        while self.end - self.start < size:
+            received = self.conn.recv_into(self.view[self.end :])
+            if not received:
+                if self.end == self.start:
+                    return False
+                raise ConnectionError("connection closed mid-frame")
+            self.end += received
+        return True
+
+    def read_frame(self) -> Optional[tuple[memoryview, int]]:
+        if self.start == self.end:
+            self.start = self.end = 0
+        if not self._fill(PREFIX.size):
+            return None
+        length, split = PREFIX.unpack_from(self.buffer, self.start)
+        if length > MAX_FRAME:
+            raise ConnectionError(f"frame of {length} bytes exceeds {MAX_FRAME}")
+        self._fill(PREFIX.size + length)
+
+        frame_start = self.start + PREFIX.size
+        self.start = frame_start + length
+        return self.view[frame_start : self.start], split
+
+
+def recv_exactly(conn: socket.socket, size: int) -> bytes:
+    data = conn.recv(size, socket.MSG_WAITALL)
+    while len(data) < size:
+        chunk = conn.recv(size - len(data), socket.MSG_WAITALL)
+        if not chunk:
+            raise ConnectionError("connection closed mid-frame")
+        data += chunk
+    return data
+
+
+def recv_frame(conn: socket.socket, limit: int = MAX_FRAME) -> Optional[bytes]:
+    prefix = conn.recv(PREFIX.size, socket.MSG_WAITALL)
+    if not prefix:
+        return None
+    prefix += recv_exactly(conn, PREFIX.size - len(prefix))
+    length, _ = PREFIX.unpack(prefix)
+    if length > limit:
+        raise ConnectionError(f"frame of {length} bytes exceeds {limit}")
+    return prefix + recv_exactly(conn, length)
@@ -1,6 +1,115 @@
-from .server import Server
+import argparse
+
+from .async_server import AsyncServer
+from .eventlog import SNAPSHOT_EVERY
+from .logger import SAMPLING
+from .outbox import EVICTION_GRACE, HIGH_WATER
+from .router import start_sharded
+from .server import (
+    HEARTBEAT_INTERVAL,
+    IDLE_TIMEOUT,
+    PORT,
+    RESUME_GRACE,
+    SERVER,
+    Server,
+)
+
+ENGINES = {"threaded": Server, "asyncio": AsyncServer}
+
+
+def sampling_rate(option: str) -> tuple[str, float]:
+    event, _, rate = option.partition("=")
+    return event, float(rate)
+
 
 if __name__ == "__main__":
-    print("[STARTING] server starting", flush=True)
-    server = Server()
-    server.start()
+    parser = argparse.ArgumentParser(prog="server")
+    parser.add_argument("--engine", choices=ENGINES, default="threaded")
+    parser.add_argument("--host", default=SERVER)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--high-water", type=int, default=HIGH_WATER)
+    parser.add_argument("--eviction-grace", type=float, default=EVICTION_GRACE)
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="worker processes behind a front router; 1 runs a single process",
+    )
+    parser.add_argument(
+        "--log-dir",
+        help="directory for the durable event log; games are recovered from it",
+    )
+    parser.add_argument("--snapshot-every", type=int, default=SNAPSHOT_EVERY)
+    parser.add_argument(
+        "--resume-grace",
+        type=float,
+        default=RESUME_GRACE,
+        help="seconds a dropped player's seat is held for !RESUME",
+    )
+    parser.add_argument(
+        "--heartbeat-interval",
+        type=float,
+        default=HEARTBEAT_INTERVAL,
+        help="seconds of silence before a connection is sent !PING",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=IDLE_TIMEOUT,
+        help="seconds of silence before a connection is closed and reaped",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve JSON metrics on http://127.0.0.1:PORT/metrics; "
+        "shard i of a sharded server uses PORT + i",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        help="log a metrics snapshot every this many seconds",
+    )
+    parser.add_argument(
+        "--log-file",
+        help="append structured log lines here instead of stdout; "
+        "shard i of a sharded server appends to LOG_FILE.shard-i",
+    )
+    parser.add_argument(
+        "--log-sample",
+        type=sampling_rate,
+        action="append",
+        default=[],
+        metavar="EVENT=RATE",
+        help=f"fraction of EVENT records to keep (defaults: {SAMPLING})",
+    )
+    parser.add_argument(
+        "--debug", action="store_true", help="log every event, ignoring sampling"
+    )
+    parser.add_argument(
+        "--replay-file",
+        help="append every game's full event stream here for python -m server.replay",
+    )
+    args = parser.parse_args()
+
+    options = {
+        "high_water": args.high_water,
+        "eviction_grace": args.eviction_grace,
+        "log_dir": args.log_dir,
+        "snapshot_every": args.snapshot_every,
+        "replay_file": args.replay_file,
+        "resume_grace": args.resume_grace,
+        "heartbeat_interval": args.heartbeat_interval,
+        "idle_timeout": args.idle_timeout,
+        "metrics_port": args.metrics_port,
+        "metrics_interval": args.metrics_interval,
+        "log_file": args.log_file,
+        "log_sampling": dict(args.log_sample),
+        "debug": args.debug,
+    }
+    print(f"[STARTING] {args.engine} server starting", flush=True)
+    if args.shards > 1:
+        start_sharded(
+            ENGINES[args.engine], (args.host, args.port), args.shards, **options
+        )
+    else:
+        ENGINES[args.engine]((args.host, args.port), **options).start()
@@ -0,0 +1,81 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from .commands import Command
+from .game import Game
+
+
+class GameActor:
+    game: Game
+    execute: Callable[[Command, Game], bool]
+    queue: collections.deque
+    lock: threading.Lock
+    draining: bool
+
+    processed: int
+    batches: int
+    largest_batch: int
+    total_latency: float
+    max_latency: float
+
+    def __init__(
+        self,
+        game: Game,
+        execute: Callable[[Command, Game], bool],
+        claimed: bool = False,
+    ):
+        self.game = game
+        self.execute = execute
+        self.queue = collections.deque()
+        self.lock = threading.Lock()
+        self.draining = claimed
+
+        self.processed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def submit(self, command: Command) -> bool:
+        future = Future()
+        with self.lock:
+            self.queue.append((command, future, time.perf_counter()))
+            combining = not self.draining
+            self.draining = True
+        if combining:
+            self.drain()
+        return future.result()
+
+    def drain(self) -> None:
+        while True:
+            with self.lock:
+                if not self.queue:
+                    self.draining = False
+                    return
+                batch = list(self.queue)
+                self.queue.clear()
+
+            for command, future, submitted in batch:
+                try:
+                    future.set_result(self.execute(command, self.game))
+                except Exception as error:
+                    future.set_exception(error)
+                latency = time.perf_counter() - submitted
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+            self.processed += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self) -> dict:
+        return {
+            "processed": self.processed,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "mean_latency": self.total_latency / max(self.processed, 1),
+            "max_latency": self.max_latency,
+        }
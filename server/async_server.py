@@ -0,0 +1,130 @@
+import asyncio
+import socket
+import time
+from typing import Optional
+
+from protocol.framing import MAX_FRAME, PREFIX
+
+from .outbox import AsyncOutbox
+from .server import SWEEP_INTERVAL, Server
+from .sharding import Handoff, receive_handoff
+
+TRANSPORT_HIGH_WATER = 16384
+
+
+class AsyncServer(Server):
+    backlog: int
+
+    def __init__(self, *args, backlog: int = 4096, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backlog = backlog
+
+    def close_transport(self, conn: asyncio.StreamWriter) -> None:
+        conn.transport.abort()
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        handed_off: Optional[dict] = None,
+    ):
+        addr = writer.get_extra_info("peername")
+        self.log("connected", addr=addr)
+
+        writer.get_extra_info("socket").setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+        )
+        writer.transport.set_write_buffer_limits(high=TRANSPORT_HIGH_WATER)
+        outbox = AsyncOutbox(writer, **self.outbox_limits)
+        self.outboxes[writer] = outbox
+        self.last_seen[writer] = time.monotonic()
+        drain = asyncio.create_task(outbox.drain())
+
+        try:
+            await self.serve_connection(reader, writer, addr, handed_off)
+        except Exception as error:
+            self.log("connection_failed", addr=addr, error=repr(error))
+            self.connection_lost(writer, addr)
+        finally:
+            self.last_seen.pop(writer, None)
+            outbox.close()
+            drain.cancel()
+            self.outboxes.pop(writer)
+            writer.close()
+            self.log("disconnected", addr=addr)
+
+    async def serve_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        addr: tuple[str, int],
+        handed_off: Optional[dict] = None,
+    ) -> None:
+        connected = handed_off is None or self.handle_message(writer, addr, handed_off)
+        while connected:
+            try:
+                header = await reader.readexactly(PREFIX.size)
+                msg_length, split = PREFIX.unpack(header)
+                if msg_length > MAX_FRAME:
+                    raise ConnectionError(f"frame of {msg_length} bytes too large")
+                payload = await reader.readexactly(msg_length)
+                msg = self.codec_for(writer).decode_frame(payload, split)
+            except (
+                asyncio.IncompleteReadError,
+                ConnectionError,
+                TypeError,
+                ValueError,
+            ):
+                self.connection_lost(writer, addr)
+                break
+            self.metrics.count("bytes_in", PREFIX.size + msg_length)
+            connected = self.handle_message(writer, addr, msg)
+
+    async def sweep_forever(self):
+        while True:
+            await asyncio.sleep(min(SWEEP_INTERVAL, self.heartbeat_interval))
+            self.sweep()
+
+    async def serve(self):
+        self.metrics.start(self.metrics_addr, self.metrics_interval, self.log)
+        sweeper = asyncio.create_task(self.sweep_forever())
+        server = await asyncio.start_server(
+            self.handle_connection, sock=self.server, backlog=self.backlog
+        )
+        self.log("listening", addr=self.addr)
+        async with server:
+            await server.serve_forever()
+
+    async def handle_handoff(self, handoff: Handoff):
+        reader, writer = await asyncio.open_connection(sock=handoff.conn)
+        self.adopt(writer, handoff)
+        await self.handle_connection(reader, writer, handoff.msg)
+
+    async def watch_channel(self, channel: socket.socket):
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+        tasks = set()
+
+        def on_handoff():
+            handoff = receive_handoff(channel)
+            if handoff is None:
+                loop.remove_reader(channel)
+                closed.set_result(None)
+                return
+            task = loop.create_task(self.handle_handoff(handoff))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        loop.add_reader(channel, on_handoff)
+        sweeper = asyncio.create_task(self.sweep_forever())
+        self.log("listening", shard=True)
+        await closed
+        sweeper.cancel()
+
+    def serve_shard(self, channel: socket.socket, shard: int, shards: int):
+        self.attach(channel, shard, shards)
+        self.metrics.start(self.metrics_addr, self.metrics_interval, self.log)
+        asyncio.run(self.watch_channel(channel))
+
+    def start(self):
+        asyncio.run(self.serve())
@@ -0,0 +1,49 @@
+from typing import Any
+
+from protocol.codec import Codec
+from protocol.framing import frame_buffers
+
+from .game import Game
+
+
+class Audience:
+    game: Game
+    watchers: dict[Codec, dict[Any, None]]
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.watchers = {}
+
+    def __len__(self) -> int:
+        return sum(map(len, self.watchers.values()))
+
+    def add(self, conn, codec: Codec) -> None:
+        self.watchers.setdefault(codec, {})[conn] = None
+
+    def discard(self, conn) -> None:
+        for codec, conns in list(self.watchers.items()):
+            conns.pop(conn, None)
+            if not conns:
+                del self.watchers[codec]
+
+    def public(self) -> dict:
+        game = self.game
+        if not game.in_progress or not game.players:
+            return {}
+        return {
+            "turn": game.current_turn.username,
+            "hand_sizes": {
+                player.username: len(player.hand) for player in game.players
+            },
+        }
+
+    def frames(
+        self, shared: dict, encoded: dict[Codec, bytes]
+    ) -> list[tuple[list[bytes], dict[Any, None]]]:
+        public = self.public()
+        frames = []
+        for codec, conns in self.watchers.items():
+            payload = encoded.get(codec) or codec.encode(shared)
+            private = codec.encode(public) if public else b""
+            frames.append((frame_buffers(payload, private), conns))
+        return frames
@@ -0,0 +1,359 @@
+import argparse
+import random
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+from protocol.cards import CARDS, COLOURS, playable_mask
+
+from .card import (
+    COLOUR_CHANGE,
+    EFFECT_FLAGS,
+    NUMBER_CARD_IDS,
+    PLUS_FOUR,
+    PLUS_TWO,
+    REVERSE,
+    SKIP,
+    effect_flags,
+)
+from .game import Game
+from .simulator import MAX_TURNS, lowest_id, new_game, play_game
+
+DECK_SIZE = len(CARDS)
+HAND_SIZE = 7
+NO_COLOUR = len(COLOURS)
+NO_NUMBER = 10
+
+CARD_COLOUR = np.array(
+    [COLOURS.index(colour) if colour else NO_COLOUR for colour, _, _ in CARDS],
+    dtype=np.int8,
+)
+CARD_NUMBER = np.array(
+    [NO_NUMBER if number is None else number for _, number, _ in CARDS],
+    dtype=np.int8,
+)
+CARD_FLAGS = np.array([effect_flags(effects) for _, _, effects in CARDS], np.uint8)
+COLOUR_CARDS = (CARD_COLOUR[:, None] == np.arange(NO_COLOUR)).astype(np.float32)
+
+
+def _effects_for(flags: int) -> tuple[str, ...]:
+    return tuple(effect for effect, flag in EFFECT_FLAGS.items() if flags & flag)
+
+
+def _mask_row(mask: int) -> np.ndarray:
+    packed = np.frombuffer(mask.to_bytes((DECK_SIZE + 7) // 8, "little"), np.uint8)
+    return np.unpackbits(packed, bitorder="little")[:DECK_SIZE].astype(bool)
+
+
+def _playable_table() -> np.ndarray:
+    table = np.zeros((NO_COLOUR + 1, NO_NUMBER + 1, 32, DECK_SIZE), dtype=bool)
+    for colour in range(NO_COLOUR + 1):
+        for number in range(NO_NUMBER + 1):
+            for flags in range(32):
+                table[colour, number, flags] = _mask_row(
+                    playable_mask(
+                        COLOURS[colour] if colour < NO_COLOUR else None,
+                        number if number < NO_NUMBER else None,
+                        _effects_for(flags),
+                    )
+                )
+    return table
+
+
+PLAYABLE = _playable_table()
+
+
+class BatchGames:
+    draw: np.ndarray
+    draw_len: np.ndarray
+    discard: np.ndarray
+    discard_len: np.ndarray
+    hands: np.ndarray
+    hand_size: np.ndarray
+
+    colour: np.ndarray
+    number: np.ndarray
+    flags: np.ndarray
+    plus_amount: np.ndarray
+    turn: np.ndarray
+    direction: np.ndarray
+
+    done: np.ndarray
+    winner: np.ndarray
+    turns: np.ndarray
+    plays: np.ndarray
+
+    games: int
+    players: int
+    policy: str
+    rng: np.random.Generator
+    shufflers: Optional[list[random.Random]]
+
+    def __init__(self, games: int, players: int, seed: int = 0, policy="lowest"):
+        self.games = games
+        self.players = players
+        self.policy = policy
+        self.rng = np.random.default_rng(seed)
+        self.shufflers = None
+
+        self.draw = np.zeros((games, DECK_SIZE), dtype=np.uint8)
+        self.draw_len = np.zeros(games, dtype=np.int16)
+        self.discard = np.zeros((games, DECK_SIZE), dtype=np.uint8)
+        self.discard_len = np.zeros(games, dtype=np.int16)
+        self.hands = np.zeros((games, players, DECK_SIZE), dtype=bool)
+        self.hand_size = np.zeros((games, players), dtype=np.int16)
+
+        self.colour = np.zeros(games, dtype=np.int8)
+        self.number = np.zeros(games, dtype=np.int8)
+        self.flags = np.zeros(games, dtype=np.uint8)
+        self.plus_amount = np.zeros(games, dtype=np.int16)
+        self.turn = np.zeros(games, dtype=np.int8)
+        self.direction = np.ones(games, dtype=np.int8)
+
+        self.done = np.zeros(games, dtype=bool)
+        self.winner = np.full(games, -1, dtype=np.int8)
+        self.turns = np.zeros(games, dtype=np.int32)
+        self.plays = np.zeros(games, dtype=np.int32)
+
+    @classmethod
+    def from_games(cls, games: list[Game]) -> "BatchGames":
+        batch = cls(len(games), len(games[0].players))
+        batch.shufflers = []
+        for index, game in enumerate(games):
+            batch.draw_len[index] = len(game.draw_pile)
+            batch.draw[index, : len(game.draw_pile)] = list(game.draw_pile)
+            batch.discard_len[index] = len(game.discard_pile)
+            batch.discard[index, : len(game.discard_pile)] = list(game.discard_pile)
+            for seat, player in enumerate(game.players):
+                batch.hands[index, seat, [card.id_ for card in player.hand]] = True
+                batch.hand_size[index, seat] = len(player.hand)
+
+            batch.colour[index] = (
+                COLOURS.index(game.current_colour) if game.current_colour else NO_COLOUR
+            )
+            batch.number[index] = (
+                NO_NUMBER if game.current_number is None else game.current_number
+            )
+            batch.flags[index] = effect_flags(game.current_effects)
+            batch.plus_amount[index] = game.current_plus_amount
+            batch.turn[index] = game.turns.index
+            batch.direction[index] = game.turns.direction
+
+            shuffler = random.Random()
+            shuffler.setstate(game.rng.getstate())
+            batch.shufflers.append(shuffler)
+        return batch
+
+    def permute(self, piles: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        keys = self.rng.random(piles.shape)
+        keys[np.arange(DECK_SIZE)[None, :] >= lengths[:, None]] = 2
+        return np.take_along_axis(piles, keys.argsort(axis=1), axis=1)
+
+    def deal(self) -> None:
+        everyone = np.arange(self.games)
+        first = self.rng.choice(np.array(NUMBER_CARD_IDS, dtype=np.uint8), self.games)
+        keys = self.rng.random((self.games, DECK_SIZE))
+        keys[everyone, first] = 2
+        self.draw[:] = keys.argsort(axis=1)
+        self.draw_len[:] = DECK_SIZE - 1
+
+        for seat in range(self.players):
+            top = DECK_SIZE - 1 - seat * HAND_SIZE
+            dealt = self.draw[:, top - HAND_SIZE : top]
+            self.hands[everyone[:, None], seat, dealt] = True
+        self.hand_size[:] = HAND_SIZE
+        self.draw_len -= self.players * HAND_SIZE
+
+        self.discard[:, 0] = first
+        self.discard_len[:] = 1
+        self.colour[:] = CARD_COLOUR[first]
+        self.number[:] = CARD_NUMBER[first]
+        self.flags[:] = CARD_FLAGS[first]
+
+    def reshuffle(self, games: np.ndarray) -> None:
+        games = games[self.discard_len[games] > 1]
+        if not games.size:
+            return
+        lengths = self.discard_len[games] - 1
+        top = self.discard[games, lengths]
+        if self.shufflers is None:
+            self.draw[games] = self.permute(self.discard[games], lengths)
+        else:
+            for game, length in zip(games, lengths):
+                pile = self.discard[game, :length].tolist()
+                self.shufflers[game].shuffle(pile)
+                self.draw[game, :length] = pile
+        self.draw_len[games] = lengths
+        self.discard[games, 0] = top
+        self.discard_len[games] = 1
+
+    def draw_cards(self, games: np.ndarray, seats: np.ndarray) -> np.ndarray:
+        self.reshuffle(games[self.draw_len[games] == 0])
+        available = self.draw_len[games] > 0
+        games, seats = games[available], seats[available]
+
+        self.draw_len[games] -= 1
+        cards = self.draw[games, self.draw_len[games]]
+        self.hands[games, seats, cards] = True
+        self.hand_size[games, seats] += 1
+
+        drawn = np.full(available.size, -1, dtype=np.int16)
+        drawn[available] = cards
+        return drawn
+
+    def advance(self, games: np.ndarray) -> None:
+        self.turn[games] = (self.turn[games] + self.direction[games]) % self.players
+
+    def choose(self, legal: np.ndarray) -> np.ndarray:
+        if self.policy == "random":
+            legal = legal * self.rng.random(legal.shape, dtype=np.float32)
+        return np.where(legal.any(axis=1), legal.argmax(axis=1), -1)
+
+    def play(self, games: np.ndarray, seats: np.ndarray, cards: np.ndarray) -> None:
+        flags = CARD_FLAGS[cards]
+        colour_change = (flags & COLOUR_CHANGE).astype(bool)
+        changing = games[colour_change]
+        counts = self.hands[changing, seats[colour_change]] @ COLOUR_CARDS
+        colour_change_to = counts.argmax(axis=1)
+
+        self.discard[games, self.discard_len[games]] = cards
+        self.discard_len[games] += 1
+        self.hands[games, seats, cards] = False
+        self.hand_size[games, seats] -= 1
+
+        self.colour[games] = CARD_COLOUR[cards]
+        self.number[games] = CARD_NUMBER[cards]
+        self.flags[games] = flags
+
+        plus_two = (flags & PLUS_TWO).astype(bool)
+        plus_four = (flags & PLUS_FOUR).astype(bool) & ~plus_two
+        self.plus_amount[games] += 2 * plus_two + 4 * plus_four
+
+        penalised = ~(plus_two | plus_four)
+        penalised_games, penalised_seats = games[penalised], seats[penalised]
+        amounts = self.plus_amount[penalised_games]
+        for drawn in range(amounts.max(initial=0)):
+            owing = amounts > drawn
+            self.draw_cards(penalised_games[owing], penalised_seats[owing])
+        self.plus_amount[penalised_games] = 0
+
+        self.direction[games[(flags & REVERSE).astype(bool)]] *= -1
+        self.advance(games)
+        self.advance(games[(flags & SKIP).astype(bool)])
+
+        self.colour[changing] = colour_change_to
+        self.flags[changing] = 0
+
+        self.plays[games] += 1
+        won = self.hand_size[games, seats] == 0
+        self.done[games[won]] = True
+        self.winner[games[won]] = seats[won]
+
+    def step(self) -> int:
+        games = np.flatnonzero(~self.done)
+        if not games.size:
+            return 0
+        seats = self.turn[games].astype(np.intp)
+        self.turns[games] += 1
+
+        playable = PLAYABLE[self.colour[games], self.number[games], self.flags[games]]
+        cards = self.choose(self.hands[games, seats] & playable)
+
+        stuck = np.flatnonzero(cards < 0)
+        if stuck.size:
+            drawn = self.draw_cards(games[stuck], seats[stuck])
+            legal = (drawn >= 0) & playable[stuck, np.maximum(drawn, 0)]
+            cards[stuck] = np.where(legal, drawn, -1)
+
+        skipped = cards < 0
+        self.advance(games[skipped])
+        self.play(games[~skipped], seats[~skipped], cards[~skipped])
+        return games.size
+
+    def run(self, max_turns: int = MAX_TURNS) -> None:
+        for _ in range(max_turns):
+            if not self.step():
+                break
+
+    def summary(self) -> dict:
+        return {
+            "games": self.games,
+            "mean_turns": round(float(self.turns.mean()), 2),
+            "wins_by_seat": {
+                str(seat): int((self.winner == seat).sum())
+                for seat in range(self.players)
+            },
+            "unfinished": int((~self.done).sum()),
+        }
+
+
+def run(games: int, seed: int, players: int = 4, policy: str = "lowest") -> dict:
+    start = time.perf_counter()
+    batch = BatchGames(games, players, seed, policy)
+    batch.deal()
+    batch.run()
+    elapsed = time.perf_counter() - start
+    return batch.summary() | {"games_per_second": round(games / elapsed, 1)}
+
+
+def cross_check(
+    games: int, seed: int, players: int = 4, draw_pile: Optional[int] = None
+) -> list[int]:
+    scalar = [new_game(game_seed, players) for game_seed in range(seed, seed + games)]
+    if draw_pile is not None:
+        for game in scalar:
+            buried = len(game.draw_pile) - draw_pile
+            game.discard_pile[:0] = game.draw_pile[:buried]
+            del game.draw_pile[:buried]
+    batch = BatchGames.from_games(scalar)
+    batch.run()
+
+    mismatched = []
+    for index, game in enumerate(scalar):
+        result = play_game(game, [lowest_id] * players, random.Random())
+        winner = -1 if result.winner is None else result.winner
+        if (winner, result.turns, result.plays) != (
+            batch.winner[index],
+            batch.turns[index],
+            batch.plays[index],
+        ):
+            mismatched.append(seed + index)
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="server.batch")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--policy", choices=("lowest", "random"), default="random")
+    parser.add_argument(
+        "--cross-check",
+        type=int,
+        default=0,
+        metavar="GAMES",
+        help="replay this many seeds through Game.update and compare",
+    )
+    parser.add_argument(
+        "--draw-pile",
+        type=int,
+        metavar="CARDS",
+        help="bury all but this many draw pile cards when cross-checking",
+    )
+    args = parser.parse_args()
+
+    if args.cross_check:
+        mismatched = cross_check(
+            args.cross_check, args.seed, args.players, args.draw_pile
+        )
+        print(f"[CROSS CHECK] {len(mismatched)} mismatched: {mismatched}", flush=True)
+        if mismatched:
+            sys.exit(1)
+    summary = run(args.games, args.seed, args.players, args.policy)
+    print(f"[BATCH] {summary}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
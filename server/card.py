@@ -1,35 +1,95 @@
-from dataclasses import dataclass
 from typing import Optional
 
+from protocol.cards import CARDS, COLOURS, playable_mask
+
+PLUS_TWO = 1 << 0
+SKIP = 1 << 1
+REVERSE = 1 << 2
+COLOUR_CHANGE = 1 << 3
+PLUS_FOUR = 1 << 4
+
+EFFECT_FLAGS = {
+    "+2": PLUS_TWO,
+    "skip": SKIP,
+    "reverse": REVERSE,
+    "colour change": COLOUR_CHANGE,
+    "+4": PLUS_FOUR,
+}
+
+
+def effect_flags(effects: tuple[str, ...]) -> int:
+    flags = 0
+    for effect in effects:
+        flags |= EFFECT_FLAGS[effect]
+    return flags
+
 
-@dataclass
 class Card:
+    __slots__ = ("id_", "colour", "number", "effects", "flags")
+
+    id_: int
     colour: Optional[str]
     number: Optional[int]
-    effects: list[str]
+    effects: tuple[str, ...]
+    flags: int
+
+    def __init__(
+        self,
+        id_: int,
+        colour: Optional[str],
+        number: Optional[int],
+        effects: tuple[str, ...],
+    ):
+        self.id_ = id_
+        self.colour = colour
+        self.number = number
+        self.effects = effects
+        self.flags = effect_flags(effects)
 
     def to_json(self) -> dict:
-        return {"colour": self.colour, "number": self.number, "effects": self.effects}
+        return {
+            "id_": self.id_,
+            "colour": self.colour,
+            "number": self.number,
+            "effects": self.effects,
+        }
 
+    def __repr__(self) -> str:
+        return f"Card({self.colour}, {self.number}, {self.effects})"
 
-def get_fresh_deck() -> list[Card]:
-    deck: list[Card] = []
-    for colour in ("red", "blue", "green", "yellow"):
-        for number in range(10):
-            for _ in range(2):
-                deck.append(Card(colour, number, []))
 
-        for effect in ("+2", "skip", "reverse"):
-            for _ in range(2):
-                deck.append(Card(colour, None, [effect]))
+DECK: tuple[Card, ...] = tuple(
+    Card(id_, colour, number, effects)
+    for id_, (colour, number, effects) in enumerate(CARDS)
+)
+FRESH_DECK_IDS = bytes(range(len(DECK)))
+NUMBER_CARD_IDS = tuple(card.id_ for card in DECK if not card.flags)
+STARTING_PILES = {
+    first: FRESH_DECK_IDS[:first] + FRESH_DECK_IDS[first + 1 :]
+    for first in NUMBER_CARD_IDS
+}
+
 
-    for _ in range(4):
-        deck.append(Card(None, None, ["colour change"]))
+PLAYABLE: dict[tuple[Optional[str], Optional[int], tuple[str, ...]], int] = {
+    state: playable_mask(*state)
+    for state in {
+        *((card.colour, card.number, card.effects) for card in DECK),
+        *((colour, None, ()) for colour in (*COLOURS, None)),
+    }
+}
 
-    for _ in range(4):
-        deck.append(Card(None, None, ["colour change", "+4"]))
 
-    return deck
+def playable_mask_for(
+    colour: Optional[str], number: Optional[int], effects: tuple[str, ...]
+) -> int:
+    mask = PLAYABLE.get((colour, number, effects))
+    if mask is None:
+        mask = playable_mask(colour, number, effects)
+    return mask
+
+
+def get_fresh_deck() -> list[Card]:
+    return list(DECK)
 
 
 def card_list_json(cards: list[Card]) -> list[dict]:
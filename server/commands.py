@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+HELLO_MESSAGE = "!HELLO"
+DISCONNECT_MESSAGE = "!DISCONNECT"
+CREATE_GAME_MESSAGE = "!CREATE"
+JOIN_GAME_MESSAGE = "!JOIN"
+SPECTATE_MESSAGE = "!SPECTATE"
+START_GAME_MESSAGE = "!START"
+CARD_PLAYED_MESSAGE = "!MOVE"
+DRAW_CARD_MESSAGE = "!DRAW"
+SKIP_TURN_MESSAGE = "!SKIP"
+RESYNC_MESSAGE = "!RESYNC"
+RESUME_MESSAGE = "!RESUME"
+PING_MESSAGE = "!PING"
+PONG_MESSAGE = "!PONG"
+
+
+@dataclass
+class Command:
+    conn: Any
+    addr: tuple[str, int]
+
+
+@dataclass
+class Hello(Command):
+    codecs: list[str]
+
+
+@dataclass
+class Disconnect(Command):
+    lost: bool = False
+
+
+@dataclass
+class CreateGame(Command):
+    username: str
+
+
+@dataclass
+class JoinGame(Command):
+    game_id: str
+    username: str
+
+
+@dataclass
+class Spectate(Command):
+    game_id: str
+
+
+@dataclass
+class StartGame(Command):
+    pass
+
+
+@dataclass
+class PlayCard(Command):
+    card_index: int
+    uno_called: bool
+    colour_change_to: Optional[str]
+
+
+@dataclass
+class DrawCard(Command):
+    pass
+
+
+@dataclass
+class SkipTurn(Command):
+    pass
+
+
+@dataclass
+class Resync(Command):
+    pass
+
+
+@dataclass
+class Resume(Command):
+    token: str
+
+
+@dataclass
+class Expire(Command):
+    token: str
+
+
+@dataclass
+class Ping(Command):
+    pass
+
+
+@dataclass
+class Pong(Command):
+    pass
+
+
+def parse_command(conn, addr: tuple[str, int], msg: Any) -> Optional[Command]:
+    if not isinstance(msg, dict):
+        return None
+    category = msg.get("category")
+    if category == HELLO_MESSAGE:
+        codecs = msg.get("codecs")
+        if not isinstance(codecs, list):
+            codecs = []
+        return Hello(conn, addr, [name for name in codecs if isinstance(name, str)])
+    if category == DISCONNECT_MESSAGE:
+        return Disconnect(conn, addr)
+    if category == CREATE_GAME_MESSAGE and isinstance(msg.get("username"), str):
+        return CreateGame(conn, addr, msg["username"])
+    if (
+        category == JOIN_GAME_MESSAGE
+        and isinstance(msg.get("id_"), str)
+        and isinstance(msg.get("username"), str)
+    ):
+        return JoinGame(conn, addr, msg["id_"], msg["username"])
+    if category == SPECTATE_MESSAGE and isinstance(msg.get("id_"), str):
+        return Spectate(conn, addr, msg["id_"])
+    if category == START_GAME_MESSAGE:
+        return StartGame(conn, addr)
+    if category == CARD_PLAYED_MESSAGE:
+        card_index = msg.get("card_index")
+        if not isinstance(card_index, int):
+            return None
+        colour_change_to = msg.get("colour_change_to")
+        return PlayCard(
+            conn,
+            addr,
+            card_index,
+            bool(msg.get("uno_called", False)),
+            colour_change_to if isinstance(colour_change_to, str) else None,
+        )
+    if category == DRAW_CARD_MESSAGE:
+        return DrawCard(conn, addr)
+    if category == SKIP_TURN_MESSAGE:
+        return SkipTurn(conn, addr)
+    if category == RESYNC_MESSAGE:
+        return Resync(conn, addr)
+    if category == RESUME_MESSAGE and isinstance(msg.get("token"), str):
+        return Resume(conn, addr, msg["token"])
+    if category == PING_MESSAGE:
+        return Ping(conn, addr)
+    if category == PONG_MESSAGE:
+        return Pong(conn, addr)
+    return None
@@ -0,0 +1,237 @@
+import os
+import threading
+from typing import BinaryIO, Optional
+
+from . import events
+from .game import Game
+
+SEGMENT_BYTES = 4 << 20
+SNAPSHOT_EVERY = 64
+
+
+class EventLog:
+    directory: str
+    segment_bytes: int
+    snapshot_every: int
+
+    lock: threading.Condition
+    pending: list
+    file: BinaryIO
+    retired: list[int]
+    segment: int
+    segment_size: int
+    appended: int
+    durable: int
+    closed: bool
+    flusher: Optional[threading.Thread]
+
+    events_since_snapshot: dict[str, int]
+    anchors: dict[str, int]
+    anchored: dict[int, set[str]]
+    bases: dict[int, set[str]]
+    tombstones: dict[int, dict[str, bytes]]
+
+    records: int
+    commits: int
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = SEGMENT_BYTES,
+        snapshot_every: int = SNAPSHOT_EVERY,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Condition()
+        self.pending = []
+        self.segment = 0
+        self.segment_size = 0
+        self.appended = 0
+        self.durable = 0
+        self.closed = False
+        self.flusher = None
+        self.events_since_snapshot = {}
+        self.anchors = {}
+        self.anchored = {}
+        self.bases = {}
+        self.tombstones = {}
+        self.records = 0
+        self.commits = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}.log")
+
+    def segments(self) -> list[int]:
+        return sorted(
+            int(name[:-4])
+            for name in os.listdir(self.directory)
+            if name.endswith(".log") and name[:-4].isdigit()
+        )
+
+    def recover(self) -> list[Game]:
+        bases: dict[str, tuple[int, memoryview]] = {}
+        tails: dict[str, list[tuple[int, memoryview]]] = {}
+        segments = self.segments()
+        for segment in segments:
+            with open(self.path(segment), "rb") as file:
+                data = file.read()
+            for kind, game_id, payload, _ in events.decode(data):
+                if kind in (events.CREATED, events.SNAPSHOT):
+                    bases[game_id] = (kind, payload)
+                    tails[game_id] = []
+                elif kind == events.ENDED:
+                    bases.pop(game_id, None)
+                    tails.pop(game_id, None)
+                elif game_id in tails:
+                    tails[game_id].append((kind, payload))
+
+        games = []
+        for game_id, (kind, payload) in bases.items():
+            game = events.apply(None, kind, game_id, payload)
+            for kind, payload in tails[game_id]:
+                game = events.apply(game, kind, game_id, payload)
+            games.append(game)
+
+        self.segment = segments[-1] + 1 if segments else 0
+        self.anchored[self.segment] = set()
+        for game in games:
+            self.append(events.snapshot(game), game.id_, anchor=True)
+        self.start(segments)
+        return games
+
+    def start(self, obsolete: list[int]) -> None:
+        self.file = open(self.path(self.segment), "ab", buffering=0)
+        self.retired = obsolete
+        self.flusher = threading.Thread(target=self.flush, daemon=True)
+        self.flusher.start()
+
+    def append(self, record: bytes, game_id: str, anchor: bool = False) -> int:
+        with self.lock:
+            if anchor:
+                self.anchor(game_id)
+            self.pending.append(record)
+            self.segment_size += len(record)
+            self.appended += 1
+            self.records += 1
+            if self.segment_size >= self.segment_bytes:
+                self.segment += 1
+                self.segment_size = 0
+                self.anchored[self.segment] = set()
+                self.pending.append(self.segment)
+            self.lock.notify_all()
+            return self.appended
+
+    def anchor(self, game_id: str) -> None:
+        previous = self.anchors.get(game_id)
+        if previous is not None:
+            self.anchored[previous].discard(game_id)
+        self.anchors[game_id] = self.segment
+        self.anchored[self.segment].add(game_id)
+        self.bases.setdefault(self.segment, set()).add(game_id)
+        self.events_since_snapshot[game_id] = 0
+
+    def record(self, game: Game, record: bytes) -> int:
+        kind = record[events.RECORD.size - 1]
+        if kind == events.CREATED:
+            return self.append(record, game.id_, anchor=True)
+        if kind == events.ENDED:
+            return self.end(game.id_, record)
+
+        with self.lock:
+            lsn = self.append(record, game.id_)
+            count = self.events_since_snapshot.get(game.id_, 0) + 1
+            self.events_since_snapshot[game.id_] = count
+            due = count >= self.snapshot_every
+            due = due or self.anchors.get(game.id_, self.segment) < self.segment
+            if due:
+                lsn = self.append(events.snapshot(game), game.id_, anchor=True)
+        return lsn
+
+    def end(self, game_id: str, record: bytes) -> int:
+        with self.lock:
+            self.tombstones.setdefault(self.segment, {})[game_id] = record
+            lsn = self.append(record, game_id)
+            segment = self.anchors.pop(game_id, None)
+            if segment is not None:
+                self.anchored[segment].discard(game_id)
+            self.events_since_snapshot.pop(game_id, None)
+        return lsn
+
+    def obsolete(self) -> list[int]:
+        done = [
+            segment
+            for segment, games in self.anchored.items()
+            if segment < self.segment and not games
+        ]
+        for segment in done:
+            del self.anchored[segment]
+            self.bases.pop(segment, None)
+        for segment in done:
+            for game_id, record in self.tombstones.pop(segment, {}).items():
+                if any(game_id in games for games in self.bases.values()):
+                    self.end(game_id, record)
+        return done
+
+    def flush(self) -> None:
+        while True:
+            with self.lock:
+                while not self.pending and not self.closed:
+                    self.lock.wait()
+                if not self.pending and self.closed:
+                    self.file.close()
+                    return
+                retired = self.retired + self.obsolete()
+                self.retired = []
+                batch, self.pending = self.pending, []
+                lsn = self.appended
+
+            chunk = []
+            for item in batch:
+                if isinstance(item, int):
+                    self.rotate(b"".join(chunk), item)
+                    chunk = []
+                else:
+                    chunk.append(item)
+            self.file.write(b"".join(chunk))
+            os.fsync(self.file.fileno())
+            for segment in retired:
+                os.remove(self.path(segment))
+
+            with self.lock:
+                self.durable = lsn
+                self.commits += 1
+                self.lock.notify_all()
+
+    def rotate(self, tail: bytes, segment: int) -> None:
+        self.file.write(tail)
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = open(self.path(segment), "ab", buffering=0)
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def sync(self, lsn: Optional[int] = None) -> None:
+        with self.lock:
+            target = self.appended if lsn is None else lsn
+            while self.durable < target:
+                self.lock.wait()
+
+    def close(self) -> None:
+        self.sync()
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.flusher.join()
+
+    def stats(self) -> dict:
+        return {
+            "records": self.records,
+            "commits": self.commits,
+            "records_per_commit": self.records / max(self.commits, 1),
+            "segments": len(self.anchored),
+        }
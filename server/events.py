@@ -0,0 +1,261 @@
+import struct
+import zlib
+from typing import Iterator, Optional
+
+from .card import DECK
+from .game import Game
+from .player import Player
+
+CREATED = 1
+JOINED = 2
+STARTED = 3
+PLAYED = 4
+DREW = 5
+SKIPPED = 6
+LEFT = 7
+SNAPSHOT = 8
+ENDED = 9
+
+RECORD = struct.Struct("<IIB")
+SEED = struct.Struct("<Q")
+SEAT = struct.Struct("<B")
+MOVE = struct.Struct("<B?")
+LENGTH = struct.Struct("<H")
+NONE = 0xFFFF
+
+TABLE = struct.Struct("<?IBbbBHB")
+SEATED = struct.Struct("<??")
+RNG_STATE = struct.Struct("<625I?d")
+
+EFFECTS: tuple[tuple[str, ...], ...] = (
+    (),
+    *sorted({card.effects for card in DECK} - {()}),
+)
+EFFECT_INDEX = {effects: index for index, effects in enumerate(EFFECTS)}
+
+
+class CorruptRecord(Exception):
+    pass
+
+
+def pack_str(value: Optional[str]) -> bytes:
+    if value is None:
+        return LENGTH.pack(NONE)
+    encoded = value.encode()
+    return LENGTH.pack(len(encoded)) + encoded
+
+
+def unpack_str(data, offset: int) -> tuple[Optional[str], int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if length == NONE:
+        return None, offset
+    return bytes(data[offset : offset + length]).decode(), offset + length
+
+
+def pack_bytes(value: bytes) -> bytes:
+    return LENGTH.pack(len(value)) + value
+
+
+def unpack_bytes(data, offset: int) -> tuple[bytes, int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    return bytes(data[offset : offset + length]), offset + length
+
+
+def encode(kind: int, game_id: str, payload: bytes = b"") -> bytes:
+    body = pack_str(game_id) + payload
+    return RECORD.pack(len(body), zlib.crc32(body), kind) + body
+
+
+def decode(data, offset: int = 0) -> Iterator[tuple[int, str, memoryview, int]]:
+    view = memoryview(data)
+    while offset + RECORD.size <= len(view):
+        length, checksum, kind = RECORD.unpack_from(view, offset)
+        body = view[offset + RECORD.size : offset + RECORD.size + length]
+        if len(body) < length or zlib.crc32(body) != checksum:
+            return
+        game_id, start = unpack_str(body, 0)
+        offset += RECORD.size + length
+        yield kind, game_id, body[start:], offset
+
+
+def created(
+    game_id: str, seed: int, username: str, token: Optional[str] = None
+) -> bytes:
+    return encode(
+        CREATED, game_id, SEED.pack(seed) + pack_str(username) + pack_str(token)
+    )
+
+
+def joined(game_id: str, username: str, token: Optional[str] = None) -> bytes:
+    return encode(JOINED, game_id, pack_str(username) + pack_str(token))
+
+
+def started(game_id: str) -> bytes:
+    return encode(STARTED, game_id)
+
+
+def played(
+    game_id: str, card_index: int, uno_called: bool, colour_change_to: Optional[str]
+) -> bytes:
+    return encode(
+        PLAYED,
+        game_id,
+        MOVE.pack(card_index, uno_called) + pack_str(colour_change_to),
+    )
+
+
+def drew(game_id: str, seat: int) -> bytes:
+    return encode(DREW, game_id, SEAT.pack(seat))
+
+
+def skipped(game_id: str, seat: int) -> bytes:
+    return encode(SKIPPED, game_id, SEAT.pack(seat))
+
+
+def left(game_id: str, seat: int) -> bytes:
+    return encode(LEFT, game_id, SEAT.pack(seat))
+
+
+def ended(game_id: str) -> bytes:
+    return encode(ENDED, game_id)
+
+
+def snapshot(game: Game) -> bytes:
+    return encode(SNAPSHOT, game.id_, pack_game(game))
+
+
+def new_player(
+    game_id: str, username: str, is_host: bool, token: Optional[str] = None
+) -> Player:
+    player = Player(username, None, is_host, game_id)
+    player.token = token
+    return player
+
+
+def new_game(
+    game_id: str, seed: int, username: str, token: Optional[str] = None
+) -> Game:
+    game = Game(game_id, seed)
+    game.add_player(new_player(game_id, username, True, token))
+    return game
+
+
+def apply(game: Optional[Game], kind: int, game_id: str, payload) -> Optional[Game]:
+    if kind == CREATED:
+        (seed,) = SEED.unpack_from(payload)
+        username, offset = unpack_str(payload, SEED.size)
+        token, _ = unpack_str(payload, offset)
+        return new_game(game_id, seed, username, token)
+    if kind == SNAPSHOT:
+        return unpack_game(game_id, payload)
+    if kind == ENDED:
+        return None
+    if game is None:
+        raise CorruptRecord(f"event {kind} for unknown game {game_id}")
+
+    if kind == JOINED:
+        username, offset = unpack_str(payload, 0)
+        token, _ = unpack_str(payload, offset)
+        game.add_player(new_player(game_id, username, False, token))
+    elif kind == STARTED:
+        game.start()
+    elif kind == PLAYED:
+        card_index, uno_called = MOVE.unpack_from(payload)
+        colour, _ = unpack_str(payload, MOVE.size)
+        game.update(game.current_turn, card_index, uno_called, colour)
+    elif kind == DREW:
+        player = game.players[SEAT.unpack_from(payload)[0]]
+        player.give_card(game.draw_card())
+        player.drew_from_pile = True
+    elif kind == SKIPPED:
+        game.skip_turn()
+        game.players[SEAT.unpack_from(payload)[0]].drew_from_pile = False
+    elif kind == LEFT:
+        player = game.players[SEAT.unpack_from(payload)[0]]
+        game.remove_player(player)
+        if player.is_game_host and game.players:
+            game.players[0].is_game_host = True
+    else:
+        raise CorruptRecord(f"unknown event {kind} for game {game_id}")
+    return game
+
+
+def pack_game(game: Game) -> bytes:
+    parts = [
+        SEED.pack(game.seed),
+        pack_bytes(bytes(game.draw_pile)),
+        pack_bytes(bytes(game.discard_pile)),
+    ]
+    if game.in_progress:
+        number = game.current_number
+        parts.append(
+            TABLE.pack(
+                True,
+                game.seq,
+                game.turns.index,
+                game.turns.direction,
+                -1 if number is None else number,
+                EFFECT_INDEX[game.current_effects],
+                game.current_plus_amount,
+                len(game.players),
+            )
+        )
+        parts.append(pack_str(game.current_colour))
+    else:
+        parts.append(TABLE.pack(False, game.seq, 0, 1, -1, 0, 0, len(game.players)))
+        parts.append(pack_str(None))
+
+    for player in game.players:
+        parts.append(pack_str(player.username))
+        parts.append(pack_str(player.token))
+        parts.append(SEATED.pack(player.is_game_host, player.drew_from_pile))
+        parts.append(pack_bytes(bytes(card.id_ for card in player.hand)))
+
+    _, internal, gauss = game.rng.getstate()
+    parts.append(RNG_STATE.pack(*internal, gauss is not None, gauss or 0.0))
+    return b"".join(parts)
+
+
+def unpack_game(game_id: str, data) -> Game:
+    (seed,) = SEED.unpack_from(data)
+    game = Game(game_id, seed)
+    draw_pile, offset = unpack_bytes(data, SEED.size)
+    discard_pile, offset = unpack_bytes(data, offset)
+    game.draw_pile = bytearray(draw_pile)
+    game.discard_pile = bytearray(discard_pile)
+
+    (
+        game.in_progress,
+        game.seq,
+        index,
+        direction,
+        number,
+        effects,
+        plus_amount,
+        players,
+    ) = TABLE.unpack_from(data, offset)
+    colour, offset = unpack_str(data, offset + TABLE.size)
+    if game.in_progress:
+        game.current_colour = colour
+        game.current_number = None if number < 0 else number
+        game.current_effects = EFFECTS[effects]
+        game.current_plus_amount = plus_amount
+        game.update_playable()
+
+    for _ in range(players):
+        username, offset = unpack_str(data, offset)
+        token, offset = unpack_str(data, offset)
+        is_host, drew_from_pile = SEATED.unpack_from(data, offset)
+        hand, offset = unpack_bytes(data, offset + SEATED.size)
+        player = new_player(game_id, username, is_host, token)
+        player.drew_from_pile = drew_from_pile
+        player.give_cards(DECK[card_id] for card_id in hand)
+        game.players.append(player)
+    game.turns.index = index
+    game.turns.direction = direction
+
+    *internal, has_gauss, gauss = RNG_STATE.unpack_from(data, offset)
+    game.rng.setstate((3, tuple(internal), gauss if has_gauss else None))
+    return game
@@ -1,9 +1,21 @@
-import itertools
 import random
 from typing import Optional, Union
 
-from .card import Card, get_fresh_deck
+from .card import (
+    COLOUR_CHANGE,
+    DECK,
+    FRESH_DECK_IDS,
+    NUMBER_CARD_IDS,
+    PLUS_FOUR,
+    PLUS_TWO,
+    REVERSE,
+    SKIP,
+    STARTING_PILES,
+    Card,
+    playable_mask_for,
+)
 from .player import Player
+from .turns import TurnOrder
 
 
 class OutOfCardsException(Exception):
@@ -11,77 +23,120 @@ class OutOfCardsException(Exception):
 
 
 class Game:
-    draw_pile: list[Card]
-    discard_pile: list[Card]
+    draw_pile: bytearray
+    discard_pile: bytearray
     players: list[Player]
-    turns: itertools.cycle
-    current_turn: Player
+    turns: TurnOrder
 
     current_number: Optional[int]
-    current_colour: str
-    current_effects: list[str]
+    current_colour: Optional[str]
+    current_effects: tuple[str, ...]
+    playable: int
     current_plus_amount: int
 
     in_progress: bool
+    seq: int
 
     id_: str
+    seed: int
+    rng: random.Random
 
-    def __init__(self, _id):
-        self.draw_pile = get_fresh_deck()
-        self.discard_pile = []
+    def __init__(self, _id, seed: Optional[int] = None):
+        self.draw_pile = bytearray(FRESH_DECK_IDS)
+        self.discard_pile = bytearray()
         self.players = []
+        self.turns = TurnOrder(self.players)
         self.id_ = _id
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.current_colour = None
+        self.current_number = None
+        self.current_effects = ()
+        self.playable = 0
+        self.current_plus_amount = 0
+        self.in_progress = False
+        self.seq = 0
 
     def add_player(self, player: Player) -> None:
         if len(self.players) == 4:
             raise ValueError("Game full")
         self.players.append(player)
-        self.turns = itertools.cycle(self.players)
 
     def remove_player(self, player: Player) -> None:
         if player.hand:
-            random.shuffle(player.hand)
-            self.draw_pile.extend(player.hand)
-            player.hand = []
-        self.players.remove(player)
-        self.turns = itertools.cycle(self.players)
+            cards = player.hand.clear()
+            self.rng.shuffle(cards)
+            self.draw_pile.extend(card.id_ for card in cards)
+        if self.in_progress and player is self.current_turn:
+            self.seq += 1
+        self.turns.remove(player)
+
+    @property
+    def current_turn(self) -> Player:
+        return self.turns.current
+
+    def reshuffle(self) -> None:
+        if len(self.discard_pile) < 2:
+            return
+        pile = self.discard_pile[:-1]
+        self.rng.shuffle(pile)
+        self.draw_pile[:0] = pile
+        del self.discard_pile[:-1]
 
     def draw_card(self) -> Card:
-        try:
-            return self.draw_pile.pop()
-        except IndexError:
-            if self.discard_pile:
-                random.shuffle(self.discard_pile)
-
-                self.draw_pile.extend(self.discard_pile)
-                self.discard_pile = []
-
-                return self.draw_card()
-            else:
+        if not self.draw_pile:
+            self.reshuffle()
+            if not self.draw_pile:
                 raise OutOfCardsException()
+        return DECK[self.draw_pile.pop()]
+
+    def draw_cards(self, count: int) -> list[Card]:
+        if count > len(self.draw_pile):
+            self.reshuffle()
+        split = max(len(self.draw_pile) - count, 0)
+        drawn = self.draw_pile[split:]
+        del self.draw_pile[split:]
+        return [DECK[card_id] for card_id in reversed(drawn)]
 
     def start(self) -> None:
+        if self.in_progress:
+            raise ValueError("Game already started")
+        if len(self.draw_pile) != len(FRESH_DECK_IDS):
+            raise ValueError("Cards drawn before start")
         self.in_progress = True
 
-        random.shuffle(self.draw_pile)
+        first_card = DECK[self.rng.choice(NUMBER_CARD_IDS)]
+        self.draw_pile = bytearray(STARTING_PILES[first_card.id_])
+        self.rng.shuffle(self.draw_pile)
 
         for player in self.players:
-            for _ in range(7):
-                player.give_card(self.draw_card())
-
-        while self.draw_pile[-1].effects:
-            random.shuffle(self.draw_pile)
+            player.give_cards(self.draw_cards(7))
 
-        first_card = self.draw_pile.pop()
-        self.discard_pile.append(first_card)
+        self.discard_pile.append(first_card.id_)
 
         self.current_colour = first_card.colour
         self.current_number = first_card.number
         self.current_effects = first_card.effects
+        self.update_playable()
         self.current_plus_amount = 0
 
-        self.turns = itertools.cycle(self.players)
-        self.current_turn = next(self.turns)
+        self.turns.reset()
+        self.seq += 1
+
+    def update_playable(self) -> None:
+        self.playable = playable_mask_for(
+            self.current_colour, self.current_number, self.current_effects
+        )
+
+    def is_legal(self, card: Card) -> bool:
+        return bool(self.playable >> card.id_ & 1)
+
+    def legal_moves(self, player: Player) -> list[int]:
+        return player.hand.playable_indices(self.playable)
+
+    def skip_turn(self) -> None:
+        self.turns.advance()
+        self.seq += 1
 
     def update(
         self,
@@ -91,28 +146,20 @@ class Game:
         colour_change_to: Optional[str] = None,
     ) -> dict[str, Union[str, Player]]:
 
+        if not 0 <= card_index < len(player.hand):
+            return {"status": "invalid_card"}
         card_played = player.hand[card_index]
-        self.current_turn = next(self.turns)
-        self.discard_pile.append(card_played)
-        player.hand.remove(card_played)
-
-        """if not (
-            card_played.colour == self.current_colour
-            or (self.current_number and card_played.number == self.current_number)
-            or set(card_played.effects).intersection(self.current_effects)
-        ):
-            return {"status": "invalid_card"}"""
-        if not (
-            "colour change" in card_played.effects
-            or self.current_colour == card_played.colour
-            or self.current_number == card_played.number
-            or set(self.current_effects).intersection(card_played.effects)
-        ):
+        if not self.is_legal(card_played):
             return {"status": "invalid_card"}
 
+        self.discard_pile.append(card_played.id_)
+        player.hand.pop(card_index)
+
+        self.seq += 1
         self.current_colour = card_played.colour
         self.current_number = card_played.number
         self.current_effects = card_played.effects
+        self.update_playable()
 
         response = {
             "current_colour": self.current_colour,
@@ -120,42 +167,35 @@ class Game:
             "current_effects": self.current_effects,
         }
 
-        if "+2" in card_played.effects:
+        if card_played.flags & PLUS_TWO:
             self.current_plus_amount += 2
-        elif "+4" in card_played.effects:
+        elif card_played.flags & PLUS_FOUR:
             self.current_plus_amount += 4
-        else:
-            for _ in range(self.current_plus_amount):
-                player.give_card(self.draw_card())
+        elif self.current_plus_amount:
+            player.give_cards(self.draw_cards(self.current_plus_amount))
             self.current_plus_amount = 0
 
-        if "skip" in card_played.effects:
-            self.current_turn = next(self.turns)
-
-        if "reversed" in card_played.effects:
-            index = self.players.index(player)
-            self.turns = itertools.cycle(
-                self.players[index - 1 :: -1] + self.players[: index - 1 : -1]
-            )
+        if card_played.flags & REVERSE:
+            self.turns.reverse()
+        self.turns.advance(2 if card_played.flags & SKIP else 1)
 
-        if "colour change" in card_played.effects:
+        if card_played.flags & COLOUR_CHANGE:
             response |= {
                 "last_colour": self.current_colour,
                 "last_number": self.current_number,
                 "last_effects": self.current_effects,
             }
             self.current_colour = colour_change_to
-            self.current_effects = []
-            response["current_effects"] = []
+            self.current_effects = ()
+            self.update_playable()
+            response["current_effects"] = ()
             response["current_colour"] = colour_change_to
         if not uno_called and len(player.hand) == 1:
-            for _ in range(7):
-                player.give_card(self.draw_card())
+            player.give_cards(self.draw_cards(7))
             return response | {"status": "uncalled_uno"}
 
         if not player.hand:
             self.remove_player(player)
-            self.turns = itertools.cycle(self.players)
             return response | {"status": "win", "winner": player}
 
         return response | {"status": "ok"}
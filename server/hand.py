@@ -0,0 +1,64 @@
+from typing import Iterable, Iterator, Union
+
+from protocol.cards import COLOUR_MASKS, COLOURS
+
+from .card import Card
+
+
+class Hand:
+    cards: list[Card]
+    mask: int
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self.cards = []
+        self.mask = 0
+        self.extend(cards)
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Card, list[Card]]:
+        return self.cards[index]
+
+    def append(self, card: Card) -> None:
+        self.cards.append(card)
+        self.mask |= 1 << card.id_
+
+    def extend(self, cards: Iterable[Card]) -> None:
+        mask = self.mask
+        for card in cards:
+            self.cards.append(card)
+            mask |= 1 << card.id_
+        self.mask = mask
+
+    def pop(self, index: int = -1) -> Card:
+        card = self.cards.pop(index)
+        self.mask ^= 1 << card.id_
+        return card
+
+    def clear(self) -> list[Card]:
+        cards, self.cards = self.cards, []
+        self.mask = 0
+        return cards
+
+    def count(self, mask: int) -> int:
+        return bin(self.mask & mask).count("1")
+
+    def colour_counts(self) -> dict[str, int]:
+        return {colour: self.count(COLOUR_MASKS[colour]) for colour in COLOURS}
+
+    def has_playable(self, playable: int) -> bool:
+        return bool(self.mask & playable)
+
+    def playable_indices(self, playable: int) -> list[int]:
+        if not self.mask & playable:
+            return []
+        return [
+            index for index, card in enumerate(self.cards) if playable >> card.id_ & 1
+        ]
+
+    def __repr__(self) -> str:
+        return f"Hand({self.cards})"
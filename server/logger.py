@@ -0,0 +1,69 @@
+import collections
+import json
+import random
+import sys
+import threading
+import time
+from typing import Optional, TextIO
+
+CAPACITY = 1 << 16
+FLUSH_INTERVAL = 0.2
+SAMPLING = {"play": 0.01, "draw": 0.0, "skip": 0.0}
+
+
+class Logger:
+    buffer: collections.deque
+    stream: TextIO
+    sampling: dict[str, float]
+    debug: bool
+    written: int
+    dropped: int
+    lock: threading.Lock
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        sampling: Optional[dict[str, float]] = None,
+        debug: bool = False,
+        capacity: int = CAPACITY,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.buffer = collections.deque(maxlen=capacity)
+        self.stream = sys.stdout if path is None else open(path, "a")
+        self.sampling = SAMPLING | (sampling or {})
+        self.debug = debug
+        self.written = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        threading.Thread(
+            target=self.write_forever, args=(flush_interval,), daemon=True
+        ).start()
+
+    def __call__(self, event: str, **fields) -> None:
+        if not self.debug:
+            rate = self.sampling.get(event, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((time.time(), event, fields))
+
+    def flush(self) -> None:
+        with self.lock:
+            lines = []
+            while self.buffer:
+                timestamp, event, fields = self.buffer.popleft()
+                record = {"time": round(timestamp, 6), "event": event, **fields}
+                lines.append(json.dumps(record, default=str))
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+                self.written += len(lines)
+
+    def write_forever(self, flush_interval: float) -> None:
+        while True:
+            time.sleep(flush_interval)
+            try:
+                self.flush()
+            except (OSError, ValueError):
+                return
@@ -0,0 +1,196 @@
+import bisect
+import collections
+import http.server
+import json
+import threading
+import time
+from typing import Callable, Optional
+
+LATENCY_BOUNDS = tuple(1e-6 * 2**exponent for exponent in range(25))
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+FOLD_AT = 64
+
+
+class Histogram:
+    counts: list[int]
+    total: float
+    maximum: float
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BOUNDS, value)] += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in enumerate(list(other.counts)):
+            self.counts[index] += count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def quantile(self, q: float) -> float:
+        count = sum(self.counts)
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= q * count and index < len(LATENCY_BOUNDS):
+                return min(LATENCY_BOUNDS[index], self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        count = sum(self.counts)
+        summary = {"count": count, "sum": self.total, "max": self.maximum}
+        if count:
+            summary |= {name: self.quantile(q) for name, q in QUANTILES.items()}
+        return summary
+
+
+class Recorder:
+    thread: threading.Thread
+    counters: collections.defaultdict[str, int]
+    histograms: dict[str, Histogram]
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.counters = collections.defaultdict(int)
+        self.histograms = {}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def observe(self, name: str, value: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def merge(self, other: "Recorder") -> None:
+        for name, amount in list(other.counters.items()):
+            self.count(name, amount)
+        for name, histogram in list(other.histograms.items()):
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].merge(histogram)
+
+
+class Metrics:
+    recorders: list[Recorder]
+    retired: Recorder
+    gauges: dict[str, Callable[[], float]]
+    local: threading.local
+    lock: threading.Lock
+    fold_at: int
+    started: float
+
+    def __init__(self):
+        self.recorders = []
+        self.retired = Recorder()
+        self.gauges = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.fold_at = FOLD_AT
+        self.started = time.monotonic()
+
+    def recorder(self) -> Recorder:
+        try:
+            return self.local.recorder
+        except AttributeError:
+            pass
+        recorder = self.local.recorder = Recorder()
+        with self.lock:
+            self.recorders.append(recorder)
+            if len(self.recorders) >= self.fold_at:
+                self.fold()
+                self.fold_at = max(FOLD_AT, 2 * len(self.recorders))
+        return recorder
+
+    def fold(self) -> None:
+        live = []
+        for recorder in self.recorders:
+            if recorder.thread.is_alive():
+                live.append(recorder)
+            else:
+                self.retired.merge(recorder)
+        self.recorders = live
+
+    def count(self, name: str, amount: int = 1) -> None:
+        try:
+            counters = self.local.recorder.counters
+        except AttributeError:
+            counters = self.recorder().counters
+        counters[name] += amount
+
+    def observe(self, name: str, value: float) -> None:
+        try:
+            recorder = self.local.recorder
+        except AttributeError:
+            recorder = self.recorder()
+        recorder.observe(name, value)
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        self.gauges[name] = read
+
+    def snapshot(self) -> dict:
+        total = Recorder()
+        with self.lock:
+            self.fold()
+            total.merge(self.retired)
+            for recorder in self.recorders:
+                total.merge(recorder)
+        return {
+            "uptime": time.monotonic() - self.started,
+            "counters": dict(sorted(total.counters.items())),
+            "gauges": {name: read() for name, read in self.gauges.items()},
+            "histograms": {
+                name: histogram.summary()
+                for name, histogram in sorted(total.histograms.items())
+            },
+        }
+
+    def serve(
+        self, addr: tuple[str, int], log: Callable[..., None]
+    ) -> http.server.ThreadingHTTPServer:
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(addr, Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        log("metrics_listening", url=f"http://{addr[0]}:{addr[1]}/metrics")
+        return server
+
+    def dump_forever(self, interval: float, log: Callable[..., None]) -> None:
+        while True:
+            time.sleep(interval)
+            log("metrics", **self.snapshot())
+
+    def start(
+        self,
+        addr: Optional[tuple[str, int]],
+        interval: Optional[float],
+        log: Callable[..., None],
+    ) -> None:
+        if addr is not None:
+            self.serve(addr, log)
+        if interval is not None:
+            threading.Thread(
+                target=self.dump_forever, args=(interval, log), daemon=True
+            ).start()
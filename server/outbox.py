@@ -0,0 +1,130 @@
+import asyncio
+import collections
+import socket
+import threading
+import time
+from typing import Optional
+
+from protocol.framing import send_buffers
+
+HIGH_WATER = 64
+EVICTION_GRACE = 10.0
+
+
+class SlowConsumerError(Exception):
+    pass
+
+
+class Outbox:
+    frames: collections.deque
+    high_water: int
+    eviction_grace: float
+    above_high_water_since: Optional[float]
+    dropped: int
+    closed: bool
+
+    def __init__(
+        self, high_water: int = HIGH_WATER, eviction_grace: float = EVICTION_GRACE
+    ):
+        self.frames = collections.deque()
+        self.high_water = high_water
+        self.eviction_grace = eviction_grace
+        self.above_high_water_since = None
+        self.dropped = 0
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def _push(self, buffers: list[bytes], droppable: bool) -> None:
+        if len(self.frames) >= self.high_water:
+            now = time.monotonic()
+            if self.above_high_water_since is None:
+                self.above_high_water_since = now
+            elif (
+                now - self.above_high_water_since > self.eviction_grace
+                or len(self.frames) >= 4 * self.high_water
+            ):
+                raise SlowConsumerError()
+
+            if droppable:
+                kept = collections.deque(frame for frame in self.frames if not frame[1])
+                self.dropped += len(self.frames) - len(kept)
+                self.frames = kept
+
+        self.frames.append((buffers, droppable))
+
+    def _pop(self) -> list[bytes]:
+        buffers, _ = self.frames.popleft()
+        if len(self.frames) < self.high_water:
+            self.above_high_water_since = None
+        return buffers
+
+
+class ThreadedOutbox(Outbox):
+    conn: socket.socket
+    condition: threading.Condition
+
+    def __init__(self, conn: socket.socket, **limits):
+        super().__init__(**limits)
+        self.conn = conn
+        self.condition = threading.Condition()
+
+    def push(self, buffers: list[bytes], droppable: bool = False) -> None:
+        with self.condition:
+            if self.closed:
+                return
+            self._push(buffers, droppable)
+            self.condition.notify()
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def drain(self) -> None:
+        while True:
+            with self.condition:
+                while not self.frames and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                buffers = self._pop()
+            try:
+                send_buffers(self.conn, buffers)
+            except OSError:
+                self.close()
+                return
+
+
+class AsyncOutbox(Outbox):
+    writer: asyncio.StreamWriter
+    ready: asyncio.Event
+
+    def __init__(self, writer: asyncio.StreamWriter, **limits):
+        super().__init__(**limits)
+        self.writer = writer
+        self.ready = asyncio.Event()
+
+    def push(self, buffers: list[bytes], droppable: bool = False) -> None:
+        if self.closed:
+            return
+        self._push(buffers, droppable)
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def drain(self) -> None:
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.frames and not self.closed:
+                self.writer.writelines(self._pop())
+                try:
+                    await self.writer.drain()
+                except ConnectionError:
+                    self.close()
+            if self.closed:
+                return
@@ -1,14 +1,18 @@
 import socket
+from typing import Iterable, Optional
 
 from .card import Card, card_list_json
+from .hand import Hand
 
 
 class Player:
     username: str
-    hand: list[Card]
+    hand: Hand
     conn: socket.socket
     is_game_host: bool
     game_id: str
+    token: Optional[str]
+    detached_until: Optional[float]
 
     drew_from_pile: bool
 
@@ -17,16 +21,21 @@ class Player:
     ):
         self.username = username
         self.conn = conn
-        self.hand = []
+        self.hand = Hand()
         self.is_game_host = is_game_host
         self.game_id = game_id
+        self.token = None
+        self.detached_until = None
         self.drew_from_pile = False
 
     def give_card(self, card: Card) -> None:
         self.hand.append(card)
 
+    def give_cards(self, cards: Iterable[Card]) -> None:
+        self.hand.extend(cards)
+
     def hand_json(self) -> list[dict]:
-        return card_list_json(self.hand)
+        return card_list_json(self.hand.cards)
 
     def __repr__(self) -> str:
         return f"Player: {self.hand}"
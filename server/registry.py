@@ -0,0 +1,82 @@
+import threading
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+STRIPES = 16
+
+
+class StripedDict(Generic[K, V]):
+    locks: list[threading.Lock]
+    stripes: list[dict[K, V]]
+
+    def __init__(self, stripes: int = STRIPES):
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.stripes = [{} for _ in range(stripes)]
+
+    def _index(self, key: K) -> int:
+        return hash(key) % len(self.stripes)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        return self.stripes[self._index(key)].get(key, default)
+
+    def __getitem__(self, key: K) -> V:
+        return self.stripes[self._index(key)][key]
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.stripes[self._index(key)]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        index = self._index(key)
+        with self.locks[index]:
+            self.stripes[index][key] = value
+
+    def add_if_absent(self, key: K, value: V) -> bool:
+        index = self._index(key)
+        with self.locks[index]:
+            if key in self.stripes[index]:
+                return False
+            self.stripes[index][key] = value
+            return True
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        index = self._index(key)
+        with self.locks[index]:
+            return self.stripes[index].pop(key, default)
+
+    def keys(self) -> list[K]:
+        keys = []
+        for lock, stripe in zip(self.locks, self.stripes):
+            with lock:
+                keys.extend(stripe)
+        return keys
+
+    def values(self) -> list[V]:
+        values = []
+        for lock, stripe in zip(self.locks, self.stripes):
+            with lock:
+                values.extend(stripe.values())
+        return values
+
+    def __len__(self) -> int:
+        return sum(map(len, self.stripes))
+
+
+class StripedSet(Generic[K]):
+    members: StripedDict[K, None]
+
+    def __init__(self, stripes: int = STRIPES):
+        self.members = StripedDict(stripes)
+
+    def add(self, item: K) -> bool:
+        return self.members.add_if_absent(item, None)
+
+    def discard(self, item: K) -> None:
+        self.members.pop(item)
+
+    def __contains__(self, item: K) -> bool:
+        return item in self.members
+
+    def __len__(self) -> int:
+        return len(self.members)
@@ -0,0 +1,180 @@
+import argparse
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from . import events
+from .game import Game
+
+CHUNK_SIZE = 1 << 20
+FLUSH_BYTES = 64 << 10
+FLUSH_INTERVAL = 0.5
+
+Record = tuple[int, str, memoryview]
+
+
+class ReplayWriter:
+    file: BinaryIO
+    flush_bytes: int
+    flush_interval: float
+
+    lock: threading.Condition
+    pending: list[bytes]
+    pending_bytes: int
+    due: bool
+    closed: bool
+    flusher: threading.Thread
+
+    def __init__(
+        self,
+        path: str,
+        flush_bytes: int = FLUSH_BYTES,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.file = open(path, "ab", buffering=0)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.lock = threading.Condition()
+        self.pending = []
+        self.pending_bytes = 0
+        self.due = False
+        self.closed = False
+        self.flusher = threading.Thread(target=self.flush, daemon=True)
+        self.flusher.start()
+
+    def write(self, record: bytes) -> None:
+        with self.lock:
+            self.pending.append(record)
+            self.pending_bytes += len(record)
+            ended = record[events.RECORD.size - 1] == events.ENDED
+            if ended or self.pending_bytes >= self.flush_bytes:
+                self.due = True
+                self.lock.notify_all()
+
+    def flush(self) -> None:
+        while True:
+            with self.lock:
+                self.lock.wait_for(lambda: self.due or self.closed, self.flush_interval)
+                batch, self.pending = self.pending, []
+                self.pending_bytes = 0
+                self.due = False
+                closed = self.closed
+
+            if batch:
+                self.file.write(b"".join(batch))
+            if closed:
+                self.file.close()
+                return
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        self.flusher.join()
+
+
+@dataclass
+class ReplayedGame:
+    game_id: str
+    seed: int
+    events: int
+    seq: int
+    winner: Optional[str]
+    finished: bool
+    digest: int
+
+
+def read_records(file: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Record]:
+    pending = b""
+    while chunk := file.read(chunk_size):
+        data = pending + chunk
+        end = 0
+        for kind, game_id, payload, end in events.decode(data):
+            yield kind, game_id, payload
+        pending = data[end:]
+    if pending:
+        raise events.CorruptRecord(f"{len(pending)} trailing bytes in {file.name}")
+
+
+def summarize(
+    game: Game, count: int, winner: Optional[str], finished: bool
+) -> ReplayedGame:
+    return ReplayedGame(
+        game.id_,
+        game.seed,
+        count,
+        game.seq,
+        winner,
+        finished,
+        zlib.crc32(events.pack_game(game)),
+    )
+
+
+def replay(records: Iterable[Record]) -> Iterator[ReplayedGame]:
+    games: dict[str, Game] = {}
+    counts: dict[str, int] = {}
+    winners: dict[str, str] = {}
+    for kind, game_id, payload in records:
+        game = games.get(game_id)
+        if game is not None and kind in (events.CREATED, events.ENDED):
+            yield summarize(
+                games.pop(game_id),
+                counts.pop(game_id),
+                winners.pop(game_id, None),
+                kind == events.ENDED,
+            )
+        if kind == events.ENDED:
+            continue
+
+        player = None
+        if kind == events.PLAYED and game is not None:
+            player = game.current_turn
+        games[game_id] = events.apply(game, kind, game_id, payload)
+        counts[game_id] = counts.get(game_id, 0) + 1
+        if player is not None and player not in games[game_id].players:
+            winners[game_id] = player.username
+
+    for game_id, game in games.items():
+        yield summarize(game, counts[game_id], winners.get(game_id), False)
+
+
+def replay_files(paths: list[str]) -> Iterator[ReplayedGame]:
+    for path in paths:
+        with open(path, "rb") as file:
+            yield from replay(read_records(file))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="server.replay")
+    parser.add_argument("paths", nargs="+", metavar="PATH")
+    parser.add_argument(
+        "--per-game", action="store_true", help="print every replayed game"
+    )
+    args = parser.parse_args()
+
+    games = records = unfinished = digest = 0
+    start = time.perf_counter()
+    for result in replay_files(args.paths):
+        games += 1
+        records += result.events
+        unfinished += not result.finished
+        digest = zlib.crc32(result.digest.to_bytes(4, "little"), digest)
+        if args.per_game:
+            print(f"[GAME] {result}", flush=True)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "games": games,
+        "records": records,
+        "unfinished": unfinished,
+        "games_per_second": round(games / elapsed, 1),
+        "records_per_second": round(records / elapsed),
+        "digest": f"{digest:08x}",
+    }
+    print(f"[REPLAY] {summary}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+import socket
+import threading
+from typing import Optional
+
+from protocol.codec import JSON, Codec, negotiate
+from protocol.framing import PREFIX, recv_frame
+
+from .server import (
+    CREATE_GAME_MESSAGE,
+    DISCONNECT_MESSAGE,
+    GAME_NOT_FOUND_MESSAGE,
+    HEARTBEAT_INTERVAL,
+    HELLO_MESSAGE,
+    IDLE_TIMEOUT,
+    INVALID_SESSION_MESSAGE,
+    JOIN_GAME_MESSAGE,
+    PING_MESSAGE,
+    PONG_MESSAGE,
+    RESUME_MESSAGE,
+    SPECTATE_MESSAGE,
+    Server,
+)
+from .logger import Logger
+from .sharding import HANDOFF_LIMIT, send_handoff, shard_for
+from .utils import generate_random_id, send_message
+
+
+class Router:
+    server: socket.socket
+    channels: list[socket.socket]
+    live_games: set[str]
+    lock: threading.Lock
+
+    addr: tuple[str, int]
+    heartbeat_interval: float
+    idle_timeout: float
+    reaped: int
+    log: Logger
+
+    def __init__(
+        self,
+        addr: tuple[str, int],
+        channels: list[socket.socket],
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        idle_timeout: float = IDLE_TIMEOUT,
+        log: Optional[Logger] = None,
+    ):
+        self.addr = addr
+        self.log = Logger() if log is None else log
+        self.channels = channels
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.reaped = 0
+        self.live_games = set()
+        self.lock = threading.Lock()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(addr)
+
+    def hand_off(
+        self, conn, addr, codec: Codec, frame: bytes, game_id: str, created: bool
+    ) -> None:
+        channel = self.channels[shard_for(game_id, len(self.channels))]
+        conn.settimeout(None)
+        send_handoff(channel, conn, addr, codec, frame, game_id if created else None)
+        conn.close()
+
+    def reap(self, addr: tuple[str, int]) -> None:
+        with self.lock:
+            self.reaped += 1
+        self.log("reaped", addr=addr)
+
+    def receive(self, conn: socket.socket, codec: Codec) -> Optional[bytes]:
+        silent = 0.0
+        conn.settimeout(self.heartbeat_interval)
+        while True:
+            try:
+                conn.recv(1, socket.MSG_PEEK)
+                break
+            except socket.timeout:
+                silent += self.heartbeat_interval
+                if silent >= self.idle_timeout:
+                    raise
+                send_message(conn, codec, category=PING_MESSAGE)
+        conn.settimeout(self.idle_timeout)
+        return recv_frame(conn, HANDOFF_LIMIT)
+
+    def route(self, conn: socket.socket, addr: tuple[str, int]):
+        codec = JSON
+        try:
+            while frame := self.receive(conn, codec):
+                _, split = PREFIX.unpack_from(frame)
+                msg = codec.decode_frame(frame[PREFIX.size :], split)
+                if not isinstance(msg, dict):
+                    continue
+
+                if msg.get("category") == PING_MESSAGE:
+                    send_message(conn, codec, category=PONG_MESSAGE)
+
+                if msg.get("category") == HELLO_MESSAGE:
+                    negotiated = negotiate(msg.get("codecs", []))
+                    send_message(conn, category=HELLO_MESSAGE, codec=negotiated.name)
+                    codec = negotiated
+
+                if msg.get("category") == DISCONNECT_MESSAGE:
+                    break
+
+                if msg.get("category") == CREATE_GAME_MESSAGE:
+                    with self.lock:
+                        game_id = generate_random_id(self.live_games)
+                        self.live_games.add(game_id)
+                    return self.hand_off(conn, addr, codec, frame, game_id, True)
+
+                if (
+                    msg.get("category") in (JOIN_GAME_MESSAGE, SPECTATE_MESSAGE)
+                    and "id_" in msg
+                ):
+                    if msg["id_"] in self.live_games:
+                        return self.hand_off(
+                            conn, addr, codec, frame, msg["id_"], False
+                        )
+                    send_message(conn, codec, category=GAME_NOT_FOUND_MESSAGE)
+
+                if msg.get("category") == RESUME_MESSAGE:
+                    game_id, _, _ = str(msg.get("token")).partition(".")
+                    if game_id in self.live_games:
+                        return self.hand_off(conn, addr, codec, frame, game_id, False)
+                    send_message(conn, codec, category=INVALID_SESSION_MESSAGE)
+        except socket.timeout:
+            self.reap(addr)
+        except (ConnectionError, TypeError, ValueError) as error:
+            self.log("routing_failed", addr=addr, error=str(error))
+        conn.close()
+
+    def watch(self, channel: socket.socket, until_ready: bool = False):
+        while data := channel.recv(HANDOFF_LIMIT):
+            msg = JSON.decode(data)
+            if "ready" in msg:
+                if until_ready:
+                    return
+                continue
+            with self.lock:
+                if "live" in msg:
+                    self.live_games.add(msg["live"])
+                else:
+                    self.live_games.discard(msg["ended"])
+
+    def start(self):
+        for channel in self.channels:
+            self.watch(channel, until_ready=True)
+        for channel in self.channels:
+            threading.Thread(target=self.watch, args=(channel,), daemon=True).start()
+
+        self.server.listen()
+        self.log("listening", addr=self.addr, shards=len(self.channels))
+        while True:
+            conn, addr = self.server.accept()
+            threading.Thread(target=self.route, args=(conn, addr)).start()
+
+
+def run_shard(
+    engine: type[Server], channel: socket.socket, shard: int, shards: int, kwargs: dict
+) -> None:
+    engine(None, **kwargs).serve_shard(channel, shard, shards)
+
+
+def start_sharded(
+    engine: type[Server], addr: tuple[str, int], shards: int, **kwargs
+) -> None:
+    context = multiprocessing.get_context("spawn")
+    channels = []
+    for shard in range(shards):
+        router_end, shard_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        options = dict(kwargs)
+        if options.get("log_dir") is not None:
+            options["log_dir"] = os.path.join(options["log_dir"], f"shard-{shard}")
+        if options.get("replay_file") is not None:
+            options["replay_file"] = f"{options['replay_file']}.shard-{shard}"
+        if options.get("log_file") is not None:
+            options["log_file"] = f"{options['log_file']}.shard-{shard}"
+        if options.get("metrics_port") is not None:
+            options["metrics_port"] += shard
+        context.Process(
+            target=run_shard,
+            args=(engine, shard_end, shard, shards, options),
+            daemon=True,
+        ).start()
+        shard_end.close()
+        channels.append(router_end)
+    Router(
+        addr,
+        channels,
+        kwargs.get("heartbeat_interval", HEARTBEAT_INTERVAL),
+        kwargs.get("idle_timeout", IDLE_TIMEOUT),
+        Logger(
+            kwargs.get("log_file"),
+            kwargs.get("log_sampling"),
+            kwargs.get("debug", False),
+        ),
+    ).start()
@@ -1,229 +1,899 @@
+import secrets
 import socket
 import threading
+import time
+from typing import Callable, Optional
 
-from .game import Game
+from protocol.codec import JSON, Codec, negotiate
+from protocol.framing import PREFIX, FrameReader, frame_buffers, send_frame
+
+from . import events
+from .actor import GameActor
+from .audience import Audience
+from .commands import (
+    CARD_PLAYED_MESSAGE,
+    CREATE_GAME_MESSAGE,
+    DISCONNECT_MESSAGE,
+    DRAW_CARD_MESSAGE,
+    HELLO_MESSAGE,
+    JOIN_GAME_MESSAGE,
+    PING_MESSAGE,
+    PONG_MESSAGE,
+    RESUME_MESSAGE,
+    SKIP_TURN_MESSAGE,
+    SPECTATE_MESSAGE,
+    START_GAME_MESSAGE,
+    Command,
+    CreateGame,
+    Disconnect,
+    DrawCard,
+    Expire,
+    Hello,
+    JoinGame,
+    Ping,
+    PlayCard,
+    Pong,
+    Resume,
+    Resync,
+    SkipTurn,
+    Spectate,
+    StartGame,
+    parse_command,
+)
+from .eventlog import SNAPSHOT_EVERY, EventLog
+from .game import Game, OutOfCardsException
+from .logger import Logger
+from .metrics import Metrics
+from .outbox import (
+    EVICTION_GRACE,
+    HIGH_WATER,
+    Outbox,
+    SlowConsumerError,
+    ThreadedOutbox,
+)
 from .player import Player
+from .registry import StripedDict, StripedSet
+from .replay import ReplayWriter
+from .sharding import (
+    Handoff,
+    announce_ended,
+    announce_live,
+    announce_ready,
+    receive_handoff,
+    shard_for,
+)
 from .utils import (
-    receive_message,
-    send_message,
     generate_random_id,
     generate_discriminator,
 )
 
-HEADER = 64
 PORT = 5050
 SERVER = socket.gethostbyname(socket.gethostname())
 ADDR = (SERVER, PORT)
 FORMAT = "utf-8"
 
-DISCONNECT_MESSAGE = "!DISCONNECT"
-CREATE_GAME_MESSAGE = "!CREATE"
-JOIN_GAME_MESSAGE = "!JOIN"
 GAME_NOT_FOUND_MESSAGE = "!INVALID_GAME"
-START_GAME_MESSAGE = "!START"
-CARD_PLAYED_MESSAGE = "!MOVE"
-DRAW_CARD_MESSAGE = "!DRAW"
-SKIP_TURN_MESSAGE = "!SKIP"
-UNCALLED_UNO_MESSAGE = "!CAUGHT"
+GAME_FULL_MESSAGE = "!GAME_FULL"
+INVALID_SESSION_MESSAGE = "!INVALID_SESSION"
+SYNC_MESSAGE = "!SYNC"
+GAME_OVER_MESSAGE = "!END"
+
+PING = {"category": PING_MESSAGE}
+
+RESUME_GRACE = 30.0
+HEARTBEAT_INTERVAL = 10.0
+IDLE_TIMEOUT = 30.0
+SWEEP_INTERVAL = 1.0
 
 
 class Server:
     server: socket.socket
-    on_going_games_by_id: dict[str, Game]
-    players_by_conn: dict[socket.socket, Player]
-    player_usernames: set[str]
+    actors_by_game_id: StripedDict[str, GameActor]
+    players_by_conn: StripedDict[socket.socket, Player]
+    player_usernames: StripedSet[str]
+    sessions: StripedDict[str, Player]
+    detached: StripedDict[str, Player]
+    audiences: StripedDict[str, Audience]
+    spectators_by_conn: StripedDict[socket.socket, Audience]
+    codecs_by_conn: dict[socket.socket, Codec]
+    outboxes: dict[socket.socket, Outbox]
+    last_seen: dict[socket.socket, float]
+    reserved_ids: dict[socket.socket, str]
+    handlers: dict[type, Callable[[Command, Optional[Game]], bool]]
 
-    def __init__(self):
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.bind(ADDR)
-        self.on_going_games_by_id = {}
-        self.players_by_conn = {}
-        self.player_usernames = set()
+    addr: Optional[tuple[str, int]]
+    channel: Optional[socket.socket]
+    shard: int
+    shards: int
+    event_log: Optional[EventLog]
+    replays: Optional[ReplayWriter]
+    metrics: Metrics
+    log: Logger
+    metrics_addr: Optional[tuple[str, int]]
+    metrics_interval: Optional[float]
+    outbox_limits: dict[str, float]
+    resume_grace: float
+    heartbeat_interval: float
+    idle_timeout: float
+    last_heartbeat: float
+    evictions: int
+    reaped: int
 
-    def handle_client(self, conn: socket.socket, addr: tuple[str, int]):
-        print(f"[NEW CONNECTION] {addr} connected.", flush=True)
+    def __init__(
+        self,
+        addr: Optional[tuple[str, int]] = ADDR,
+        high_water: int = HIGH_WATER,
+        eviction_grace: float = EVICTION_GRACE,
+        log_dir: Optional[str] = None,
+        snapshot_every: int = SNAPSHOT_EVERY,
+        replay_file: Optional[str] = None,
+        resume_grace: float = RESUME_GRACE,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+        idle_timeout: float = IDLE_TIMEOUT,
+        metrics_port: Optional[int] = None,
+        metrics_interval: Optional[float] = None,
+        log_file: Optional[str] = None,
+        log_sampling: Optional[dict[str, float]] = None,
+        debug: bool = False,
+    ):
+        self.addr = addr
+        self.log = Logger(log_file, log_sampling, debug)
+        self.resume_grace = resume_grace
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.last_heartbeat = time.monotonic()
+        self.outbox_limits = {
+            "high_water": high_water,
+            "eviction_grace": eviction_grace,
+        }
+        self.evictions = 0
+        self.reaped = 0
+        self.channel = None
+        self.shard = 0
+        self.shards = 1
+        if addr is not None:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.bind(addr)
+        self.actors_by_game_id = StripedDict()
+        self.players_by_conn = StripedDict()
+        self.player_usernames = StripedSet()
+        self.sessions = StripedDict()
+        self.detached = StripedDict()
+        self.audiences = StripedDict()
+        self.spectators_by_conn = StripedDict()
+        self.codecs_by_conn = {}
+        self.outboxes = {}
+        self.last_seen = {}
+        self.reserved_ids = {}
+        self.handlers = {
+            Hello: self.hello,
+            Disconnect: self.disconnect,
+            CreateGame: self.create_game,
+            JoinGame: self.join_game,
+            Spectate: self.spectate,
+            StartGame: self.start_game,
+            PlayCard: self.play_card,
+            DrawCard: self.draw_card,
+            SkipTurn: self.skip_turn,
+            Resync: self.resync,
+            Resume: self.resume,
+            Expire: self.expire,
+            Ping: self.ping,
+            Pong: self.pong,
+        }
+        self.metrics = Metrics()
+        self.metrics_addr = (
+            None if metrics_port is None else ("127.0.0.1", metrics_port)
+        )
+        self.metrics_interval = metrics_interval
+        self.metrics.gauge("games", lambda: len(self.actors_by_game_id))
+        self.metrics.gauge("connections", lambda: len(self.outboxes))
+        self.metrics.gauge("detached_players", lambda: len(self.detached))
+        self.metrics.gauge("spectators", lambda: len(self.spectators_by_conn))
+        self.metrics.gauge(
+            "queue_depth_max", lambda: max(self.queue_depths(), default=0)
+        )
+        self.metrics.gauge("queue_depth_total", lambda: sum(self.queue_depths()))
+        self.metrics.gauge("evictions", lambda: self.evictions)
+        self.metrics.gauge("reaped", lambda: self.reaped)
+        self.metrics.gauge("log_dropped", lambda: self.log.dropped)
+        self.replays = None if replay_file is None else ReplayWriter(replay_file)
+        self.event_log = None
+        if log_dir is not None:
+            self.event_log = EventLog(log_dir, snapshot_every=snapshot_every)
+            for game in self.event_log.recover():
+                self.restore(game)
+            self.log("recovered", games=len(self.actors_by_game_id), log_dir=log_dir)
 
-        connected = True
-        while connected:
-            msg = receive_message(conn)
-            if msg.get("category") == DISCONNECT_MESSAGE:
-                if conn in self.players_by_conn:
-                    player = self.players_by_conn[conn]
-                    game = self.on_going_games_by_id[player.game_id]
-                    for player_ in game.players:
-                        send_message(
-                            player_.conn,
-                            category=DISCONNECT_MESSAGE,
-                            player=player.username,
-                        )
-                    game.remove_player(player)
-
-                    if not game.players:
-                        self.on_going_games_by_id.pop(game.id_)
-                    elif player.is_game_host:
-                        game.players[0].is_game_host = True
-
-                    self.players_by_conn.pop(conn)
-                connected = False
-
-            if msg.get("category") == JOIN_GAME_MESSAGE:
-                if "id_" not in msg:
-                    continue
-                id_ = msg["id_"]
-
-                if id_ in self.on_going_games_by_id:
-                    game = self.on_going_games_by_id[id_]
-                    username = (
-                        msg.get("username")
-                        + f"#{generate_discriminator(msg.get('username'), self.player_usernames)}"
-                    )
-                    self.player_usernames.add(username)
-                    player = Player(username, conn, False, game.id_)
-                    game.add_player(player)
-                    self.players_by_conn[conn] = player
-
-                    print(f"[JOIN] {addr} joining game {game.id_}", flush=True)
-
-                    for player_ in game.players:
-                        if player_ != player:
-                            send_message(
-                                player_.conn,
-                                category=JOIN_GAME_MESSAGE,
-                                subcategory="other",
-                                username=player.username,
-                            )
-
-                    opponents = {
-                        player_.username: {"is_host": player_.is_game_host}
-                        for player_ in game.players
-                        if player_ != player
-                    }
-                    send_message(
-                        player.conn,
-                        category=JOIN_GAME_MESSAGE,
-                        subcategory="self",
-                        opponents=opponents,
-                        username=username,
-                    )
-                else:
-                    send_message(conn, category=GAME_NOT_FOUND_MESSAGE)
-
-            if msg.get("category") == CREATE_GAME_MESSAGE:
-                id_ = generate_random_id(set(self.on_going_games_by_id))
-                game = Game(id_)
-
-                username = (
-                    msg.get("username")
-                    + f"#{generate_discriminator(msg.get('username'), self.player_usernames)}"
-                )
-                self.player_usernames.add(username)
-                player = Player(username, conn, True, game.id_)
-                game.add_player(player)
-
-                self.on_going_games_by_id[id_] = game
-                self.players_by_conn[conn] = player
-                send_message(
-                    conn, category=CREATE_GAME_MESSAGE, id_=id_, username=username
-                )
-                print(f"[CREATE] {addr} created game {game.id_}", flush=True)
+    def restore(self, game: Game) -> None:
+        for player in game.players:
+            self.player_usernames.add(player.username)
+            if player.token is not None:
+                self.sessions[player.token] = player
+                self.detach(player)
+        self.actors_by_game_id[game.id_] = GameActor(game, self.execute)
 
-            if msg.get("category") == START_GAME_MESSAGE:
-                if conn not in self.players_by_conn:
-                    continue
-                player = self.players_by_conn[conn]
-                game = self.on_going_games_by_id[player.game_id]
+    def record(self, game: Game, event: Callable[..., bytes], *fields) -> None:
+        if self.event_log is None and self.replays is None:
+            return
+        record = event(game.id_, *fields)
+        if self.replays is not None:
+            self.replays.write(record)
+        if self.event_log is not None:
+            self.event_log.record(game, record)
 
-                if not player.is_game_host:
-                    continue
-                game.start()
-
-                for player_ in game.players:
-                    send_message(
-                        player_.conn,
-                        category=START_GAME_MESSAGE,
-                        current_colour=game.current_colour,
-                        current_number=game.current_number,
-                        current_effects=game.current_effects,
-                        is_turn=player_ == game.current_turn,
-                        hand=player_.hand_json(),
-                    )
-
-                print(f"[START] starting game {game.id_}", flush=True)
-
-            if msg.get("category") == CARD_PLAYED_MESSAGE:
-                if conn not in self.players_by_conn:
-                    continue
-                player = self.players_by_conn[conn]
-                game = self.on_going_games_by_id[player.game_id]
-                if not game.current_turn == player:
+    def codec_for(self, conn) -> Codec:
+        return self.codecs_by_conn.get(conn, JSON)
+
+    def queue_depths(self) -> list[int]:
+        return [len(outbox) for outbox in list(self.outboxes.values())]
+
+    def close_transport(self, conn: socket.socket) -> None:
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def evict(self, conn: socket.socket) -> None:
+        self.outboxes[conn].close()
+        self.evictions += 1
+        self.close_transport(conn)
+        self.log("evicted", connection=repr(conn))
+
+    def send_encoded(
+        self,
+        conn: socket.socket,
+        payload: bytes,
+        private: bytes = b"",
+        droppable: bool = False,
+    ) -> None:
+        if conn is None:
+            return
+        recorder = self.metrics.recorder()
+        recorder.count("frames_out")
+        recorder.count("bytes_out", PREFIX.size + len(payload) + len(private))
+        outbox = self.outboxes.get(conn)
+        if outbox is None:
+            send_frame(conn, payload, private)
+            return
+        try:
+            outbox.push(frame_buffers(payload, private), droppable)
+        except SlowConsumerError:
+            self.evict(conn)
+
+    def send(self, conn: socket.socket, **msg) -> None:
+        self.send_encoded(conn, self.codec_for(conn).encode(msg))
+
+    def broadcast(
+        self,
+        players: list[Player],
+        private: Optional[Callable[[Player], dict]] = None,
+        droppable: bool = False,
+        audience: Optional[Audience] = None,
+        **shared,
+    ) -> None:
+        start = time.perf_counter()
+        encoded: dict[Codec, bytes] = {}
+        for player in players:
+            codec = self.codec_for(player.conn)
+            if codec not in encoded:
+                encoded[codec] = codec.encode(shared)
+            self.send_encoded(
+                player.conn,
+                encoded[codec],
+                codec.encode(private(player)) if private else b"",
+                droppable,
+            )
+        recorder = self.metrics.recorder()
+        recorder.count("broadcast_recipients", len(players))
+        recorder.observe("broadcast_seconds", time.perf_counter() - start)
+        if audience:
+            self.fan_out(audience, shared, encoded, droppable)
+
+    def fan_out(
+        self,
+        audience: Audience,
+        shared: dict,
+        encoded: dict[Codec, bytes],
+        droppable: bool = False,
+    ) -> None:
+        start = time.perf_counter()
+        recorder = self.metrics.recorder()
+        for buffers, conns in audience.frames(shared, encoded):
+            for conn in conns:
+                outbox = self.outboxes.get(conn)
+                if outbox is None:
                     continue
+                try:
+                    outbox.push(buffers, droppable)
+                except SlowConsumerError:
+                    self.evict(conn)
+            recorder.count("frames_out", len(conns))
+            recorder.count("bytes_out", len(conns) * sum(map(len, buffers)))
+            recorder.count("spectator_recipients", len(conns))
+        recorder.observe("fan_out_seconds", time.perf_counter() - start)
+
+    @staticmethod
+    def shared_snapshot(game: Game) -> dict:
+        return {
+            "seq": game.seq,
+            "current_colour": game.current_colour,
+            "current_number": game.current_number,
+            "current_effects": game.current_effects,
+        }
+
+    @staticmethod
+    def private_snapshot(game: Game, player: Player) -> dict:
+        return {
+            "is_turn": game.in_progress and player == game.current_turn,
+            "hand": player.hand.cards,
+        }
+
+    def snapshot(self, game: Game, player: Player) -> dict:
+        return self.shared_snapshot(game) | self.private_snapshot(game, player)
+
+    def spectator_snapshot(self, audience: Audience) -> dict:
+        game = audience.game
+        if not game.in_progress:
+            return {}
+        return self.shared_snapshot(game) | audience.public()
+
+    def handle_client(
+        self,
+        conn: socket.socket,
+        addr: tuple[str, int],
+        handed_off: Optional[dict] = None,
+    ):
+        self.log("connected", addr=addr)
+
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        outbox = ThreadedOutbox(conn, **self.outbox_limits)
+        self.outboxes[conn] = outbox
+        self.last_seen[conn] = time.monotonic()
+        threading.Thread(target=outbox.drain, daemon=True).start()
+
+        try:
+            self.serve_client(conn, addr, outbox, handed_off)
+        except Exception as error:
+            self.log("connection_failed", addr=addr, error=repr(error))
+            self.connection_lost(conn, addr)
+        finally:
+            self.last_seen.pop(conn, None)
+            outbox.close()
+            self.outboxes.pop(conn)
+            conn.close()
+            self.log("disconnected", addr=addr)
+
+    def serve_client(
+        self,
+        conn: socket.socket,
+        addr: tuple[str, int],
+        outbox: Outbox,
+        handed_off: Optional[dict] = None,
+    ) -> None:
+        reader = FrameReader(conn)
+        connected = handed_off is None or self.handle_message(conn, addr, handed_off)
+        while connected:
+            try:
+                frame = reader.read_frame()
+                msg = {} if frame is None else self.codec_for(conn).decode_frame(*frame)
+            except (OSError, TypeError, ValueError):
+                msg = {}
+            if not msg or outbox.closed:
+                self.connection_lost(conn, addr)
+                break
+            self.metrics.count("bytes_in", PREFIX.size + len(frame[0]))
+            connected = self.handle_message(conn, addr, msg)
+
+    def claim_username(self, username: str) -> str:
+        while True:
+            discriminator = generate_discriminator(username, self.player_usernames)
+            if self.player_usernames.add(f"{username}#{discriminator}"):
+                return f"{username}#{discriminator}"
+
+    def generate_game_id(self) -> str:
+        while True:
+            id_ = generate_random_id(self.actors_by_game_id)
+            if shard_for(id_, self.shards) == self.shard:
+                return id_
+
+    def issue_token(self, player: Player) -> str:
+        player.token = f"{player.game_id}.{secrets.token_urlsafe(16)}"
+        self.sessions[player.token] = player
+        return player.token
+
+    def actor_for(self, command: Command) -> Optional[GameActor]:
+        if isinstance(command, (Ping, Pong)):
+            return None
+        player = self.players_by_conn.get(command.conn)
+        if player is None and isinstance(command, (Resume, Expire)):
+            player = self.sessions.get(command.token)
+        if player is not None:
+            return self.actors_by_game_id.get(player.game_id)
+        audience = self.spectators_by_conn.get(command.conn)
+        if audience is not None:
+            if isinstance(command, (Disconnect, Resync)):
+                return self.actors_by_game_id.get(audience.game.id_)
+            return None
+        if isinstance(command, (JoinGame, Spectate)):
+            return self.actors_by_game_id.get(command.game_id)
+        return None
+
+    def handle_message(self, conn, addr: tuple[str, int], msg: dict) -> bool:
+        self.last_seen[conn] = time.monotonic()
+        command = parse_command(conn, addr, msg)
+        if command is None:
+            self.metrics.count("messages_in.invalid")
+            return True
+        start = time.perf_counter()
+        connected = self.dispatch(command)
+        name = type(command).__name__
+        recorder = self.metrics.recorder()
+        recorder.count(f"messages_in.{name}")
+        recorder.observe(f"handle_seconds.{name}", time.perf_counter() - start)
+        return connected
+
+    def connection_lost(self, conn, addr: tuple[str, int]) -> bool:
+        return self.dispatch(Disconnect(conn, addr, lost=True))
+
+    def dispatch(self, command: Command) -> bool:
+        actor = self.actor_for(command)
+        if actor is None:
+            return self.execute(command, None)
+        return actor.submit(command)
+
+    def execute(self, command: Command, game: Optional[Game]) -> bool:
+        return self.handlers[type(command)](command, game)
+
+    def hello(self, command: Hello, game: Optional[Game]) -> bool:
+        codec = negotiate(command.codecs)
+        self.send(command.conn, category=HELLO_MESSAGE, codec=codec.name)
+        self.codecs_by_conn[command.conn] = codec
+        return True
+
+    def disconnect(self, command: Disconnect, game: Optional[Game]) -> bool:
+        conn = command.conn
+        player = self.players_by_conn.pop(conn)
+        if player is not None:
+            if command.lost and game is not None and player in game.players:
+                self.detach(player)
+            else:
+                self.leave(player, game)
+        audience = self.spectators_by_conn.pop(conn)
+        if audience is not None:
+            audience.discard(conn)
+
+        self.codecs_by_conn.pop(conn, None)
+        self.reserved_ids.pop(conn, None)
+        return False
+
+    def detach(self, player: Player) -> None:
+        player.conn = None
+        player.detached_until = time.monotonic() + self.resume_grace
+        self.detached[player.token] = player
+        self.log("detached", username=player.username, game=player.game_id)
+
+    def leave(self, player: Player, game: Optional[Game]) -> None:
+        if player.token is not None:
+            self.sessions.pop(player.token)
+            self.detached.pop(player.token)
+        if game is not None and player in game.players:
+            audience = self.audiences.get(game.id_)
+            self.broadcast(
+                game.players,
+                audience=audience,
+                category=DISCONNECT_MESSAGE,
+                player=player.username,
+            )
+            had_turn = game.in_progress and player is game.current_turn
+            seat = game.players.index(player)
+            game.remove_player(player)
+            if player.is_game_host and game.players:
+                game.players[0].is_game_host = True
+            self.record(game, events.left, seat)
 
-                update = game.update(
-                    player,
-                    msg["card_index"],
-                    msg["uno_called"],
-                    msg["colour_change_to"],
+            if not game.players:
+                self.end_game(game)
+            elif had_turn:
+                self.broadcast(
+                    game.players,
+                    lambda player_: {"is_turn": player_ == game.current_turn},
+                    audience=audience,
+                    category=SKIP_TURN_MESSAGE,
+                    seq=game.seq,
                 )
 
-                if update["status"] == "invalid_card":
-                    send_message(conn, category=CARD_PLAYED_MESSAGE, **update)
-                elif update["status"] == "uncalled_uno":
-                    send_message(
-                        conn, category=UNCALLED_UNO_MESSAGE, hand=player.hand_json()
-                    )
-                else:
-                    for player_ in game.players:
-                        send_message(
-                            player_.conn,
-                            category=CARD_PLAYED_MESSAGE,
-                            player=player.username,
-                            is_turn=player_ == game.current_turn,
-                            hand=player_.hand_json(),
-                            **update,
-                        )
-
-                print(
-                    f"[PLAY] {addr} played {msg['card_index']} in {game.id_}",
-                    flush=True,
+    def end_game(self, game: Game) -> None:
+        self.record(game, events.ended)
+        self.actors_by_game_id.pop(game.id_)
+        audience = self.audiences.pop(game.id_)
+        if audience is not None:
+            self.fan_out(audience, {"category": GAME_OVER_MESSAGE}, {})
+            for conns in audience.watchers.values():
+                for conn in conns:
+                    self.spectators_by_conn.pop(conn)
+        if self.channel is not None:
+            announce_ended(self.channel, game.id_)
+
+    def resume(self, command: Resume, game: Optional[Game]) -> bool:
+        conn = command.conn
+        player = self.sessions.get(command.token)
+        if (
+            conn in self.players_by_conn
+            or player is None
+            or game is None
+            or player not in game.players
+        ):
+            self.send(conn, category=INVALID_SESSION_MESSAGE)
+            return True
+
+        if player.conn is not None:
+            self.players_by_conn.pop(player.conn)
+            self.close_transport(player.conn)
+        self.detached.pop(command.token)
+        player.conn = conn
+        player.detached_until = None
+        self.players_by_conn[conn] = player
+
+        reply = {
+            "id_": game.id_,
+            "username": player.username,
+            "is_host": player.is_game_host,
+            "opponents": {
+                player_.username: {"is_host": player_.is_game_host}
+                for player_ in game.players
+                if player_ != player
+            },
+            "in_progress": game.in_progress,
+        }
+        if game.in_progress:
+            reply |= self.snapshot(game, player)
+        self.send(conn, category=RESUME_MESSAGE, **reply)
+        self.log("resumed", addr=command.addr, username=player.username)
+        return True
+
+    def expire(self, command: Expire, game: Optional[Game]) -> bool:
+        player = self.detached.get(command.token)
+        if player is not None and player.detached_until <= time.monotonic():
+            self.log("expired", username=player.username, game=player.game_id)
+            self.leave(player, game)
+        return True
+
+    def expire_sessions(self) -> None:
+        now = time.monotonic()
+        for token in self.detached.keys():
+            player = self.detached.get(token)
+            if player is not None and player.detached_until <= now:
+                self.dispatch(Expire(None, None, token))
+
+    def ping(self, command: Ping, game: Optional[Game]) -> bool:
+        self.send(command.conn, category=PONG_MESSAGE)
+        return True
+
+    def pong(self, command: Pong, game: Optional[Game]) -> bool:
+        return True
+
+    def heartbeat(self, conn) -> None:
+        outbox = self.outboxes.get(conn)
+        if outbox is None:
+            return
+        try:
+            outbox.push(frame_buffers(self.codec_for(conn).encode(PING)))
+        except SlowConsumerError:
+            self.reap(conn)
+
+    def reap(self, conn) -> None:
+        self.last_seen.pop(conn, None)
+        self.reaped += 1
+        self.close_transport(conn)
+        self.log("reaped", connection=repr(conn))
+
+    def reap_connections(self) -> None:
+        now = time.monotonic()
+        heartbeat = now - self.last_heartbeat >= self.heartbeat_interval
+        if heartbeat:
+            self.last_heartbeat = now
+        for conn, seen in list(self.last_seen.items()):
+            if now - seen >= self.idle_timeout:
+                self.reap(conn)
+            elif heartbeat and now - seen >= self.heartbeat_interval:
+                self.heartbeat(conn)
+
+    def sweep(self) -> None:
+        self.expire_sessions()
+        self.reap_connections()
+
+    def sweep_forever(self) -> None:
+        while True:
+            time.sleep(min(SWEEP_INTERVAL, self.heartbeat_interval))
+            self.sweep()
+
+    def join_game(self, command: JoinGame, game: Optional[Game]) -> bool:
+        conn = command.conn
+        if conn in self.players_by_conn or conn in self.spectators_by_conn:
+            return True
+        actor = self.actors_by_game_id.get(command.game_id)
+        if game is None or actor is None or actor.game is not game:
+            self.send(conn, category=GAME_NOT_FOUND_MESSAGE)
+            return True
+
+        if len(game.players) == 4:
+            self.send(conn, category=GAME_FULL_MESSAGE)
+            return True
+
+        username = self.claim_username(command.username)
+        player = Player(username, conn, False, game.id_)
+        game.add_player(player)
+        self.players_by_conn[conn] = player
+        token = self.issue_token(player)
+        self.record(game, events.joined, username, token)
+
+        self.log("join", addr=command.addr, game=game.id_)
+
+        self.broadcast(
+            [player_ for player_ in game.players if player_ != player],
+            audience=self.audiences.get(game.id_),
+            category=JOIN_GAME_MESSAGE,
+            subcategory="other",
+            username=player.username,
+        )
+
+        opponents = {
+            player_.username: {"is_host": player_.is_game_host}
+            for player_ in game.players
+            if player_ != player
+        }
+        self.send(
+            player.conn,
+            category=JOIN_GAME_MESSAGE,
+            subcategory="self",
+            opponents=opponents,
+            username=username,
+            token=token,
+        )
+        return True
+
+    def create_game(self, command: CreateGame, game: Optional[Game]) -> bool:
+        conn = command.conn
+        if conn in self.players_by_conn or conn in self.spectators_by_conn:
+            return True
+        username = self.claim_username(command.username)
+
+        while True:
+            id_ = self.reserved_ids.pop(conn, None) or self.generate_game_id()
+            game = Game(id_)
+            player = Player(username, conn, True, game.id_)
+            game.add_player(player)
+            self.players_by_conn[conn] = player
+            actor = GameActor(game, self.execute, claimed=True)
+            if self.actors_by_game_id.add_if_absent(id_, actor):
+                break
+
+        token = self.issue_token(player)
+        self.record(game, events.created, game.seed, username, token)
+        if self.channel is not None:
+            announce_live(self.channel, id_)
+        actor.drain()
+        self.send(
+            conn,
+            category=CREATE_GAME_MESSAGE,
+            id_=id_,
+            username=username,
+            token=token,
+        )
+        self.log("create", addr=command.addr, game=game.id_)
+        return True
+
+    def spectate(self, command: Spectate, game: Optional[Game]) -> bool:
+        conn = command.conn
+        if conn in self.players_by_conn or conn in self.spectators_by_conn:
+            return True
+        actor = self.actors_by_game_id.get(command.game_id)
+        if game is None or actor is None or actor.game is not game:
+            self.send(conn, category=GAME_NOT_FOUND_MESSAGE)
+            return True
+
+        audience = self.audiences.get(game.id_)
+        if audience is None:
+            audience = Audience(game)
+            self.audiences[game.id_] = audience
+        audience.add(conn, self.codec_for(conn))
+        self.spectators_by_conn[conn] = audience
+
+        self.send(
+            conn,
+            category=SPECTATE_MESSAGE,
+            id_=game.id_,
+            players={
+                player.username: {"is_host": player.is_game_host}
+                for player in game.players
+            },
+            in_progress=game.in_progress,
+            **self.spectator_snapshot(audience),
+        )
+        self.log("spectate", addr=command.addr, game=game.id_)
+        return True
+
+    def start_game(self, command: StartGame, game: Optional[Game]) -> bool:
+        if game is None:
+            return True
+        player = self.players_by_conn[command.conn]
+
+        if not player.is_game_host or game.in_progress:
+            return True
+        game.start()
+        self.record(game, events.started)
+
+        self.broadcast(
+            game.players,
+            lambda player_: self.private_snapshot(game, player_),
+            audience=self.audiences.get(game.id_),
+            category=START_GAME_MESSAGE,
+            **self.shared_snapshot(game),
+        )
+
+        self.log("start", game=game.id_)
+        return True
+
+    def play_card(self, command: PlayCard, game: Optional[Game]) -> bool:
+        if game is None:
+            return True
+        conn = command.conn
+        player = self.players_by_conn[conn]
+        if not game.in_progress or player is not game.current_turn:
+            return True
+
+        hand_size = len(player.hand) - 1
+        start = time.perf_counter()
+        update = game.update(
+            player,
+            command.card_index,
+            command.uno_called,
+            command.colour_change_to,
+        )
+        self.metrics.observe("game_update_seconds", time.perf_counter() - start)
+
+        if update["status"] != "invalid_card":
+            self.record(
+                game,
+                events.played,
+                command.card_index,
+                command.uno_called,
+                command.colour_change_to,
+            )
+
+        if update["status"] == "invalid_card":
+            self.send(conn, category=CARD_PLAYED_MESSAGE, **update)
+            self.send(conn, category=SYNC_MESSAGE, **self.snapshot(game, player))
+        else:
+            recipients = game.players
+            if "winner" in update:
+                update["winner"] = update["winner"].username
+                recipients = [*game.players, player]
+
+            turn = game.current_turn if game.players else None
+
+            def private(player_: Player) -> dict:
+                if player_ != player:
+                    return {"is_turn": player_ == turn}
+                return {
+                    "is_turn": player_ == turn,
+                    "removed": command.card_index,
+                    "added": player.hand[hand_size:],
+                }
+
+            self.broadcast(
+                recipients,
+                private,
+                droppable=True,
+                audience=self.audiences.get(game.id_),
+                category=CARD_PLAYED_MESSAGE,
+                seq=game.seq,
+                player=player.username,
+                **update,
+            )
+            if not game.players:
+                self.end_game(game)
+
+        self.log(
+            "play",
+            addr=command.addr,
+            game=game.id_,
+            card_index=command.card_index,
+            status=update["status"],
+        )
+        return True
+
+    def draw_card(self, command: DrawCard, game: Optional[Game]) -> bool:
+        if game is None:
+            return True
+        player = self.players_by_conn[command.conn]
+        if not game.in_progress or player is not game.current_turn:
+            return True
+        if not player.drew_from_pile:
+            try:
+                card = game.draw_card()
+            except OutOfCardsException:
+                return True
+            player.give_card(card)
+            player.drew_from_pile = True
+            self.record(game, events.drew, game.players.index(player))
+            self.send(command.conn, category=DRAW_CARD_MESSAGE, card=card)
+            self.log("draw", addr=command.addr, game=game.id_)
+        return True
+
+    def skip_turn(self, command: SkipTurn, game: Optional[Game]) -> bool:
+        if game is None:
+            return True
+        player = self.players_by_conn[command.conn]
+        if not game.in_progress or player is not game.current_turn:
+            return True
+        if not player.drew_from_pile:
+            return True
+        game.skip_turn()
+        player.drew_from_pile = False
+        self.record(game, events.skipped, game.players.index(player))
+        self.broadcast(
+            game.players,
+            lambda player_: {"is_turn": player_ == game.current_turn},
+            droppable=True,
+            audience=self.audiences.get(game.id_),
+            category=SKIP_TURN_MESSAGE,
+            seq=game.seq,
+        )
+        self.log("skip", addr=command.addr, game=game.id_)
+        return True
+
+    def resync(self, command: Resync, game: Optional[Game]) -> bool:
+        if game is None:
+            return True
+        player = self.players_by_conn.get(command.conn)
+        if player is None:
+            audience = self.spectators_by_conn[command.conn]
+            if game.in_progress:
+                self.send(
+                    command.conn,
+                    category=SYNC_MESSAGE,
+                    **self.spectator_snapshot(audience),
                 )
+        elif game.in_progress:
+            self.send(
+                command.conn, category=SYNC_MESSAGE, **self.snapshot(game, player)
+            )
+        return True
 
-            if msg.get("category") == DRAW_CARD_MESSAGE:
-                player = self.players_by_conn[conn]
-                game = self.on_going_games_by_id[player.game_id]
-                if not player.drew_from_pile:
-                    card = game.draw_card()
-                    player.give_card(card)
-                    player.drew_from_pile = True
-                    send_message(
-                        conn,
-                        category=DRAW_CARD_MESSAGE,
-                        colour=card.colour,
-                        number=card.number,
-                        effects=card.effects,
-                    )
-
-            if msg.get("category") == SKIP_TURN_MESSAGE:
-                player = self.players_by_conn[conn]
-                game = self.on_going_games_by_id[player.game_id]
-                if not player.drew_from_pile:
-                    continue
-                game.current_turn = next(game.turns)
-                player.drew_from_pile = False
-                for player_ in game.players:
-                    send_message(
-                        player_.conn,
-                        category=SKIP_TURN_MESSAGE,
-                        is_turn=player_ == game.current_turn,
-                    )
-
-        conn.close()
-        print(f"[CONNECTION CLOSED] {addr} disconnected", flush=True)
+    def adopt(self, conn, handoff: Handoff) -> None:
+        self.codecs_by_conn[conn] = handoff.codec
+        if handoff.game_id is not None:
+            self.reserved_ids[conn] = handoff.game_id
+
+    def attach(self, channel: socket.socket, shard: int, shards: int) -> None:
+        self.channel = channel
+        self.shard = shard
+        self.shards = shards
+        for game_id in self.actors_by_game_id.keys():
+            announce_live(channel, game_id)
+        announce_ready(channel)
+
+    def serve_shard(self, channel: socket.socket, shard: int, shards: int):
+        self.attach(channel, shard, shards)
+        self.metrics.start(self.metrics_addr, self.metrics_interval, self.log)
+        threading.Thread(target=self.sweep_forever, daemon=True).start()
+        self.log("listening", shard=True)
+        while handoff := receive_handoff(channel):
+            self.adopt(handoff.conn, handoff)
+            threading.Thread(
+                target=self.handle_client,
+                args=(handoff.conn, handoff.addr, handoff.msg),
+            ).start()
 
     def start(self):
         self.server.listen()
-        print(f"[LISTENING] server listening on {ADDR}", flush=True)
+        self.metrics.start(self.metrics_addr, self.metrics_interval, self.log)
+        threading.Thread(target=self.sweep_forever, daemon=True).start()
+        self.log("listening", addr=self.addr)
         while True:
             conn, addr = self.server.accept()
             thread = threading.Thread(target=self.handle_client, args=(conn, addr))
             thread.start()
-            print(f"[ACTIVE CONNECTIONS]: {threading.activeCount() - 1}", flush=True)
+            self.log("accepted", addr=addr, threads=threading.active_count() - 1)
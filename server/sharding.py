@@ -0,0 +1,70 @@
+import socket
+from dataclasses import dataclass
+from typing import Optional
+
+from protocol.codec import CODECS, JSON, Codec
+from protocol.framing import PREFIX, frame_buffers
+
+HANDOFF_LIMIT = 1 << 16
+
+
+def shard_for(game_id: str, shards: int) -> int:
+    return int(game_id) % shards
+
+
+@dataclass
+class Handoff:
+    conn: socket.socket
+    addr: tuple[str, int]
+    codec: Codec
+    game_id: Optional[str]
+    msg: dict
+
+
+def send_handoff(
+    channel: socket.socket,
+    conn: socket.socket,
+    addr: tuple[str, int],
+    codec: Codec,
+    frame: bytes,
+    game_id: Optional[str] = None,
+) -> None:
+    header = JSON.encode({"addr": addr, "codec": codec.name, "game_id": game_id})
+    socket.send_fds(channel, [b"".join(frame_buffers(header)) + frame], [conn.fileno()])
+
+
+def receive_handoff(channel: socket.socket) -> Optional[Handoff]:
+    try:
+        data, fds, _, _ = socket.recv_fds(channel, 2 * (PREFIX.size + HANDOFF_LIMIT), 1)
+    except ConnectionResetError:
+        return None
+    if not fds:
+        return None
+
+    length, _ = PREFIX.unpack_from(data)
+    header = JSON.decode(data[PREFIX.size : PREFIX.size + length])
+    frame = memoryview(data)[PREFIX.size + length :]
+    codec = CODECS[header["codec"]]
+    msg_length, split = PREFIX.unpack_from(frame)
+    return Handoff(
+        socket.socket(fileno=fds[0]),
+        tuple(header["addr"]),
+        codec,
+        header["game_id"],
+        codec.decode_frame(frame[PREFIX.size : PREFIX.size + msg_length], split),
+    )
+
+
+def announce_ended(channel: socket.socket, game_id: str) -> None:
+    try:
+        channel.send(JSON.encode({"ended": game_id}))
+    except OSError:
+        pass
+
+
+def announce_live(channel: socket.socket, game_id: str) -> None:
+    channel.send(JSON.encode({"live": game_id}))
+
+
+def announce_ready(channel: socket.socket) -> None:
+    channel.send(JSON.encode({"ready": True}))
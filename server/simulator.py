@@ -0,0 +1,220 @@
+import argparse
+import collections
+import contextlib
+import multiprocessing
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Optional
+
+from protocol.cards import COLOURS
+
+from . import events
+from .game import Game, OutOfCardsException
+from .player import Player
+
+MAX_TURNS = 10_000
+
+Policy = Callable[[Game, Player, list[int], random.Random], Optional[int]]
+
+
+def lowest_id(
+    game: Game, player: Player, legal_moves: list[int], rng: random.Random
+) -> Optional[int]:
+    if not legal_moves:
+        return None
+    return min(legal_moves, key=lambda index: player.hand[index].id_)
+
+
+def first_legal(
+    game: Game, player: Player, legal_moves: list[int], rng: random.Random
+) -> Optional[int]:
+    return legal_moves[0] if legal_moves else None
+
+
+def random_legal(
+    game: Game, player: Player, legal_moves: list[int], rng: random.Random
+) -> Optional[int]:
+    return rng.choice(legal_moves) if legal_moves else None
+
+
+POLICIES: dict[str, Policy] = {
+    "first": first_legal,
+    "random": random_legal,
+    "lowest": lowest_id,
+}
+
+
+def best_colour(player: Player) -> str:
+    counts = player.hand.colour_counts()
+    return max(COLOURS, key=counts.__getitem__)
+
+
+@dataclass
+class GameResult:
+    winner: Optional[int]
+    turns: int
+    plays: int
+
+
+def new_game(seed: int, players: int) -> Game:
+    game = Game(str(seed), seed)
+    for seat in range(players):
+        game.add_player(Player(f"bot#{seat:04}", None, seat == 0, game.id_))
+    game.start()
+    return game
+
+
+def play_game(
+    game: Game,
+    policies: list[Policy],
+    rng: random.Random,
+    record: Optional[Callable[[bytes], None]] = None,
+) -> GameResult:
+    seats = {player: seat for seat, player in enumerate(game.players)}
+
+    plays = 0
+    for turn in range(MAX_TURNS):
+        player = game.current_turn
+        policy = policies[seats[player]]
+        index = policy(game, player, game.legal_moves(player), rng)
+
+        if index is None:
+            seat = game.players.index(player)
+            try:
+                player.give_card(game.draw_card())
+            except OutOfCardsException:
+                game.skip_turn()
+                if record is not None:
+                    record(events.skipped(game.id_, seat))
+                continue
+            if record is not None:
+                record(events.drew(game.id_, seat))
+            if not game.is_legal(player.hand[-1]):
+                game.skip_turn()
+                if record is not None:
+                    record(events.skipped(game.id_, seat))
+                continue
+            index = len(player.hand) - 1
+
+        colour = best_colour(player)
+        update = game.update(player, index, True, colour)
+        if record is not None:
+            record(events.played(game.id_, index, True, colour))
+        plays += 1
+        if update["status"] == "win":
+            return GameResult(seats[player], turn + 1, plays)
+
+    return GameResult(None, MAX_TURNS, plays)
+
+
+def record_setup(game: Game, record: Callable[[bytes], None]) -> None:
+    host, *guests = game.players
+    record(events.created(game.id_, game.seed, host.username))
+    for guest in guests:
+        record(events.joined(game.id_, guest.username))
+    record(events.started(game.id_))
+
+
+def simulate_game(
+    seed: int,
+    policies: list[Policy],
+    record: Optional[Callable[[bytes], None]] = None,
+) -> GameResult:
+    game = new_game(seed, len(policies))
+    if record is not None:
+        record_setup(game, record)
+    result = play_game(game, policies, random.Random(seed), record)
+    if record is not None:
+        record(events.ended(game.id_))
+    return result
+
+
+def simulate_batch(
+    first_seed: int, games: int, policy_names: list[str], recording: bool = False
+) -> tuple[list[GameResult], bytes]:
+    policies = [POLICIES[name] for name in policy_names]
+    records = []
+    record = records.append if recording else None
+    results = [
+        simulate_game(seed, policies, record)
+        for seed in range(first_seed, first_seed + games)
+    ]
+    return results, b"".join(records)
+
+
+def simulate_chunk(chunk: tuple) -> tuple[list[GameResult], bytes]:
+    return simulate_batch(*chunk)
+
+
+def run(
+    games: int,
+    seed: int,
+    policy_names: list[str],
+    processes: int = 1,
+    chunk_size: int = 500,
+    record: Optional[BinaryIO] = None,
+) -> dict:
+    chunks = [
+        (
+            first_seed,
+            min(chunk_size, seed + games - first_seed),
+            policy_names,
+            record is not None,
+        )
+        for first_seed in range(seed, seed + games, chunk_size)
+    ]
+    results = []
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        batches = map(simulate_chunk, chunks)
+        if processes > 1:
+            pool = stack.enter_context(multiprocessing.Pool(processes))
+            batches = pool.imap(simulate_chunk, chunks)
+        for batch, records in batches:
+            results.extend(batch)
+            if record is not None:
+                record.write(records)
+    elapsed = time.perf_counter() - start
+
+    wins = collections.Counter(result.winner for result in results)
+    return {
+        "games": games,
+        "processes": processes,
+        "games_per_second": round(games / elapsed, 1),
+        "mean_turns": round(sum(result.turns for result in results) / games, 2),
+        "wins_by_seat": {str(seat): wins[seat] for seat in range(len(policy_names))},
+        "unfinished": wins[None],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="server.simulator")
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--policy",
+        action="append",
+        choices=POLICIES,
+        help="policy per seat, repeat once per player",
+    )
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="write every simulated game to this replay file",
+    )
+    args = parser.parse_args()
+
+    policy_names = args.policy or ["random"] * 4
+    with contextlib.ExitStack() as stack:
+        record = stack.enter_context(open(args.record, "wb")) if args.record else None
+        summary = run(
+            args.games, args.seed, policy_names, args.processes, record=record
+        )
+    print(f"[SIMULATION] {summary}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from .player import Player
+
+
+class TurnOrder:
+    players: list[Player]
+    index: int
+    direction: int
+
+    def __init__(self, players: list[Player]):
+        self.players = players
+        self.reset()
+
+    def reset(self) -> None:
+        self.index = 0
+        self.direction = 1
+
+    @property
+    def current(self) -> Player:
+        return self.players[self.index]
+
+    def seat_after(self, steps: int = 1) -> int:
+        return (self.index + self.direction * steps) % len(self.players)
+
+    def advance(self, steps: int = 1) -> Player:
+        self.index = self.seat_after(steps)
+        return self.current
+
+    def reverse(self) -> None:
+        self.direction = -self.direction
+
+    def peek(self, count: int) -> list[Player]:
+        return [self.players[self.seat_after(steps)] for steps in range(1, count + 1)]
+
+    def remove(self, player: Player) -> None:
+        seat = self.players.index(player)
+        del self.players[seat]
+        if not self.players:
+            self.index = 0
+            return
+        if seat < self.index or (seat == self.index and self.direction < 0):
+            self.index -= 1
+        self.index %= len(self.players)
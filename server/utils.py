@@ -1,40 +1,32 @@
-import json
 import random
 import socket
 import string
+from typing import Container
 
-FORMAT = "utf-8"
-HEADER = 64
+from protocol.codec import JSON, Codec
+from protocol.framing import FrameReader, send_frame
 
 
-def generate_random_id(preexisting_ids: set[str]) -> str:
+def generate_random_id(preexisting_ids: Container[str]) -> str:
     id_ = ""
     while not id_ or id_ in preexisting_ids:
         id_ = "".join(random.choices(string.digits, k=6))
     return id_
 
 
-def generate_discriminator(username, preexisting_usernames: set[str]) -> str:
+def generate_discriminator(username, preexisting_usernames: Container[str]) -> str:
     discriminator = None
     while not discriminator or username + f"#{discriminator}" in preexisting_usernames:
         discriminator = "".join(random.choices(string.digits, k=4))
     return discriminator
 
 
-def send_message(conn: socket.socket, **msg) -> None:
-    message = json.dumps(msg).encode(FORMAT)
-    send_length = str(len(message)).encode(FORMAT)
-    send_length += b" " * (HEADER - len(send_length))
-    conn.send(send_length)
-    conn.send(message)
+def send_message(conn: socket.socket, codec: Codec = JSON, /, **msg) -> None:
+    send_frame(conn, codec.encode(msg))
 
 
-def receive_message(conn: socket.socket) -> dict:
-    msg_length = conn.recv(HEADER).decode(FORMAT)
-    msg = "{}"
-
-    if msg_length:
-        msg_length = int(msg_length)
-        msg = conn.recv(msg_length).decode(FORMAT)
-
-    return json.loads(msg)
+def receive_message(reader: FrameReader, codec: Codec = JSON) -> dict:
+    frame = reader.read_frame()
+    if frame is None:
+        return {}
+    return codec.decode_frame(*frame)
@@ -0,0 +1,24 @@
+import asyncio
+import contextlib
+import os
+import threading
+
+from benchmarks import concurrency, sharding
+from benchmarks.common import free_port
+from server.server import Server
+
+
+def test_concurrent_chaos_leaves_games_intact():
+    port = free_port()
+    server = Server(("127.0.0.1", port), resume_grace=1.0)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threading.Thread(target=server.start, daemon=True).start()
+        concurrency.wait_for(lambda: concurrency.listening(port))
+        result = concurrency.measure(server, port, 4, 100, 0)
+    assert result["corrupted"] == []
+    assert result["registries_drained"]
+
+
+def test_router_hands_off_complete_games():
+    result = asyncio.run(sharding.measure("threaded", 2, 8))
+    assert sum(result["games_per_shard"]) == 8